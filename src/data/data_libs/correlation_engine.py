@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/correlation_engine.py
+
+Motor de correlação para a poda de features altamente correlacionadas do
+Op_Trader (FeatureSelector._remove_corr).
+
+- A matriz de correlação de Pearson é acumulada por blocos de linhas: cada
+  bloco é padronizado (deslocamento/escala do primeiro bloco, estável mesmo
+  para preços com média alta e desvio baixo) e contribui com um único produto
+  matricial em float32 para acumuladores float64. X nunca é convertido inteiro
+  para float; aceita também um iterável de blocos (históricos que não cabem
+  na memória).
+- NaN segue a semântica do `DataFrame.corr()` do pandas (observações
+  completas por par, NaN para séries constantes ou com menos de 2 pares).
+- A poda (`correlated_features`) mantém a regra do seletor: a coluna j é
+  descartada se |r(i, j)| > threshold para alguma coluna anterior i (esteja
+  ela descartada ou não). Pares a até `refine_tol` do limiar são recalculados
+  em float64, para que o float32 não altere a decisão.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-27
+"""
+
+import warnings
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+# Linhas por bloco na acumulação da covariância
+CORR_CHUNK_ROWS = 262_144
+# Distância ao limiar abaixo da qual o par é recalculado em float64
+REFINE_TOL = 1e-4
+
+Source = Union[pd.DataFrame, np.ndarray, Iterable[Union[pd.DataFrame, np.ndarray]]]
+
+
+def _iter_chunks(X: Source, chunk_rows: int) -> Iterable[np.ndarray]:
+    """Blocos float64 de até `chunk_rows` linhas (DataFrame/array) ou os blocos do iterável."""
+    if isinstance(X, (pd.DataFrame, np.ndarray)):
+        for start in range(0, len(X), chunk_rows):
+            part = X.iloc[start:start + chunk_rows] if isinstance(X, pd.DataFrame) else X[start:start + chunk_rows]
+            yield np.asarray(part, dtype=np.float64)
+    else:
+        for part in X:
+            yield np.asarray(part, dtype=np.float64)
+
+
+def streaming_correlation(
+    X: Source,
+    chunk_rows: int = CORR_CHUNK_ROWS,
+    dtype: Union[str, np.dtype] = np.float32,
+) -> np.ndarray:
+    """
+    Matriz de correlação de Pearson acumulada por blocos de linhas.
+
+    Args:
+        X (DataFrame, ndarray ou iterável de blocos): Dados (linhas × features).
+        chunk_rows (int): Linhas por bloco (DataFrame/ndarray).
+        dtype: Precisão do produto matricial de cada bloco (acumulação em float64).
+
+    Returns:
+        np.ndarray: Matriz p × p (float64), NaN onde a correlação é indefinida.
+
+    Raises:
+        ValueError: `chunk_rows` inválido ou nenhum bloco com colunas.
+    """
+    if chunk_rows < 1:
+        raise ValueError(f"chunk_rows deve ser positivo, recebido: {chunk_rows}")
+    shift = scale = None
+    for block in _iter_chunks(X, chunk_rows):
+        if block.ndim != 2:
+            raise ValueError(f"Bloco deve ser 2-D (linhas × features), recebido: {block.shape}")
+        if shift is None:
+            p = block.shape[1]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # colunas só com NaN
+                shift = np.nan_to_num(np.nanmean(block, axis=0)) if len(block) else np.zeros(p)
+                scale = np.nan_to_num(np.nanstd(block, axis=0)) if len(block) else np.ones(p)
+            scale[scale == 0] = 1.0
+            n = np.zeros((p, p))
+            sx = np.zeros((p, p))
+            sxx = np.zeros((p, p))
+            sxy = np.zeros((p, p))
+        if not len(block):
+            continue
+        z = ((block - shift) / scale).astype(dtype, copy=False)
+        valid = ~np.isnan(z)
+        if valid.all():
+            rows = len(z)
+            n += rows
+            sx += z.sum(axis=0, dtype=np.float64)[:, None]
+            sxx += (z.astype(np.float64) ** 2).sum(axis=0)[:, None]
+            sxy += z.T @ z
+        else:
+            m = valid.astype(dtype)
+            z = np.where(valid, z, 0).astype(dtype, copy=False)
+            n += m.T @ m
+            sx += z.T @ m
+            sxx += (z * z).T @ m
+            sxy += z.T @ z
+    if shift is None:
+        raise ValueError("Nenhum bloco recebido para a correlação.")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx ** 2 / n
+        corr = cov / np.sqrt(var * var.T)
+    corr[(n < 2) | (var <= 0) | (var.T <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _pair_correlation(a: np.ndarray, b: np.ndarray) -> float:
+    """Correlação float64 exata de um par (observações completas)."""
+    mask = ~(np.isnan(a) | np.isnan(b))
+    if mask.sum() < 2:
+        return np.nan
+    a = a[mask] - a[mask].mean()
+    b = b[mask] - b[mask].mean()
+    denom = np.sqrt((a @ a) * (b @ b))
+    return (a @ b) / denom if denom > 0 else np.nan
+
+
+def correlated_features(
+    X: Source,
+    threshold: float,
+    columns: Optional[Sequence] = None,
+    chunk_rows: int = CORR_CHUNK_ROWS,
+    dtype: Union[str, np.dtype] = np.float32,
+    refine_tol: float = REFINE_TOL,
+) -> List:
+    """
+    Features a descartar por alta correlação: a coluna j sai se |r(i, j)| >
+    `threshold` para alguma coluna anterior i (mesma regra do triângulo
+    superior de `X.corr().abs()`).
+
+    Args:
+        X (DataFrame, ndarray ou iterável de blocos): Dados (linhas × features).
+        threshold (float): Limiar de |correlação|.
+        columns (Sequence, opcional): Nomes das colunas (padrão: `X.columns`
+            ou posições).
+        chunk_rows (int): Linhas por bloco na acumulação.
+        dtype: Precisão do produto matricial por bloco.
+        refine_tol (float): Pares com | |r| - threshold | <= refine_tol são
+            recalculados em float64 (somente para DataFrame/ndarray).
+
+    Returns:
+        list: Colunas descartadas, na ordem de `columns`.
+    """
+    corr = np.abs(streaming_correlation(X, chunk_rows=chunk_rows, dtype=dtype))
+    p = corr.shape[0]
+    if columns is None:
+        columns = list(X.columns) if isinstance(X, pd.DataFrame) else list(range(p))
+    if len(columns) != p:
+        raise ValueError(f"{len(columns)} nomes de coluna para {p} features.")
+    upper = np.triu(np.ones((p, p), dtype=bool), k=1)
+    if refine_tol > 0 and isinstance(X, (pd.DataFrame, np.ndarray)):
+        def column(k: int) -> np.ndarray:
+            values = X.iloc[:, k] if isinstance(X, pd.DataFrame) else X[:, k]
+            return np.asarray(values, dtype=np.float64)
+
+        for i, j in zip(*np.nonzero(upper & (np.abs(corr - threshold) <= refine_tol))):
+            corr[i, j] = abs(_pair_correlation(column(i), column(j)))
+    drop = (upper & (corr > threshold)).any(axis=0)
+    return [col for col, flag in zip(columns, drop) if flag]
+
+# EOF
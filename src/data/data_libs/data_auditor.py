@@ -4,8 +4,9 @@
 Localização: src/data/data_libs/data_auditor.py
 Autor: Equipe Op_Trader • Atualização: 2025‑06‑14
 ----------------------------------------------------------------
-Auditoria corporativa completa dos CSVs gerados pelo DataPipeline
-(`raw`, `cleaned`, `corrected`, `features`). Valida integridade de
+Auditoria corporativa completa dos artefatos (CSV, Parquet ou Feather)
+gerados pelo DataPipeline (`raw`, `cleaned`, `corrected`, `features`).
+Valida integridade de
 schema, contagem de linhas, consistência temporal, valores ausentes,
 checksums de conteúdo e deriva de amostra.
 
@@ -17,7 +18,6 @@ sobrescrito via argumento `base_dir` ou opção CLI `--base-dir`.
 from __future__ import annotations
 
 import argparse
-import csv
 import hashlib
 import logging
 import sys
@@ -29,6 +29,8 @@ from typing import Dict, List, Mapping, Tuple
 
 import pandas as pd
 
+from src.utils.file_saver import dataframe_info, is_tabular_file, load_dataframe
+
 # ---------------------------------------------------------------------------
 # Path helpers – detect raiz do projeto /root/data
 # ---------------------------------------------------------------------------
@@ -72,7 +74,7 @@ class AuditResult:
 
 
 class DataAuditor:
-    """Audita os CSVs de todas as fases de transformação de dados.
+    """Audita os artefatos de todas as fases de transformação de dados.
 
     Parameters
     ----------
@@ -114,7 +116,8 @@ class DataAuditor:
         csv_paths : Mapping[str, Path], optional
             Mapeamento expresso ``{"raw": path1, "cleaned": path2, ...}``. Se
             *None*, os caminhos serão inferidos pelo padrão de nomenclatura
-            (<stage>_*<run_id>*_.csv) dentro de ``self.base_dir/<stage>``.
+            (<stage>_*<run_id>*.<csv|parquet|feather>) dentro de
+            ``self.base_dir/<stage>``.
         run_id : str, optional
             Hash/timestamp que identifica o lote; obrigatório se não passar
             ``csv_paths``.
@@ -174,8 +177,8 @@ class DataAuditor:
         paths: Dict[str, Path] = {}
         for stage in self.STAGES:
             stage_dir = self.base_dir / stage
-            pattern = f"{stage}_*{run_id}*.csv"
-            matches = list(stage_dir.glob(pattern))
+            pattern = f"{stage}_*{run_id}*.*"
+            matches = [p for p in stage_dir.glob(pattern) if is_tabular_file(p)]
             if not matches:
                 raise FileNotFoundError(f"Nenhum arquivo encontrado para pattern {pattern}")
             # Usa o mais recente
@@ -185,8 +188,8 @@ class DataAuditor:
 
     def _collect_metrics(self, path: Path, stage: str) -> Dict[str, object]:
         self.logger.debug("%s → carregando dados de %s", stage.upper(), path.name)
-        rows = self._quick_row_count(path)
-        cols = len(self._first_header(path))
+        info = dataframe_info(str(path))
+        rows, cols = info["rows"], len(info["columns"])
         n_missing, missing_pct = self._sample_missing(path)
         return {
             "Stage": stage,
@@ -199,19 +202,8 @@ class DataAuditor:
         }
 
     # ---------- static helpers ----------
-    @staticmethod
-    def _quick_row_count(path: Path) -> int:
-        with path.open("r", newline="") as f:
-            return sum(1 for _ in f) - 1
-
-    @staticmethod
-    def _first_header(path: Path):
-        with path.open(newline="") as f:
-            reader = csv.reader(f)
-            return next(reader)
-
     def _sample_missing(self, path: Path) -> Tuple[int, float]:
-        df = pd.read_csv(path, nrows=self.sample_size)
+        df = load_dataframe(str(path), nrows=self.sample_size)
         total = df.size
         missing = int(df.isnull().values.sum())
         return missing, missing / total if total else 0.0
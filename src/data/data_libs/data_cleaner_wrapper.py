@@ -4,20 +4,25 @@ DataCleanerWrapper — Op_Trader (Batch/Streaming)
 
 Limpeza estrita e padronizada para DataFrames de candles/features:
 - Remove linhas inválidas/NaN nas colunas essenciais dinâmicas.
-- Garante datetime e ordenação (se presente).
-- Arredonda colunas numéricas conforme ohlc_decimals.
+- Garante datetime e ordenação (se presente; pulada se já monotônico).
+- Arredonda colunas numéricas conforme ohlc_decimals, vetorizado: um único
+  np.round e uma máscara de NaN por linha sobre o bloco 2-D de cada dtype.
 - Converte flags booleanas em inteiros (0/1) se existirem.
 - Mantém apenas as colunas informadas na lista dinâmica.
+- Sem cópia defensiva do DataFrame de entrada; modo `inplace` opcional.
 
 Compatível com batch e streaming (modo).
 Autor: Equipe Op_Trader
 Data: 2025-06-12
 """
 
-from typing import Optional, List
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 from src.utils.logging_utils import get_logger
 
+FLAG_COLUMNS = ('gap_fixed', 'volume_fixed', 'outlier_fixed')
+
 class DataCleanerWrapper:
     """
     Limpeza estrita e padronizada de DataFrames Op_Trader.
@@ -35,7 +40,9 @@ class DataCleanerWrapper:
         self,
         df: pd.DataFrame,
         ohlc_decimals: int,
-        columns_required: Optional[List[str]] = None
+        columns_required: Optional[List[str]] = None,
+        keep_dtypes: bool = False,
+        inplace: bool = False
     ) -> pd.DataFrame:
         """
         Limpa e padroniza DataFrame, removendo linhas inválidas e arredondando as colunas indicadas.
@@ -44,6 +51,11 @@ class DataCleanerWrapper:
             df (pd.DataFrame): DataFrame bruto.
             ohlc_decimals (int): Casas decimais para colunas de preço/features.
             columns_required (list): Lista dinâmica de colunas essenciais (ex: OHLCV + features de preço + flags).
+            keep_dtypes (bool): Preserva o dtype das colunas numéricas após o arredondamento
+                (ex.: features float32/int8 do FeatureCalculator) em vez de convertê-las para float64.
+            inplace (bool): Aplica a limpeza no próprio `df` (ordenação, descarte de linhas/colunas
+                e arredondamento) e o devolve, em vez de produzir um novo DataFrame. Útil quando o
+                chamador descarta a entrada (ex.: saída do FeatureEngineer).
 
         Returns:
             pd.DataFrame: DataFrame limpo, padronizado e sem NaNs nas colunas essenciais.
@@ -64,31 +76,60 @@ class DataCleanerWrapper:
             return pd.DataFrame(columns=columns_required)
 
         try:
-            df_clean = df.copy()
-            # 1. Garante datetime correto e ordena (se presente)
+            # Sem cópia defensiva: com copy-on-write, a cópia rasa protege o `df` recebido
+            df_clean = df if inplace else df.copy(deep=False)
+            # 1. Garante datetime correto e ordena (se presente e ainda fora de ordem)
             if 'datetime' in df_clean.columns:
-                df_clean['datetime'] = pd.to_datetime(df_clean['datetime'], errors='coerce')
-                df_clean.sort_values('datetime', inplace=True)
-            # 2. Remove linhas inválidas nas colunas essenciais
-            before = len(df_clean)
-            df_clean.dropna(subset=columns_required, inplace=True)
-            after = len(df_clean)
-            dropped = before - after
-            if dropped > 0:
-                self._logger.info(f"Linhas removidas por NaN: {dropped} (antes={before}, depois={after})")
-            # 3. Arredonda todas as colunas numéricas exceto datetime
+                if not pd.api.types.is_datetime64_any_dtype(df_clean['datetime']):
+                    df_clean['datetime'] = pd.to_datetime(df_clean['datetime'], errors='coerce')
+                if not df_clean['datetime'].is_monotonic_increasing:
+                    df_clean.sort_values('datetime', inplace=True)
+                    self._logger.debug("DataFrame reordenado por datetime.")
+            df_clean.reset_index(drop=True, inplace=True)
+            required = set(columns_required)
+            extra = [col for col in df_clean.columns if col not in required]
+            if extra:
+                df_clean.drop(columns=extra, inplace=True)
+            # 2. Arredonda o bloco numérico (um array 2-D por dtype) e marca linhas com NaN
+            invalid = np.zeros(len(df_clean), dtype=bool)
+            blocks = []
+            for cols, values in self._numeric_blocks(df_clean, columns_required):
+                if values.dtype.kind == 'f':
+                    invalid |= np.isnan(values).any(axis=1)
+                    values = np.round(values, ohlc_decimals, out=values if values.flags.writeable else None)
+                blocks.append((cols, values if keep_dtypes else values.astype(float, copy=False)))
+            numeric = [col for cols, _ in blocks for col in cols]
+            self._logger.debug(f"{len(numeric)} colunas numéricas arredondadas para {ohlc_decimals} casas decimais.")
             for col in columns_required:
-                if col != 'datetime' and pd.api.types.is_numeric_dtype(df_clean[col]):
-                    df_clean[col] = df_clean[col].round(ohlc_decimals)
-                    df_clean[col] = df_clean[col].astype(float)
-                    self._logger.debug(f"Coluna '{col}' arredondada para {ohlc_decimals} casas decimais.")
+                if col not in numeric:
+                    invalid |= df_clean[col].isna().to_numpy()
+            # 3. Remove linhas inválidas nas colunas essenciais (o bloco numérico é
+            #    filtrado no array e regravado uma única vez por dtype)
+            if numeric:
+                df_clean.drop(columns=numeric, inplace=True)
+            dropped = int(invalid.sum())
+            if dropped > 0:
+                before = len(invalid)
+                keep = np.flatnonzero(~invalid)
+                if len(keep) and keep[-1] - keep[0] + 1 == len(keep):
+                    # caso típico (warm-up das features no início): fatia sem cópia
+                    blocks = [(cols, values[keep[0]:keep[-1] + 1]) for cols, values in blocks]
+                else:
+                    blocks = [(cols, np.take(values.T, keep, axis=1).T) for cols, values in blocks]
+                df_clean.drop(index=np.flatnonzero(invalid), inplace=True)
+                df_clean.reset_index(drop=True, inplace=True)
+                self._logger.info(f"Linhas removidas por NaN: {dropped} (antes={before}, depois={before - dropped})")
+            for cols, values in blocks:
+                df_clean[cols] = pd.DataFrame(values, columns=cols, copy=False)
             # 4. Converte flags booleanas para inteiro (0/1), se existirem
-            for flag_col in ['gap_fixed', 'volume_fixed', 'outlier_fixed']:
+            for flag_col in FLAG_COLUMNS:
                 if flag_col in df_clean.columns:
                     df_clean[flag_col] = df_clean[flag_col].astype(int)
                     self._logger.debug(f"Coluna '{flag_col}' convertida para inteiro 0/1.")
             # 5. Mantém apenas as colunas indicadas, na ordem
-            df_clean = df_clean[columns_required].reset_index(drop=True)
+            if list(df_clean.columns) != list(columns_required):
+                for col in columns_required:
+                    df_clean[col] = df_clean.pop(col)
         except Exception as e:
             self._logger.critical(f"Erro crítico na limpeza: {e}. Retornando DataFrame vazio.")
             return pd.DataFrame(columns=columns_required)
@@ -96,4 +137,18 @@ class DataCleanerWrapper:
         self._logger.info(f"DataFrame limpo (shape final={df_clean.shape}).")
         return df_clean
 
+    @staticmethod
+    def _numeric_blocks(df: pd.DataFrame, columns: List[str]) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """
+        Agrupa as colunas numéricas (float/int/bool NumPy, exceto datetime) por dtype
+        e devolve cada grupo como um único array 2-D (linhas × colunas).
+        """
+        groups = {}
+        for col in columns:
+            dtype = df[col].dtype
+            if col != 'datetime' and isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+                groups.setdefault(dtype, []).append(col)
+        for dtype, cols in groups.items():
+            yield cols, df[cols].to_numpy(dtype=dtype)
+
 # EOF
@@ -12,7 +12,7 @@ Data: 2025-06-12
 import decimal
 import pandas as pd
 import MetaTrader5 as mt5
-from typing import List, Optional, Tuple, Callable
+from typing import Callable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from src.utils.logging_utils import get_logger
 from src.utils.path_setup import ensure_project_root
@@ -93,12 +93,14 @@ class DataCollectorMT5:
             raise ValueError(f"Timeframe inválido: {self.timeframe}")
         return tf_map[tf]
 
-    def _fetch_ohlcv(self) -> Tuple[pd.DataFrame, int]:
+    def _fetch_ohlcv(self, start=None, end=None, allow_empty: bool = False) -> Tuple[pd.DataFrame, int]:
         timeframe = self._get_mt5_timeframe()
-        start = pd.to_datetime(self.start_date)
-        end = pd.to_datetime(self.end_date)
+        start = pd.to_datetime(self.start_date if start is None else start)
+        end = pd.to_datetime(self.end_date if end is None else end)
         rates = mt5.copy_rates_range(self.symbol, timeframe, start, end)
         if rates is None or len(rates) == 0:
+            if allow_empty:
+                return pd.DataFrame(), 5
             self._logger.error(f"Nenhum dado retornado para {self.symbol} {self.timeframe}")
             raise RuntimeError("MT5: Nenhum dado retornado")
         df = pd.DataFrame(rates)
@@ -178,10 +180,52 @@ class DataCollectorMT5:
         finally:
             self._shutdown_mt5()
 
+    def collect_chunks(self, chunk_days: int = 30) -> Iterator[pd.DataFrame]:
+        """
+        Coleta start_date → end_date em janelas consecutivas de `chunk_days`
+        dias (modo chunked/out-of-core): cada lote é entregue antes de o
+        próximo ser buscado, de modo que o histórico nunca fica inteiro em
+        memória. Janelas sem barras (fins de semana, feriados) são puladas; a
+        barra de fronteira pode se repetir entre lotes vizinhos.
+
+        Yields:
+            pd.DataFrame: df_raw do lote (COLUMNS_REQUIRED, index padrão).
+
+        Raises:
+            ValueError: chunk_days menor que 1.
+            RuntimeError: Nenhuma barra em todo o período.
+        """
+        if chunk_days < 1:
+            raise ValueError(f"chunk_days deve ser positivo, recebido: {chunk_days}")
+        start = pd.to_datetime(self.start_date)
+        end = pd.to_datetime(self.end_date)
+        step = pd.Timedelta(days=chunk_days)
+        delivered = 0
+        try:
+            while start <= end:
+                stop = min(start + step, end)
+                df_raw, _ = self._fetch_ohlcv(start, stop, allow_empty=True)
+                if not df_raw.empty:
+                    df_final = self._finalize_dataframe(df_raw)
+                    delivered += len(df_final)
+                    self._logger.debug(f"Lote {start} → {stop}: {len(df_final)} barras")
+                    yield df_final
+                if stop >= end:
+                    break
+                start = stop
+            if not delivered:
+                raise RuntimeError("MT5: Nenhum dado retornado")
+        finally:
+            self._shutdown_mt5()
+
     def collect_streaming(self, callback: Callable[[pd.DataFrame], None], poll_interval: float = 5.0):
         """
         Loop de streaming: chama o callback a cada poll_interval se houver novo dado.
         (Para streaming, não retorna decimais — somente df_raw no callback, com COLUMNS_REQUIRED)
+
+        A primeira coleta usa start_date/end_date; as seguintes buscam apenas a
+        partir da última barra recebida, de modo que cada callback traz só as
+        barras recentes.
         """
         import time
         last_max_dt = None
@@ -196,6 +240,9 @@ class DataCollectorMT5:
                     continue
                 last_max_dt = current_max
                 callback(df_final)
+                # Próximas coletas: só a partir da última barra vista (inclusive, pode estar em formação)
+                self.start_date = str(last_max_dt)
+                self.end_date = str(pd.Timestamp.now().normalize() + pd.Timedelta(days=2))
                 time.sleep(poll_interval)
         except KeyboardInterrupt:
             self._logger.info("Streaming interrompido pelo usuário.")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/feature_cache.py
+
+FeatureCache — Cache em disco, endereçado por conteúdo, das saídas do FeatureCalculator.
+
+Cada entrada é identificada por uma chave derivada do hash das colunas de
+entrada usadas pela feature, do nome da feature, dos parâmetros efetivos e da
+versão do código (ver `FeatureCalculator._cache_keys`). As colunas ficam em
+arquivos `.npy` abertos com `mmap_mode="c"` (nada é lido até ser usado; o
+resultado é gravável em copy-on-write sem alterar o cache) e o diretório é limitado por tamanho com descarte LRU.
+
+Layout:
+    <cache_dir>/<chave>/meta.json   # tipo do resultado, colunas, dtypes, bytes
+    <cache_dir>/<chave>/<i>.npy     # uma coluna por arquivo
+
+Autor: Equipe Op_Trader
+Data: 2025-06-22
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging_utils import get_logger
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+_META = "meta.json"
+
+
+def column_digest(values: Any) -> str:
+    """
+    Hash do conteúdo de uma coluna (Series, Index ou ndarray).
+
+    Dtypes numéricos/datetime são lidos direto do buffer; os demais passam por
+    `pd.util.hash_pandas_object`. O dtype entra no hash.
+    """
+    arr = values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+    digest = hashlib.blake2b(str(arr.dtype).encode(), digest_size=16)
+    if arr.dtype.kind in "biufmM":
+        digest.update(np.ascontiguousarray(arr).view(np.uint8))
+    else:
+        digest.update(pd.util.hash_pandas_object(pd.Series(arr), index=False).to_numpy())
+    return digest.hexdigest()
+
+
+def index_digest(index: pd.Index) -> str:
+    """Hash do índice; RangeIndex é descrito por início/fim/passo sem varrer valores."""
+    if isinstance(index, pd.RangeIndex):
+        return f"range:{index.start}:{index.stop}:{index.step}"
+    return column_digest(index)
+
+
+class FeatureCache:
+    """
+    Cache de colunas de features em disco, com descarte LRU por tamanho.
+
+    Usage:
+        cache = FeatureCache("data/cache/features", max_bytes=2 * 1024 ** 3)
+        result = cache.load(key, df.index)          # None se ausente
+        cache.store(key, "rsi", serie, df.index)
+        cache.evict()
+
+    Args:
+        cache_dir (str): Diretório raiz do cache (criado se não existir).
+        max_bytes (int): Tamanho máximo ocupado pelas entradas.
+        debug (bool): Ativa logs detalhados (DEBUG).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES, debug: bool = False):
+        if not isinstance(max_bytes, int) or max_bytes <= 0:
+            raise ValueError(f"max_bytes deve ser inteiro positivo, recebido: {max_bytes}")
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.logger = get_logger("op_trader.feature_cache", "DEBUG" if debug else None)
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ======================== LEITURA / ESCRITA ===============================
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str, index: pd.Index) -> Optional[Any]:
+        """
+        Recupera o resultado de `key` como Series/DataFrame sobre `index`, com
+        colunas mapeadas em memória em modo copy-on-write (graváveis, como um
+        resultado recém-calculado). Retorna None se ausente,
+        incompleto ou de tamanho diferente do índice.
+        """
+        path = self._entry(key)
+        meta_path = os.path.join(path, _META)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            # mmap copy-on-write: páginas lidas sob demanda e resultado gravável
+            # (escritas do chamador vão para páginas privadas, nunca para o cache);
+            # np.asarray: ndarray comum sobre o mesmo mapeamento (sem subclasse memmap)
+            arrays = [
+                np.asarray(np.load(os.path.join(path, f"{i}.npy"), mmap_mode="c", allow_pickle=False))
+                for i in range(len(meta["columns"]))
+            ]
+        except (OSError, ValueError, KeyError):
+            return None
+        if any(arr.shape != (len(index),) for arr in arrays):
+            return None
+        try:
+            os.utime(meta_path)  # marca o acesso para o LRU
+        except OSError:
+            pass
+        if meta["kind"] == "series":
+            return pd.Series(arrays[0], index=index, name=meta["columns"][0], copy=False)
+        return pd.DataFrame(dict(zip(meta["columns"], arrays)), index=index, copy=False)
+
+    def store(self, key: str, feat: str, result: Any, index: pd.Index) -> bool:
+        """
+        Grava `result` sob `key`. Só armazena colunas numpy numéricas, booleanas
+        ou datetime alinhadas a `index`; demais resultados são ignorados (False).
+        A entrada é escrita em diretório temporário e publicada com rename.
+        """
+        if isinstance(result, pd.Series):
+            kind, columns = "series", [(result.name, result)]
+        elif isinstance(result, pd.DataFrame):
+            kind, columns = "frame", list(result.items())
+        else:
+            return False
+        for name, col in columns:
+            if not isinstance(name, (str, type(None))) or not isinstance(col.dtype, np.dtype):
+                return False
+            if col.dtype.kind not in "biufmM" or not col.index.equals(index):
+                return False
+
+        path = self._entry(key)
+        if os.path.isdir(path):
+            return True
+        tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+        try:
+            os.makedirs(tmp)
+            nbytes = 0
+            for i, (_, col) in enumerate(columns):
+                arr = col.to_numpy()
+                np.save(os.path.join(tmp, f"{i}.npy"), arr, allow_pickle=False)
+                nbytes += arr.nbytes
+            meta = {
+                "feature": feat,
+                "kind": kind,
+                "columns": [name for name, _ in columns],
+                "dtypes": [str(col.dtype) for _, col in columns],
+                "nbytes": nbytes,
+            }
+            with open(os.path.join(tmp, _META), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.rename(tmp, path)
+        except OSError as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(path):
+                self.logger.warning(f"Falha ao gravar '{feat}' no cache: {e}")
+                return False
+        self.logger.debug(f"Cache gravado: {feat} ({key})")
+        return True
+
+    # ======================== DESCARTE LRU ====================================
+    def entries(self) -> List[Dict[str, Any]]:
+        """Entradas do cache: chave, bytes e último acesso (mtime do meta.json)."""
+        found = []
+        for key in os.listdir(self.cache_dir):
+            path = self._entry(key)
+            meta_path = os.path.join(path, _META)
+            if ".tmp-" in key or not os.path.isfile(meta_path):
+                continue
+            try:
+                size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+                found.append({"key": key, "bytes": size, "atime": os.stat(meta_path).st_mtime})
+            except OSError:
+                continue
+        return found
+
+    def size_bytes(self) -> int:
+        return sum(e["bytes"] for e in self.entries())
+
+    def evict(self) -> List[str]:
+        """Remove as entradas menos usadas recentemente até caber em `max_bytes`."""
+        removed: List[str] = []
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e["atime"])
+            total = sum(e["bytes"] for e in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    shutil.rmtree(self._entry(entry["key"]))
+                except OSError as e:
+                    # Arquivos ainda mapeados (ex.: Windows) ficam para a próxima rodada
+                    self.logger.debug(f"Entrada {entry['key']} não removida: {e}")
+                    continue
+                total -= entry["bytes"]
+                removed.append(entry["key"])
+        if removed:
+            self.logger.info(f"Cache de features: {len(removed)} entradas descartadas (LRU).")
+        return removed
+
+    def clear(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            for entry in self.entries():
+                shutil.rmtree(self._entry(entry["key"]), ignore_errors=True)
+
+# EOF
@@ -8,15 +8,56 @@ Autor: Equipe Op_Trader
 Data: 2025-06-14
 """
 
+import functools
+import hashlib
+import inspect
+import os
+import threading
 import pandas as pd
 import numpy as np
 import numba as nb
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import shared_memory
 from tqdm import tqdm
-from typing import Callable, Optional, List, Dict, Any
+from typing import Callable, Optional, List, Dict, Any, Tuple
+from src.data.data_libs import feature_cache as feature_cache_module
+from src.data.data_libs import feature_kernels as kernels
+from src.data.data_libs import trading_calendar as calendar_module
+from src.data.data_libs.feature_cache import DEFAULT_MAX_BYTES, FeatureCache, column_digest, index_digest
+from src.data.data_libs.trading_calendar import TradingCalendar, session_calendars
+from src.utils.hash_utils import generate_config_hash
 from src.utils.logging_utils import get_logger
 
+# Abaixo deste horizonte a varredura direta é mais rápida que as duas deques
+_DEQUE_MIN_LOOKFORWARD = 48
+
 @nb.njit
 def _calc_optimal_action_numba(close, lookforward, pip_size):
+    n = len(close)
+    if lookforward < _DEQUE_MIN_LOOKFORWARD or np.isnan(close).any():
+        return _optimal_action_scan(close, lookforward, pip_size)
+    result = np.full(n, np.nan)
+
+    # Janela futura [i+1, i+lookforward] == janela rolling que termina em i+lookforward
+    future_max = np.empty(n)
+    future_min = np.empty(n)
+    kernels.rolling_max(close, lookforward, lookforward, future_max)
+    kernels.rolling_min(close, lookforward, lookforward, future_min)
+
+    for i in range(n - lookforward):
+        current_price = close[i]
+        max_up = future_max[i + lookforward] - current_price
+        max_down = current_price - future_min[i + lookforward]
+        optimal_points = max(max_up, max_down)
+        result[i] = optimal_points / pip_size
+    
+    return result
+
+@nb.njit
+def _optimal_action_scan(close, lookforward, pip_size):
+    # Varredura O(n·k); usada em horizontes curtos e em séries com NaN, cuja
+    # semântica de comparação difere das janelas rolling.
     n = len(close)
     result = np.full(n, np.nan)
     
@@ -52,6 +93,23 @@ def _calc_trend_following_numba(close, lookforward, pip_size):
 
 @nb.njit
 def _calc_mean_reversion_numba(close, lookforward, pip_size):
+    n = len(close)
+    if np.isnan(close).any():
+        return _mean_reversion_scan(close, lookforward, pip_size)
+    result = np.full(n, np.nan)
+
+    # Mediana da janela futura via buffer ordenado (mesma janela deslocada)
+    future_median = np.empty(n)
+    kernels.rolling_median(close, lookforward, future_median)
+
+    for i in range(n - lookforward):
+        result[i] = (close[i] - future_median[i + lookforward]) / pip_size
+
+    return result
+
+@nb.njit
+def _mean_reversion_scan(close, lookforward, pip_size):
+    # Ordenação por barra O(n·k log k) original; mantida para séries com NaN.
     n = len(close)
     result = np.full(n, np.nan)
     
@@ -74,6 +132,415 @@ def _calc_mean_reversion_numba(close, lookforward, pip_size):
     
     return result
 
+# ======================== CALENDÁRIO ==========================================
+
+_MINUTES_PER_DAY = 1440
+_UNITS_PER_MINUTE = {"s": 60, "ms": 60_000, "us": 60_000_000, "ns": 60_000_000_000}
+
+# Features cuja saída depende do calendário do instrumento (entra na chave do FeatureCache)
+_CALENDAR_FEATURES = ("market_hours",)
+
+
+def market_hours_codes(
+    values: Any, session: str = "london,newyork,tokyo", calendar: Optional[TradingCalendar] = None
+) -> np.ndarray:
+    """
+    Código da sessão de mercado de cada candle: posição em `session` da
+    primeira sessão aberta, -1 fora de todas.
+
+    As sessões são calendários (`session_calendars`) no fuso de cada praça,
+    então o horário de verão desloca a faixa em UTC. Com `calendar`, candles
+    fora da agenda do instrumento (fim de semana, feriado, rollover) também
+    recebem -1.
+    """
+    idx = pd.DatetimeIndex(pd.to_datetime(values))
+    data_timezone = calendar.data_timezone if calendar is not None else "UTC"
+    codes = np.full(len(idx), -1, dtype=np.int64)
+    for code, session_calendar in reversed(list(enumerate(session_calendars(session, data_timezone)))):
+        codes[session_calendar.mask(idx)] = code
+    if calendar is not None:
+        codes[~calendar.mask(idx)] = -1
+    return codes
+
+
+def calendar_fields(values: Any) -> Dict[str, np.ndarray]:
+    """
+    Decompõe uma coluna datetime em campos de calendário inteiros.
+
+    A coluna é lida uma única vez como epoch int64 (na resolução nativa;
+    horário de parede se tiver fuso) e os campos saem de um kernel de aritmética inteira
+    em passada única, sem acessores `.dt` nem objetos `date` por linha.
+
+    Returns:
+        dict com arrays int64: minute (minuto do dia), day (dias desde
+        1970-01-01), dow (0=segunda), dom (dia do mês), minute_of_week; e
+        valid (máscara booleana das linhas não-NaT).
+    """
+    dt = pd.to_datetime(values)
+    if getattr(dt.dtype, "tz", None) is not None:
+        dt = dt.dt.tz_localize(None)
+    stamps = np.asarray(dt.to_numpy())
+    unit, _ = np.datetime_data(stamps.dtype)
+    if unit not in _UNITS_PER_MINUTE:
+        stamps, unit = stamps.astype("datetime64[ns]"), "ns"
+    ts = np.ascontiguousarray(stamps).view(np.int64)
+    nat = np.iinfo(np.int64).min
+    minute, day, dow, dom = (np.empty(len(ts), dtype=np.int64) for _ in range(4))
+    kernels.calendar_fields(ts, _UNITS_PER_MINUTE[unit], nat, minute, day, dow, dom)
+    return {
+        "minute": minute,
+        "day": day,
+        "dow": dow,
+        "dom": dom,
+        "minute_of_week": dow * _MINUTES_PER_DAY + minute,
+        "valid": ts != nat,
+    }
+
+
+def _calendar_values(cal: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+    """Campo de calendário com NaN nas linhas NaT (como os acessores `.dt`)."""
+    if cal["valid"].all():
+        return values
+    return np.where(cal["valid"], values, np.nan)
+
+
+# ======================== PLANO DE EXECUÇÃO (DAG) ============================
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    Declaração de entradas de uma feature para o planejador de execução.
+
+    Attributes:
+        inputs: Colunas do DataFrame de entrada lidas pela feature. Valores no
+            formato "$param" são resolvidos com os parâmetros efetivos.
+        intermediates: Resultados intermediários compartilhados consumidos pela
+            feature, ex.: ("rolling_max", "high", "$window") ou ("true_range",).
+        depends_on: Features cuja saída é lida como coluna (ex.: stoch_d → stoch_k).
+        discrete: Saída inteira de pequena amplitude (flags, padrões, categorias);
+            com `dtype="float32"` é gravada como int8.
+    """
+
+    inputs: Tuple[str, ...] = ()
+    intermediates: Tuple[Tuple[Any, ...], ...] = ()
+    depends_on: Tuple[str, ...] = ()
+    discrete: bool = False
+
+
+# Intermediários com janela: chave normalizada (tipo, fonte, window, min_periods)
+_ROLLING_KINDS = ("rolling_mean", "rolling_std", "rolling_max", "rolling_min", "rolling_mad")
+
+# Estatísticas rolling com kernel próprio; "mad" não tem equivalente no pandas
+_ROLLING_KERNELS = {
+    "mad": kernels.rolling_mean_abs_dev,
+    "max": kernels.rolling_max,
+    "min": kernels.rolling_min,
+}
+
+_HLC = ("high", "low", "close")
+_TR = ("true_range",)
+_TP = ("typical_price",)
+_CAL = ("calendar",)
+
+CORE_FEATURE_SPECS: Dict[str, FeatureSpec] = {
+    "ema_fast": FeatureSpec(("$column",), (("ema", "$column", "$window"),)),
+    "ema_slow": FeatureSpec(("$column",), (("ema", "$column", "$window"),)),
+    "rsi": FeatureSpec(("$column",)),
+    "macd_hist": FeatureSpec(
+        ("$column",), (("ema", "$column", "$span_short"), ("ema", "$column", "$span_long")),
+    ),
+    "atr": FeatureSpec(_HLC, (_TR, ("rolling_mean", "true_range", "$window"))),
+    "bb_width": FeatureSpec(
+        ("$column",), (("rolling_mean", "$column", "$window"), ("rolling_std", "$column", "$window")),
+    ),
+    "return_pct": FeatureSpec(("$column",), (("returns", "$column"),)),
+    "candle_direction": FeatureSpec(("$column",), discrete=True),
+    "volume_relative": FeatureSpec(("$column",), (("rolling_mean", "$column", "$window"),)),
+    "pullback": FeatureSpec(("$column",), (("rolling_mean", "$column", "$window"),)),
+    "hammer_pattern": FeatureSpec(("open", "high", "low", "close"), discrete=True),
+    "inverted_hammer_pattern": FeatureSpec(("open", "high", "low", "close"), discrete=True),
+    "roc_5": FeatureSpec(("$column",)),
+    "roc_10": FeatureSpec(("$column",)),
+    "roc_20": FeatureSpec(("$column",)),
+    "momentum_3": FeatureSpec(("$column",)),
+    "momentum_5": FeatureSpec(("$column",)),
+    "williams_r": FeatureSpec(
+        _HLC, (("rolling_max", "high", "$window"), ("rolling_min", "low", "$window")),
+    ),
+    "stoch_k": FeatureSpec(
+        _HLC, (("rolling_max", "high", "$window"), ("rolling_min", "low", "$window")),
+    ),
+    "stoch_d": FeatureSpec(depends_on=("stoch_k",)),
+    "adx": FeatureSpec(_HLC, (_TR, ("rolling_mean", "true_range", "$window"))),
+    "cci": FeatureSpec(
+        _HLC,
+        (_TP, ("rolling_mean", "typical_price", "$window"), ("rolling_mad", "typical_price", "$window")),
+    ),
+    "trix": FeatureSpec(("$column",), (("ema", "$column", "$window"),)),
+    "atr_normalized": FeatureSpec(_HLC, (_TR, ("rolling_mean", "true_range", "$window"))),
+    "realized_vol_5": FeatureSpec(
+        ("$column",), (("returns", "$column"), ("rolling_std", "returns:$column", "$window")),
+    ),
+    "realized_vol_10": FeatureSpec(
+        ("$column",), (("returns", "$column"), ("rolling_std", "returns:$column", "$window")),
+    ),
+    "parkinson_vol": FeatureSpec(("high", "low")),
+    "gap_analysis": FeatureSpec(("open", "close"), discrete=True),
+    "breakout_signals": FeatureSpec(
+        _HLC, (("rolling_max", "high", "$window"), ("rolling_min", "low", "$window")), discrete=True,
+    ),
+    "support_resistance": FeatureSpec(
+        _HLC, (("rolling_max", "high", "$lookback"), ("rolling_min", "low", "$lookback")),
+    ),
+    "pivot_points": FeatureSpec(_HLC, (_TP,)),
+    "fibonacci_levels": FeatureSpec(
+        ("high", "low"), (("rolling_max", "high", "$lookback"), ("rolling_min", "low", "$lookback")),
+    ),
+    "price_channels": FeatureSpec(
+        ("high", "low"), (("rolling_max", "high", "$window"), ("rolling_min", "low", "$window")),
+    ),
+    "session_phase": FeatureSpec(("datetime",), (_CAL,), discrete=True),
+    "day_of_week": FeatureSpec(("datetime",), (_CAL,), discrete=True),
+    "week_of_month": FeatureSpec(("datetime",), (_CAL,), discrete=True),
+    "market_hours": FeatureSpec(("datetime",), discrete=True),
+    "intraday_mean_reversion": FeatureSpec(("datetime", "$column"), (_CAL,)),
+    "trend_strength": FeatureSpec(
+        _HLC,
+        (
+            _TR, ("rolling_mean", "true_range", "$window"),
+            ("rolling_max", "high", "$window"), ("rolling_min", "low", "$window"),
+        ),
+    ),
+    "market_regime": FeatureSpec(
+        ("$column",), (("rolling_std", "$column", "$window"),), discrete=True,
+    ),
+    "volatility_regime": FeatureSpec(
+        _HLC, (_TR, ("rolling_mean", "true_range", "$window")), discrete=True,
+    ),
+    "risk_adjusted_return": FeatureSpec(
+        _HLC, (_TR, ("rolling_mean", "true_range", "$window"), ("returns", "close")),
+    ),
+    "max_drawdown_risk": FeatureSpec(
+        ("$column",),
+        (("rolling_max", "$column", "$window", 1), ("rolling_min", "$column", "$window", 1)),
+    ),
+    "sharpe_estimate": FeatureSpec(
+        ("$column",),
+        (
+            ("returns", "$column"),
+            ("rolling_mean", "returns:$column", "$window"),
+            ("rolling_std", "returns:$column", "$window"),
+        ),
+    ),
+    "risk_on_off": FeatureSpec(discrete=True),
+    "higher_tf_trend": FeatureSpec(("$column",), (("rolling_mean", "$column", "$window"),)),
+    "daily_range_position": FeatureSpec(("datetime", "high", "low", "$column"), (_CAL,)),
+    "weekly_momentum": FeatureSpec(("$column",)),
+    "price_clusters": FeatureSpec(("$column",), discrete=True),
+    "anomaly_score": FeatureSpec(("$column",), discrete=True),
+    "regime_probability": FeatureSpec(("$column",)),
+    "forecast_error": FeatureSpec(("$column",), (("rolling_mean", "$column", "$window"),)),
+    "delta_points": FeatureSpec(("close",)),
+}
+
+
+# Modo dtype="float32": as features são calculadas em float64 (pandas/kernels
+# acumulam em float64) e a saída é arredondada para float32 uma única vez; as
+# discretas (`FeatureSpec.discrete`) viram int8 (exatas). Tolerância (rtol, atol)
+# frente ao modo float64: meio ulp de float32 por padrão; features que leem a
+# saída float32 de outra feature herdam o erro da dependência.
+FLOAT32_RTOL = 2.0 ** -24
+FLOAT32_TOLERANCES: Dict[str, Tuple[float, float]] = {
+    # média rolling de stoch_k (escala 0-100) já arredondado: erro absoluto
+    "stoch_d": (FLOAT32_RTOL, 1e-5),
+}
+
+
+def _substitute(token: Any, eff: Dict[str, Any]) -> Any:
+    """Resolve um token "$param" (ou "prefixo:$param") com os parâmetros efetivos."""
+    if isinstance(token, str) and "$" in token:
+        head, _, name = token.partition("$")
+        value = eff.get(name)
+        return f"{head}{value}" if head else value
+    return token
+
+
+def _copy_on_write_active() -> bool:
+    """Copy-on-write do pandas ativo (sempre a partir do 3.0; opcional no 2.x)."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+@functools.lru_cache(maxsize=None)
+def _source_digest(path: str) -> str:
+    """Hash do arquivo-fonte de um módulo (memoizado por caminho)."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def _code_version() -> str:
+    """
+    Versão do código de cálculo para o cache: fontes deste módulo, dos kernels,
+    do formato do cache e dos calendários, mais as versões de pandas/numpy/numba.
+    """
+    sources = ":".join(
+        _source_digest(path)
+        for path in (__file__, kernels.__file__, feature_cache_module.__file__, calendar_module.__file__)
+    )
+    return f"{sources}:{pd.__version__}:{np.__version__}:{nb.__version__}"
+
+
+def _func_version(func: Callable) -> str:
+    """
+    Versão de uma feature registrada fora do núcleo: fonte do módulo inteiro
+    que a define (helpers do mesmo arquivo invalidam o cache), ou a fonte da
+    própria função quando o módulo não tem arquivo.
+    """
+    target = inspect.unwrap(func)
+    try:
+        return _source_digest(inspect.getsourcefile(target)) + ":" + target.__qualname__
+    except (OSError, TypeError, AttributeError):
+        pass
+    try:
+        return hashlib.sha256(inspect.getsource(target).encode()).hexdigest()[:16]
+    except (OSError, TypeError):
+        return getattr(func, "__qualname__", repr(func))
+
+
+def _intermediate_key(kind: str, *args: Any) -> Tuple[Any, ...]:
+    """Normaliza a chave de um intermediário (min_periods=None equivale a window)."""
+    if kind in _ROLLING_KINDS:
+        source, window = args[0], int(args[1])
+        min_periods = args[2] if len(args) > 2 and args[2] is not None else window
+        return (kind, source, window, int(min_periods))
+    return (kind,) + tuple(args)
+
+
+class _IntermediateCache:
+    """
+    Memo de intermediários compartilhados, válido durante um único calculate_all.
+
+    Só atende DataFrames registrados (o frame de trabalho do cálculo e derivados
+    com colunas de dependência); chamadas diretas às funções `_calc_*` fora do
+    cálculo ignoram o cache. Cada intermediário é liberado assim que a última
+    feature que o declara é concluída.
+    """
+
+    def __init__(self, df: pd.DataFrame, consumers: Dict[Tuple[Any, ...], int]):
+        self._frames = {id(df)}
+        self._store: Dict[Tuple[Any, ...], Any] = {}
+        self._pending = dict(consumers)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[Any, ...], threading.Lock] = {}
+        self.computed = 0
+        self.reused = 0
+
+    def register(self, df: pd.DataFrame) -> None:
+        with self._lock:
+            self._frames.add(id(df))
+
+    def owns(self, df: pd.DataFrame) -> bool:
+        return id(df) in self._frames
+
+    def wants(self, key: Tuple[Any, ...]) -> bool:
+        with self._lock:
+            return self._pending.get(key, 0) > 0 and key not in self._store
+
+    def put(self, key: Tuple[Any, ...], value: Any) -> None:
+        with self._lock:
+            if key not in self._store:
+                self._store[key] = value
+                self.computed += 1
+
+    def get(self, key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+        # Trava por chave: threads que pedem o mesmo intermediário esperam o
+        # primeiro cálculo em vez de repeti-lo; chaves distintas não se bloqueiam.
+        with self._lock:
+            if key in self._store:
+                self.reused += 1
+                return self._store[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._store:
+                    self.reused += 1
+                    return self._store[key]
+            value = compute()
+            with self._lock:
+                self._store[key] = value
+                self.computed += 1
+        return value
+
+    def release(self, keys: List[Tuple[Any, ...]]) -> None:
+        with self._lock:
+            for key in keys:
+                left = self._pending.get(key, 0) - 1
+                self._pending[key] = left
+                if left <= 0:
+                    self._store.pop(key, None)
+                    self._key_locks.pop(key, None)
+
+
+# ======================== EXECUÇÃO EM PROCESSOS ===============================
+
+class _SharedFrame:
+    """
+    Colunas numéricas/datetime de um DataFrame copiadas uma única vez para
+    memória compartilhada; `spec` é enviado aos workers, que montam um frame
+    somente-leitura sobre os mesmos buffers (sem cópia por worker).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._segments: List[shared_memory.SharedMemory] = []
+        columns = []
+        for col in df.columns:
+            arr = df[col].to_numpy()
+            if arr.dtype.kind in "biufmM":
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+                self._segments.append(shm)
+                columns.append((col, shm.name, arr.dtype.str, arr.shape))
+            else:
+                columns.append((col, None, None, arr))
+        self.spec = {"columns": columns, "index": df.index}
+
+    def close(self) -> None:
+        for shm in self._segments:
+            shm.close()
+            shm.unlink()
+        self._segments = []
+
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_feature_worker(
+    spec: Dict[str, Any], engine: str, debug: bool, out_dtype: str = "float64",
+    calendar: Optional[TradingCalendar] = None,
+) -> None:
+    segments, data = [], {}
+    for col, name, dtype, payload in spec["columns"]:
+        if name is None:
+            data[col] = payload
+            continue
+        shm = shared_memory.SharedMemory(name=name)
+        arr = np.ndarray(payload, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        segments.append(shm)
+        data[col] = arr
+    _WORKER["segments"] = segments
+    _WORKER["frame"] = pd.DataFrame(data, index=spec["index"], copy=False)
+    _WORKER["calc"] = FeatureCalculator(debug=debug, engine=engine, dtype=out_dtype, calendar=calendar)
+
+
+def _compute_feature_group(
+    group: List[str], plan: Dict[str, Any], params: Dict[str, Dict[str, Any]]
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    return _WORKER["calc"]._execute(_WORKER["frame"], plan, group, params)
+
+
 class FeatureCalculator:
     """
     Calculadora de indicadores técnicos para DataFrames padronizados Op_Trader.
@@ -82,18 +549,80 @@ class FeatureCalculator:
         calc = FeatureCalculator(debug=True)
         df_out = calc.calculate_all(df, features=[...], params={...})
         df_out = FeatureCalculator.add_time_features(df_out, modelo="ppo")  # ou modelo="mlp"
+
+    Args:
+        debug (bool): Ativa logs detalhados (DEBUG).
+        engine (str): "pandas" (padrão) ou "numba" — kernels compilados de
+            passada única para TR/ATR, retornos, média+desvio rolling e ADX.
+        n_jobs (int): Nº de workers para features independentes (1 = sequencial,
+            -1 = todos os núcleos).
+        backend (str): "threads" (níveis do DAG em paralelo, cache de
+            intermediários compartilhado) ou "processes" (grupos independentes
+            sobre colunas em memória compartilhada). Em paralelo, só
+            dependências declaradas em `FeatureSpec.depends_on` são visíveis.
+        cache_dir (str, opcional): Ativa o cache em disco de features
+            (`FeatureCache`): saídas são reaproveitadas quando colunas de
+            entrada, parâmetros efetivos e versão do código coincidem.
+        cache_max_bytes (int): Limite do cache em disco (descarte LRU).
+        dtype (str): "float64" (padrão) ou "float32" — saídas contínuas em
+            float32 e discretas em int8 (ver `FLOAT32_TOLERANCES`).
+        calendar (TradingCalendar, opcional): Agenda do instrumento; em
+            market_hours, candles fora dela recebem -1.
     """
 
-    def __init__(self, debug: bool = False):
+    SUPPORTED_ENGINES = ("pandas", "numba")
+    SUPPORTED_BACKENDS = ("threads", "processes")
+    SUPPORTED_DTYPES = ("float64", "float32")
+
+    def __init__(
+        self,
+        debug: bool = False,
+        engine: str = "pandas",
+        n_jobs: int = 1,
+        backend: str = "threads",
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        dtype: str = "float64",
+        calendar: Optional[TradingCalendar] = None,
+    ):
+        if engine not in self.SUPPORTED_ENGINES:
+            raise ValueError(f"Engine '{engine}' não suportado. Escolha um dos: {self.SUPPORTED_ENGINES}")
+        if dtype not in self.SUPPORTED_DTYPES:
+            raise ValueError(f"dtype '{dtype}' não suportado. Escolha um dos: {self.SUPPORTED_DTYPES}")
+        if backend not in self.SUPPORTED_BACKENDS:
+            raise ValueError(f"Backend '{backend}' não suportado. Escolha um dos: {self.SUPPORTED_BACKENDS}")
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        if not isinstance(n_jobs, int) or n_jobs < 1:
+            raise ValueError(f"n_jobs deve ser inteiro >= 1 ou -1, recebido: {n_jobs}")
+        self.engine = engine
+        self.dtype = dtype
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.calendar = calendar
         self.logger = get_logger("op_trader.feature_calculator", "DEBUG" if debug else None)
         self.logger.propagate = False
         self._registry: Dict[str, Callable] = {}
+        self._specs: Dict[str, FeatureSpec] = {}
+        self._unspecified: set = set()
         self._last_metadata: Dict[str, Any] = {}
+        self._cache: Optional[_IntermediateCache] = None
+        self.feature_cache = FeatureCache(cache_dir, cache_max_bytes, debug) if cache_dir else None
         self.debug = debug
         self._register_core_features()
 
-    def register_feature(self, name: str, func: Callable):
+    def register_feature(self, name: str, func: Callable, spec: Optional[FeatureSpec] = None):
+        """
+        Registra uma feature. `spec` declara entradas, intermediários e
+        dependências para o planejador; sem ela a feature roda isolada e, no
+        modo sequencial, enxerga as colunas das features calculadas antes dela.
+        """
         self._registry[name] = func
+        self._specs[name] = spec or FeatureSpec()
+        if spec is None:
+            self._unspecified.add(name)
+        else:
+            self._unspecified.discard(name)
         self.logger.debug(f"Feature registrada: {name}")
 
     def list_available_features(self) -> List[str]:
@@ -107,52 +636,582 @@ class FeatureCalculator:
         df: pd.DataFrame,
         features: Optional[List[str]] = None,
         params: Optional[Dict[str, Dict[str, Any]]] = None,
+        features_only: bool = False,
     ) -> pd.DataFrame:
         """
         Calcula todas as features requisitadas no DataFrame, com barra de progresso padrão Op_Trader.
+
+        A execução segue o plano do DAG (`build_plan`): dependências são
+        calculadas antes de quem as consome e intermediários compartilhados
+        (true range, extremos/médias/desvios rolling, retornos, EMAs) são
+        computados uma única vez por chamada.
+
+        As saídas são coletadas como arrays e montadas em um único bloco ao
+        final (sem inserção coluna a coluna nem cópia prévia do `df`).
+
+        Com `cache_dir`, features cuja chave (hash das colunas de entrada,
+        parâmetros efetivos, dependências e versão do código) já está no cache
+        em disco não são recalculadas; as demais são gravadas ao final.
+
+        Args:
+            df: DataFrame de entrada (não é modificado).
+            features: Features a calcular (padrão: todas registradas).
+            params: Parâmetros por feature.
+            features_only: Se True, retorna apenas as colunas de feature (mesmo
+                índice de `df`), sem replicar as colunas de entrada.
         """
         if not isinstance(df, pd.DataFrame) or df.empty:
             raise ValueError("DataFrame vazio ou inválido.")
 
         features_to_calc = features or self.list_available_features()
-        out_df = df.copy()
-        log_feats: List[str] = []
-        calc_params: Dict[str, Any] = {}
+        params = params or {}
+        plan = self.build_plan(features_to_calc, params)
 
         # Barra de progresso (exibe somente se não estiver em modo silencioso)
         barra = tqdm(
-            features_to_calc,
+            total=len(plan["order"]),
             desc="[Op_Trader] Calculando features",
             unit="feature",
             disable=False, # self.debug,  # Exibe só em debug, se quiser sempre visível, troque para False
             leave=True,
             # ncols=80
         )
+        keys = self._cache_keys(df, plan, params) if self.feature_cache else {}
+        cached = {}
+        for feat, key in keys.items():
+            hit = self.feature_cache.load(key, df.index)
+            if hit is not None:
+                cached[feat] = hit
+        try:
+            if self.n_jobs > 1:
+                results, stats = self._execute_parallel(df, plan, params, barra, cached)
+            else:
+                results, stats = self._execute(df, plan, plan["order"], params, barra, sequential=True, cached=cached)
+        finally:
+            barra.close()
+        cache_stats = self._store_cached(df, keys, cached, results)
+        out_df = self._assemble(df, results, plan, features_only)
+
+        log_feats = [f for f in plan["order"] if f in results and f not in plan["hidden"]]
+        calc_params = {f: params.get(f, {}) for f in log_feats}
+        self._last_metadata = {
+            "features": log_feats,
+            "params": calc_params,
+            "plan": {"order": plan["order"], "hidden": plan["hidden"], "shared": plan["shared"]},
+            "intermediates": stats,
+            "cache": cache_stats,
+        }
+        self.logger.info(f"Features calculadas: {log_feats}")
+        self.logger.debug(f"Intermediários: {stats} (compartilhados: {len(plan['shared'])})")
+        if self.feature_cache:
+            self.logger.info(f"Cache de features: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        return out_df
+
+    # ======================== EXECUÇÃO ========================================
+    def _compute_feature(self, feat: str, frame: pd.DataFrame, feat_params: Dict[str, Any]) -> Any:
+        func = self._registry.get(feat)
+        if func is None:
+            self.logger.warning(f"Feature '{feat}' não registrada. Ignorando.")
+            return None
+        self.logger.debug(f"Cálculo '{feat}' params={feat_params}")
+        result = func(frame, **feat_params)
+        if self.dtype == "float64":
+            return result
+        discrete = self._specs.get(feat, FeatureSpec()).discrete
+        if isinstance(result, pd.Series):
+            return self._downcast(result, discrete)
+        if isinstance(result, pd.DataFrame):
+            return pd.DataFrame({c: self._downcast(result[c], discrete) for c in result.columns}, copy=False)
+        return result
+
+    @staticmethod
+    def _downcast(values: pd.Series, discrete: bool) -> pd.Series:
+        """Aplica a política float32: discretas sem NaN e dentro de [-128, 127] → int8, floats → float32."""
+        if not isinstance(values.dtype, np.dtype) or values.dtype.kind not in "iuf":
+            return values
+        if discrete and len(values) and values.notna().all() and -128 <= values.min() and values.max() <= 127:
+            return values.astype(np.int8)
+        if values.dtype.kind == "f":
+            return values.astype(np.float32)
+        return values
 
-        for feat in barra:
+    @staticmethod
+    def _result_columns(feat: str, result: Any) -> Dict[str, pd.Series]:
+        if isinstance(result, pd.Series):
+            return {feat: result}
+        if isinstance(result, pd.DataFrame):
+            return {col: result[col] for col in result.columns}
+        raise ValueError(f"Feature '{feat}' retornou tipo inválido: {type(result)}")
+
+    def _dependency_frame(
+        self, frame: pd.DataFrame, feat: str, results: Dict[str, Any], deps: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Frame de trabalho de `feat`: `frame` + colunas das dependências (declaradas ou `deps`)."""
+        if deps is None:
+            deps = [d for d in self._specs.get(feat, FeatureSpec()).depends_on if d in results]
+        if not deps:
+            return frame
+        columns: Dict[str, pd.Series] = {}
+        for dep in deps:
+            columns.update(self._result_columns(dep, results[dep]))
+        work = frame.assign(**columns)
+        self._cache.register(work)
+        return work
+
+    def _execute(
+        self,
+        frame: pd.DataFrame,
+        plan: Dict[str, Any],
+        order: List[str],
+        params: Dict[str, Dict[str, Any]],
+        progress: Optional[tqdm] = None,
+        sequential: bool = False,
+        cached: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """
+        Executa `order` sequencialmente sobre `frame` com cache de intermediários.
+
+        Cada feature recebe as colunas das dependências declaradas. Com
+        `sequential=True` (chamada direta de calculate_all), features
+        registradas sem spec recebem também as saídas visíveis anteriores,
+        como na antiga inserção coluna a coluna. Features presentes em
+        `cached` (hits do cache em disco) não são recalculadas.
+        """
+        results: Dict[str, Any] = {}
+        cached = cached or {}
+        self._cache = _IntermediateCache(frame, plan["consumers"])
+        try:
+            for feat in order:
+                if feat in cached:
+                    result = cached[feat]
+                else:
+                    deps = None
+                    if sequential and feat in self._unspecified:
+                        deps = [f for f in results if f not in plan["hidden"]]
+                    work = self._dependency_frame(frame, feat, results, deps)
+                    result = self._compute_feature(feat, work, params.get(feat, {}))
+                self._cache.release(plan["intermediates"].get(feat, []))
+                if progress is not None:
+                    progress.update(1)
+                    progress.set_postfix_str(feat)
+                if result is not None:
+                    results[feat] = result
+            stats = {"computed": self._cache.computed, "reused": self._cache.reused}
+        finally:
+            self._cache = None
+        return results, stats
+
+    def _execute_parallel(
+        self,
+        frame: pd.DataFrame,
+        plan: Dict[str, Any],
+        params: Dict[str, Dict[str, Any]],
+        progress: tqdm,
+        cached: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        if self.backend == "threads":
+            return self._execute_threads(frame, plan, params, progress, cached or {})
+        return self._execute_processes(frame, plan, params, progress, cached or {})
+
+    def _execute_threads(
+        self,
+        frame: pd.DataFrame,
+        plan: Dict[str, Any],
+        params: Dict[str, Dict[str, Any]],
+        progress: tqdm,
+        cached: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Cada nível do DAG roda em paralelo; intermediários vêm do cache compartilhado."""
+        results: Dict[str, Any] = {}
+        self._cache = _IntermediateCache(frame, plan["consumers"])
+        try:
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+                for level in self.plan_levels(plan):
+                    for feat in level:
+                        if feat in cached:
+                            results[feat] = cached[feat]
+                            self._cache.release(plan["intermediates"].get(feat, []))
+                            progress.update(1)
+                    level = [f for f in level if f not in cached]
+                    futures = {
+                        pool.submit(
+                            self._compute_feature, feat,
+                            self._dependency_frame(frame, feat, results), params.get(feat, {}),
+                        ): feat
+                        for feat in level
+                    }
+                    for future in as_completed(futures):
+                        feat = futures[future]
+                        result = future.result()
+                        self._cache.release(plan["intermediates"].get(feat, []))
+                        if result is not None:
+                            results[feat] = result
+                        progress.update(1)
+                        progress.set_postfix_str(feat)
+            stats = {"computed": self._cache.computed, "reused": self._cache.reused}
+        finally:
+            self._cache = None
+        return results, stats
+
+    def _execute_processes(
+        self,
+        frame: pd.DataFrame,
+        plan: Dict[str, Any],
+        params: Dict[str, Dict[str, Any]],
+        progress: tqdm,
+        cached: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """
+        Grupos independentes (sem intermediários nem dependências em comum)
+        rodam em processos que leem as colunas de entrada de memória
+        compartilhada. Grupos com features registradas fora do núcleo rodam
+        no processo atual, pois as funções podem não ser serializáveis.
+        Grupos inteiramente no cache em disco não são enviados aos workers.
+        """
+        results: Dict[str, Any] = {}
+        stats = {"computed": 0, "reused": 0}
+        remote, local = [], []
+        for group in self.plan_groups(plan):
+            if all(f in cached for f in group):
+                results.update({f: cached[f] for f in group})
+                progress.update(len(group))
+                continue
+            core = all(self._registry.get(f) == self.feature_funcs.get(f) for f in group)
+            (remote if core else local).append(group)
+
+        def merge(group_results: Dict[str, Any], group_stats: Dict[str, int], group: List[str]):
+            results.update(group_results)
+            for key in stats:
+                stats[key] += group_stats[key]
+            progress.update(len(group))
+            progress.set_postfix_str(group[-1])
+
+        if remote:
+            shared = _SharedFrame(frame)
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.n_jobs, len(remote)),
+                    initializer=_init_feature_worker,
+                    initargs=(shared.spec, self.engine, self.debug, self.dtype, self.calendar),
+                ) as pool:
+                    futures = {
+                        pool.submit(_compute_feature_group, group, self._subplan(plan, group), params): group
+                        for group in remote
+                    }
+                    for future in as_completed(futures):
+                        merge(*future.result(), futures[future])
+            finally:
+                shared.close()
+        for group in local:
+            merge(*self._execute(frame, self._subplan(plan, group), group, params, cached=cached), group)
+        return results, stats
+
+    @staticmethod
+    def _subplan(plan: Dict[str, Any], group: List[str]) -> Dict[str, Any]:
+        keys = {k for f in group for k in plan["intermediates"].get(f, [])}
+        return {
+            "hidden": [f for f in plan["hidden"] if f in group],
+            "intermediates": {f: plan["intermediates"][f] for f in group if f in plan["intermediates"]},
+            "consumers": {k: n for k, n in plan["consumers"].items() if k in keys},
+        }
+
+    def _assemble(
+        self, df: pd.DataFrame, results: Dict[str, Any], plan: Dict[str, Any], features_only: bool = False
+    ) -> pd.DataFrame:
+        """
+        Monta as saídas visíveis (ordem do plano) em um único DataFrame a partir
+        de um dict de colunas, sem cópia dos resultados. Fora do modo
+        `features_only`, concatena uma única vez ao `df` de entrada; com
+        copy-on-write as colunas de entrada não são duplicadas, sem ele o
+        resultado é sempre uma cópia independente do `df`. Colunas de entrada
+        sobrescritas por features mantêm sua posição.
+        """
+        columns: Dict[str, Any] = {}
+        for feat in plan["order"]:
+            if feat not in results or feat in plan["hidden"]:
+                continue
+            for col, values in self._result_columns(feat, results[feat]).items():
+                columns[col] = values if values.index.equals(df.index) else values.reindex(df.index)
+        if features_only:
+            return pd.DataFrame(columns, index=df.index, copy=False)
+        overwritten = {c: columns.pop(c) for c in list(columns) if c in df.columns}
+        base = df.assign(**overwritten) if overwritten else df
+        if not columns:
+            if base is not df:
+                return base
+            # sem copy-on-write, uma cópia rasa compartilharia os buffers do chamador
+            return df.copy(deep=not _copy_on_write_active())
+        return pd.concat([base, pd.DataFrame(columns, index=df.index, copy=False)], axis=1)
+
+    # ======================== CACHE EM DISCO ==================================
+    def _cache_keys(
+        self, df: pd.DataFrame, plan: Dict[str, Any], params: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """
+        Chaves do cache em disco por feature do plano: hash das colunas de
+        entrada declaradas (todas, se a spec não declarar nenhuma), do índice,
+        dos parâmetros efetivos, das chaves das dependências e da versão do
+        código. Features sem spec não são cacheadas.
+        """
+        digests: Dict[str, str] = {}
+
+        def digest(col: str) -> Optional[str]:
+            if col not in df.columns:
+                return None
+            if col not in digests:
+                digests[col] = column_digest(df[col])
+            return digests[col]
+
+        index = index_digest(df.index)
+        keys: Dict[str, str] = {}
+        for feat in plan["order"]:
             func = self._registry.get(feat)
-            if func is None:
-                self.logger.warning(f"Feature '{feat}' não registrada. Ignorando.")
+            if func is None or feat in self._unspecified:
                 continue
-            feat_params = (params or {}).get(feat, {})
-            self.logger.debug(f"Cálculo '{feat}' params={feat_params}")
-
-            result = func(out_df, **feat_params)
-            if isinstance(result, pd.Series):
-                out_df[feat] = result
-            elif isinstance(result, pd.DataFrame):
-                for col in result.columns:
-                    out_df[col] = result[col]
-            else:
-                raise ValueError(f"Feature '{feat}' retornou tipo inválido: {type(result)}")
+            spec = self._specs[feat]
+            if any(dep not in keys for dep in spec.depends_on):
+                continue
+            eff = self.effective_params(feat, params.get(feat, {}))
+            inputs = [_substitute(t, eff) for t in spec.inputs]
+            if not spec.inputs and not spec.depends_on:
+                inputs = list(df.columns)
+            code = _code_version()
+            if func != self.feature_funcs.get(feat):
+                code += ":" + _func_version(func)
+            if feat in _CALENDAR_FEATURES and self.calendar is not None:
+                code += ":" + generate_config_hash(self.calendar.to_dict())
+            keys[feat] = generate_config_hash(
+                {
+                    "feature": feat,
+                    "params": {k: repr(v) for k, v in eff.items()},
+                    "inputs": {str(c): digest(c) for c in inputs},
+                    "index": index,
+                    "depends_on": [keys[d] for d in spec.depends_on],
+                    "engine": self.engine,
+                    "dtype": self.dtype,
+                    "version": code,
+                },
+                length=32,
+            )
+        return keys
+
+    def _store_cached(
+        self, df: pd.DataFrame, keys: Dict[str, str], cached: Dict[str, Any], results: Dict[str, Any]
+    ) -> Dict[str, int]:
+        """Grava no cache as features recalculadas e aplica o descarte LRU; retorna hits/misses."""
+        hits = sum(1 for f in cached if results.get(f) is cached[f])
+        misses = 0
+        for feat, key in keys.items():
+            if feat not in results or results[feat] is cached.get(feat):
+                continue
+            misses += 1
+            self.feature_cache.store(key, feat, results[feat], df.index)
+        if misses:
+            self.feature_cache.evict()
+        return {"hits": hits, "misses": misses}
+
+    # ======================== PLANEJADOR (DAG) ================================
+    def build_plan(
+        self, features: List[str], params: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Monta o plano de execução a partir das `FeatureSpec` registradas.
+
+        Returns:
+            dict com:
+              - order: features em ordem topológica (dependências primeiro,
+                respeitando a ordem pedida nos demais casos);
+              - hidden: dependências calculadas apenas como insumo (não pedidas);
+              - intermediates: {feature: [chaves de intermediários]};
+              - consumers: {chave: nº de features que a consomem};
+              - shared: intermediários com mais de um consumidor (rótulo → features).
+
+        Raises:
+            ValueError: dependência cíclica entre features.
+        """
+        params = params or {}
+        requested = set(features)
+        order: List[str] = []
+        visiting: set = set()
+
+        def visit(feat: str):
+            if feat in order:
+                return
+            if feat in visiting:
+                raise ValueError(f"Dependência cíclica envolvendo a feature '{feat}'.")
+            visiting.add(feat)
+            for dep in self._specs.get(feat, FeatureSpec()).depends_on:
+                visit(dep)
+            visiting.discard(feat)
+            order.append(feat)
+
+        for feat in features:
+            visit(feat)
+
+        intermediates: Dict[str, List[Tuple[Any, ...]]] = {}
+        users: Dict[Tuple[Any, ...], List[str]] = {}
+        for feat in order:
+            if feat not in self._registry:
+                continue
+            keys = self._resolve_intermediates(feat, params.get(feat, {}))
+            intermediates[feat] = keys
+            for key in keys:
+                users.setdefault(key, []).append(feat)
+
+        return {
+            "order": order,
+            "hidden": [f for f in order if f not in requested],
+            "intermediates": intermediates,
+            "consumers": {k: len(v) for k, v in users.items()},
+            "shared": {":".join(map(str, k)): v for k, v in users.items() if len(v) > 1},
+        }
 
-            log_feats.append(feat)
-            calc_params[feat] = feat_params
-            barra.set_postfix_str(feat)
+    def plan_levels(self, plan: Dict[str, Any]) -> List[List[str]]:
+        """Agrupa o plano por profundidade no DAG: cada nível só depende dos anteriores."""
+        depth: Dict[str, int] = {}
+        levels: List[List[str]] = []
+        for feat in plan["order"]:
+            deps = self._specs.get(feat, FeatureSpec()).depends_on
+            depth[feat] = 1 + max((depth[d] for d in deps if d in depth), default=-1)
+            if depth[feat] == len(levels):
+                levels.append([])
+            levels[depth[feat]].append(feat)
+        return levels
+
+    def plan_groups(self, plan: Dict[str, Any]) -> List[List[str]]:
+        """
+        Componentes conexos do plano: features ligadas por dependência ou por
+        intermediário compartilhado ficam no mesmo grupo (ordem do plano).
+        """
+        parent = {f: f for f in plan["order"]}
+
+        def find(f: str) -> str:
+            while parent[f] != f:
+                parent[f] = parent[parent[f]]
+                f = parent[f]
+            return f
+
+        owner: Dict[Tuple[Any, ...], str] = {}
+        for feat in plan["order"]:
+            links = [d for d in self._specs.get(feat, FeatureSpec()).depends_on if d in parent]
+            links += [owner.setdefault(k, feat) for k in plan["intermediates"].get(feat, [])]
+            for other in links:
+                parent[find(other)] = find(feat)
+
+        groups: Dict[str, List[str]] = {}
+        for feat in plan["order"]:
+            groups.setdefault(find(feat), []).append(feat)
+        return list(groups.values())
+
+    def effective_params(self, feat: str, feat_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Parâmetros efetivos da feature: defaults da assinatura + overrides."""
+        func = self._registry[feat]
+        resolved: Dict[str, Any] = {}
+        for name, p in inspect.signature(func).parameters.items():
+            if name in ("self", "df") or p.kind in (p.VAR_KEYWORD, p.VAR_POSITIONAL):
+                continue
+            if p.default is not p.empty:
+                resolved[name] = p.default
+        resolved.update(feat_params or {})
+        return resolved
+
+    def _resolve_intermediates(self, feat: str, feat_params: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+        eff = self.effective_params(feat, feat_params)
+
+        keys = []
+        for tpl in self._specs.get(feat, FeatureSpec()).intermediates:
+            resolved = [_substitute(t, eff) for t in tpl]
+            if any(v is None for v in resolved):
+                continue
+            keys.append(_intermediate_key(*resolved))
+        return keys
+
+    # ======================== INTERMEDIÁRIOS COMPARTILHADOS ===================
+    def _shared(self, df: pd.DataFrame, key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+        if self._cache is not None and self._cache.owns(df):
+            return self._cache.get(key, compute)
+        return compute()
+
+    def _source(self, df: pd.DataFrame, name: str) -> pd.Series:
+        """Resolve a fonte de um intermediário: coluna, true_range, typical_price ou returns:<col>."""
+        if name == "true_range":
+            return self._true_range(df)
+        if name == "typical_price":
+            return self._typical_price(df)
+        if name.startswith("returns:"):
+            return self._returns(df, name.split(":", 1)[1])
+        return df[name]
 
-        self._last_metadata = {"features": log_feats, "params": calc_params}
-        self.logger.info(f"Features calculadas: {log_feats}")
-        return out_df
+    @staticmethod
+    def _f64(series: pd.Series) -> np.ndarray:
+        return np.ascontiguousarray(series.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def _true_range(self, df: pd.DataFrame) -> pd.Series:
+        def compute():
+            if self.engine == "numba":
+                out = np.empty(len(df))
+                kernels.true_range(self._f64(df["high"]), self._f64(df["low"]), self._f64(df["close"]), out)
+                return pd.Series(out, index=df.index)
+            high, low, prev = df["high"], df["low"], df["close"].shift(1)
+            return pd.concat([high - low, (high - prev).abs(), (low - prev).abs()], axis=1).max(axis=1)
+        return self._shared(df, ("true_range",), compute)
+
+    def _calendar(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Campos de calendário (`calendar_fields`) da coluna datetime, calculados uma vez por cálculo."""
+        if "datetime" not in df.columns:
+            raise ValueError("Features de calendário requerem coluna datetime")
+        return self._shared(df, _CAL, lambda: calendar_fields(df["datetime"]))
+
+    def _typical_price(self, df: pd.DataFrame) -> pd.Series:
+        return self._shared(
+            df, ("typical_price",), lambda: (df["high"] + df["low"] + df["close"]) / 3
+        )
+
+    def _returns(self, df: pd.DataFrame, column: str) -> pd.Series:
+        def compute():
+            if self.engine == "numba":
+                out = np.empty(len(df))
+                kernels.pct_change(self._f64(df[column]), out)
+                return pd.Series(out, index=df.index)
+            return df[column].pct_change()
+        return self._shared(df, ("returns", column), compute)
+
+    def _ema(self, df: pd.DataFrame, column: str, span: int) -> pd.Series:
+        return self._shared(
+            df, ("ema", column, span), lambda: df[column].ewm(span=span, adjust=False).mean()
+        )
+
+    def _rolling(
+        self, df: pd.DataFrame, stat: str, source: str, window: int, min_periods: Optional[int] = None
+    ) -> pd.Series:
+        """Estatística rolling compartilhada; "mad" (desvio médio absoluto) usa sempre kernel compilado."""
+        key = _intermediate_key(f"rolling_{stat}", source, window, min_periods)
+        if self.engine == "numba" and stat in ("mean", "std"):
+            return self._shared(df, key, lambda: self._nb_mean_std(df, stat, key))
+
+        def compute():
+            kernel = _ROLLING_KERNELS.get(stat) if stat == "mad" or self.engine == "numba" else None
+            if kernel is not None:
+                out = np.empty(len(df))
+                kernel(self._f64(self._source(df, source)), window, key[3], out)
+                return pd.Series(out, index=df.index)
+            roll = self._source(df, source).rolling(window=window, min_periods=key[3])
+            return getattr(roll, stat)()
+        return self._shared(df, key, compute)
+
+    def _nb_mean_std(self, df: pd.DataFrame, stat: str, key: Tuple[Any, ...]) -> pd.Series:
+        """Média e desvio na mesma passada; o par também vai ao cache se planejado."""
+        _, source, window, min_periods = key
+        other = "std" if stat == "mean" else "mean"
+        other_key = (f"rolling_{other}", source, window, min_periods)
+        keep_other = self._cache is not None and self._cache.owns(df) and self._cache.wants(other_key)
+        n = len(df)
+        outs = {stat: np.empty(n), other: np.empty(n if keep_other else 0)}
+        x = self._f64(self._source(df, source))
+        kernels.rolling_mean_std(x, window, min_periods, outs["mean"], outs["std"])
+        if keep_other:
+            self._cache.put(other_key, pd.Series(outs[other], index=df.index))
+        return pd.Series(outs[stat], index=df.index)
 
     # ======================== REGISTRO DE FEATURES ============================
     def _register_core_features(self):
@@ -225,7 +1284,7 @@ class FeatureCalculator:
         }
         self.feature_funcs = core_funcs
         for name, func in core_funcs.items():
-            self.register_feature(name, func)
+            self.register_feature(name, func, CORE_FEATURE_SPECS.get(name))
 
     # ======================== FUNÇÕES DE FEATURE ==============================
 
@@ -236,11 +1295,11 @@ class FeatureCalculator:
 
     def _calc_ema_fast(self, df: pd.DataFrame, window: int = 20, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, f"EMA Fast[{window}]")
-        return df[column].ewm(span=window, adjust=False).mean()
+        return self._ema(df, column, window)
 
     def _calc_ema_slow(self, df: pd.DataFrame, window: int = 50, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, f"EMA Slow[{window}]")
-        return df[column].ewm(span=window, adjust=False).mean()
+        return self._ema(df, column, window)
 
     def _calc_rsi(self, df: pd.DataFrame, window: int = 14, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, f"RSI[{window}]")
@@ -257,32 +1316,27 @@ class FeatureCalculator:
         span_signal: int = 9, column: str = "close", **kwargs
     ) -> pd.Series:
         self._require_cols(df, {column}, "MACD")
-        ema_short = df[column].ewm(span=span_short, adjust=False).mean()
-        ema_long = df[column].ewm(span=span_long, adjust=False).mean()
+        ema_short = self._ema(df, column, span_short)
+        ema_long = self._ema(df, column, span_long)
         macd_line = ema_short - ema_long
         signal_line = macd_line.ewm(span=span_signal, adjust=False).mean()
         return macd_line - signal_line
 
     def _calc_atr(self, df: pd.DataFrame, window: int = 14, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low", "close"}, "ATR")
-        high, low, prev = df["high"], df["low"], df["close"].shift(1)
-        tr1 = high - low
-        tr2 = (high - prev).abs()
-        tr3 = (low - prev).abs()
-        true_range = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        return true_range.rolling(window=window, min_periods=window).mean()
+        return self._rolling(df, "mean", "true_range", window)
 
     def _calc_bb_width(self, df: pd.DataFrame, window: int = 20, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "BB Width")
-        ma = df[column].rolling(window=window).mean()
-        std = df[column].rolling(window=window).std()
+        ma = self._rolling(df, "mean", column, window)
+        std = self._rolling(df, "std", column, window)
         upper = ma + 2 * std
         lower = ma - 2 * std
         return upper - lower
 
     def _calc_return_pct(self, df: pd.DataFrame, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Return %")
-        return df[column].pct_change()
+        return self._returns(df, column)
 
     def _calc_candle_direction(self, df: pd.DataFrame, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Candle Direction")
@@ -292,12 +1346,12 @@ class FeatureCalculator:
 
     def _calc_volume_relative(self, df: pd.DataFrame, window: int = 20, column: str = "volume", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Volume Relative")
-        mean_vol = df[column].rolling(window=window).mean()
+        mean_vol = self._rolling(df, "mean", column, window)
         return df[column] / (mean_vol.replace(0, np.nan))
 
     def _calc_pullback(self, df: pd.DataFrame, window: int = 20, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Pullback")
-        ma = df[column].rolling(window=window).mean()
+        ma = self._rolling(df, "mean", column, window)
         return df[column] - ma
 
     def _calc_hammer_pattern(self, df: pd.DataFrame, window: int = 5, **kwargs) -> pd.Series:
@@ -328,16 +1382,14 @@ class FeatureCalculator:
 
     def _calc_williams_r(self, df: pd.DataFrame, window: int = 14, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low", "close"}, "Williams %R")
-        high_roll = df["high"].rolling(window)
-        low_roll = df["low"].rolling(window)
-        highest_high = high_roll.max()
-        lowest_low = low_roll.min()
+        highest_high = self._rolling(df, "max", "high", window)
+        lowest_low = self._rolling(df, "min", "low", window)
         return -100 * (highest_high - df["close"]) / (highest_high - lowest_low)
 
     def _calc_stoch_k(self, df: pd.DataFrame, window: int = 14, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low", "close"}, "Stochastic %K")
-        lowest_low = df["low"].rolling(window=window).min()
-        highest_high = df["high"].rolling(window=window).max()
+        lowest_low = self._rolling(df, "min", "low", window)
+        highest_high = self._rolling(df, "max", "high", window)
         return 100 * (df["close"] - lowest_low) / (highest_high - lowest_low)
 
     def _calc_stoch_d(self, df: pd.DataFrame, window: int = 3, **kwargs) -> pd.Series:
@@ -346,45 +1398,30 @@ class FeatureCalculator:
 
     def _calc_adx(self, df: pd.DataFrame, window: int = 14, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low", "close"}, "ADX")
+        if self.engine == "numba":
+            out = np.empty(len(df))
+            kernels.adx(self._f64(df["high"]), self._f64(df["low"]), self._f64(df["close"]), window, out)
+            return pd.Series(out, index=df.index)
         plus_dm = df["high"].diff()
         minus_dm = df["low"].diff()
         plus_dm[plus_dm < 0] = 0
         minus_dm[minus_dm > 0] = 0
-        tr = pd.concat([
-            df["high"] - df["low"],
-            (df["high"] - df["close"].shift(1)).abs(),
-            (df["low"] - df["close"].shift(1)).abs()
-        ], axis=1).max(axis=1)
-        tr_smooth = tr.rolling(window).mean()
+        tr_smooth = self._rolling(df, "mean", "true_range", window)
         plus_di = 100 * (plus_dm.rolling(window).sum() / tr_smooth)
         minus_di = 100 * (minus_dm.abs().rolling(window).sum() / tr_smooth)
         dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
         return dx.rolling(window=window).mean()
 
-    @nb.njit
-    def _mean_deviation(values):
-        """Calcula desvio médio absoluto de forma otimizada"""
-        mean_val = np.mean(values)
-        return np.mean(np.abs(values - mean_val))
-
     def _calc_cci(self, df: pd.DataFrame, window: int = 20, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low", "close"}, "CCI")
-        
-        tp = (df["high"] + df["low"] + df["close"]) / 3
-        ma = tp.rolling(window=window).mean()
-        
-        # Versão numba - muito mais rápida
-        md = tp.rolling(window=window).apply(
-            self._mean_deviation, 
-            engine='numba', 
-            raw=True
-        )
-        
+        tp = self._typical_price(df)
+        ma = self._rolling(df, "mean", "typical_price", window)
+        md = self._rolling(df, "mad", "typical_price", window)
         return (tp - ma) / (0.015 * md)
 
     def _calc_trix(self, df: pd.DataFrame, window: int = 15, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "TRIX")
-        ema1 = df[column].ewm(span=window, adjust=False).mean()
+        ema1 = self._ema(df, column, window)
         ema2 = ema1.ewm(span=window, adjust=False).mean()
         ema3 = ema2.ewm(span=window, adjust=False).mean()
         return ema3.pct_change()
@@ -396,8 +1433,7 @@ class FeatureCalculator:
 
     def _calc_realized_vol(self, df: pd.DataFrame, window: int = 5, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Realized Vol")
-        returns = df[column].pct_change()
-        return returns.rolling(window=window).std()
+        return self._rolling(df, "std", f"returns:{column}", window)
 
     def _calc_parkinson_vol(self, df: pd.DataFrame, window: int = 10, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low"}, "Parkinson Vol")
@@ -410,15 +1446,15 @@ class FeatureCalculator:
 
     def _calc_breakout_signals(self, df: pd.DataFrame, window: int = 20, threshold: float = 0.002, **kwargs) -> pd.Series:
         self._require_cols(df, {"high", "low", "close"}, "Breakout Signals")
-        high_roll = df["high"].rolling(window=window).max()
-        low_roll = df["low"].rolling(window=window).min()
+        high_roll = self._rolling(df, "max", "high", window)
+        low_roll = self._rolling(df, "min", "low", window)
         breakout = (df["close"] >= high_roll * (1 + threshold)) | (df["close"] <= low_roll * (1 - threshold))
         return breakout.astype(int)
 
     def _calc_support_resistance(self, df: pd.DataFrame, lookback: int = 20, **kwargs) -> pd.DataFrame:
         self._require_cols(df, {"high", "low", "close"}, "Support/Resistance")
-        dist_resistance = (df["high"].rolling(window=lookback).max() - df["close"])
-        dist_support = (df["close"] - df["low"].rolling(window=lookback).min())
+        dist_resistance = (self._rolling(df, "max", "high", lookback) - df["close"])
+        dist_support = (df["close"] - self._rolling(df, "min", "low", lookback))
         return pd.DataFrame({
             "dist_resistance": dist_resistance,
             "dist_support": dist_support
@@ -428,8 +1464,7 @@ class FeatureCalculator:
         self._require_cols(df, {"high", "low", "close"}, "Pivot Points")
         high = df["high"]
         low = df["low"]
-        close = df["close"]
-        pp = (high + low + close) / 3
+        pp = self._typical_price(df)
         if method == "classic":
             r1 = (2 * pp) - low
             s1 = (2 * pp) - high
@@ -442,8 +1477,8 @@ class FeatureCalculator:
 
     def _calc_fibonacci_levels(self, df: pd.DataFrame, lookback: int = 20, **kwargs) -> pd.DataFrame:
         self._require_cols(df, {"high", "low"}, "Fibonacci Levels")
-        high = df["high"].rolling(window=lookback).max()
-        low = df["low"].rolling(window=lookback).min()
+        high = self._rolling(df, "max", "high", lookback)
+        low = self._rolling(df, "min", "low", lookback)
         diff = high - low
         fib_0 = low
         fib_236 = low + 0.236 * diff
@@ -459,63 +1494,58 @@ class FeatureCalculator:
 
     def _calc_price_channels(self, df: pd.DataFrame, window: int = 20, **kwargs) -> pd.DataFrame:
         self._require_cols(df, {"high", "low"}, "Price Channels")
-        channel_high = df["high"].rolling(window=window).max()
-        channel_low = df["low"].rolling(window=window).min()
+        channel_high = self._rolling(df, "max", "high", window)
+        channel_low = self._rolling(df, "min", "low", window)
         return pd.DataFrame({"channel_high": channel_high, "channel_low": channel_low})
 
     def _calc_session_phase(self, df: pd.DataFrame, bins: int = 3, **kwargs) -> pd.Series:
         # Dummy implementation: divida o dia em 'bins' partes (melhore conforme sua regra real)
         if "datetime" not in df.columns:
             raise ValueError("session_phase requer coluna datetime")
-        minutes = pd.to_datetime(df["datetime"]).dt.hour * 60 + pd.to_datetime(df["datetime"]).dt.minute
+        cal = self._calendar(df)
+        minutes = pd.Series(_calendar_values(cal, cal["minute"]), index=df.index)
         phase = pd.cut(minutes, bins, labels=False)
         return phase
 
     def _calc_day_of_week(self, df: pd.DataFrame, format: str = "int", **kwargs) -> pd.Series:
         if "datetime" not in df.columns:
             raise ValueError("day_of_week requer coluna datetime")
-        dow = pd.to_datetime(df["datetime"]).dt.dayofweek
+        cal = self._calendar(df)
+        dow = pd.Series(_calendar_values(cal, cal["dow"].astype(np.int32)), index=df.index)
         return dow if format == "int" else dow.astype(str)
 
     def _calc_week_of_month(self, df: pd.DataFrame, mode: str = "simple", **kwargs) -> pd.Series:
         if "datetime" not in df.columns:
             raise ValueError("week_of_month requer coluna datetime")
-        days = pd.to_datetime(df["datetime"]).dt.day
-        return ((days - 1) // 7 + 1).astype(int)
+        cal = self._calendar(df)
+        return pd.Series(_calendar_values(cal, (cal["dom"] - 1) // 7 + 1), index=df.index)
 
     def _calc_market_hours(self, df: pd.DataFrame, session: str = "london,newyork,tokyo", **kwargs) -> pd.Series:
-        # Implementação simplificada, ajuste conforme necessidade
         if "datetime" not in df.columns:
             raise ValueError("market_hours requer coluna datetime")
-        hours = pd.to_datetime(df["datetime"]).dt.hour
-        return pd.Series(
-            np.select(
-                [
-                    (hours >= 8) & (hours < 16),   # London
-                    (hours >= 14) & (hours < 23),  # New York
-                    (hours >= 0) & (hours < 9)     # Tokyo
-                ],
-                [0, 1, 2], -1
-            ),
-            index=df.index
-        )
+        return pd.Series(market_hours_codes(df["datetime"], session, self.calendar), index=df.index)
+
+    def _day_groups(self, df: pd.DataFrame) -> np.ndarray:
+        """Chave de agrupamento por dia (dias desde epoch; NaN em NaT, fora dos grupos)."""
+        cal = self._calendar(df)
+        return _calendar_values(cal, cal["day"])
+
     def _calc_intraday_mean_reversion(self, df: pd.DataFrame, window: int = 20, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Intraday Mean Reversion")
-        day = pd.to_datetime(df["datetime"]).dt.date
-        group = df[column].groupby(day)
+        group = df[column].groupby(self._day_groups(df))
         mean = group.transform("mean")
         return df[column] - mean
 
     def _calc_trend_strength(self, df: pd.DataFrame, window: int = 14, **kwargs) -> pd.Series:
         atr = self._calc_atr(df, window=window)
-        high = df["high"].rolling(window=window).max()
-        low = df["low"].rolling(window=window).min()
+        high = self._rolling(df, "max", "high", window)
+        low = self._rolling(df, "min", "low", window)
         return (high - low) / atr
 
     def _calc_market_regime(self, df: pd.DataFrame, method: str = "std", window: int = 14, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Market Regime")
         if method == "std":
-            std = df[column].rolling(window=window).std()
+            std = self._rolling(df, "std", column, window)
             return (std > std.mean()).astype(int)
         return pd.Series(0, index=df.index)
 
@@ -528,20 +1558,19 @@ class FeatureCalculator:
     def _calc_risk_adjusted_return(self, df: pd.DataFrame, window: int = 14, **kwargs) -> pd.Series:
         atr = self._calc_atr(df, window=window)
         self._require_cols(df, {"close"}, "Risk Adjusted Return")
-        ret = df["close"].pct_change()
+        ret = self._returns(df, "close")
         return ret / (atr + 1e-8)
 
     def _calc_max_drawdown_risk(self, df: pd.DataFrame, window: int = 20, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Max Drawdown Risk")
-        roll_max = df[column].rolling(window=window, min_periods=1).max()
-        roll_min = df[column].rolling(window=window, min_periods=1).min()
+        roll_max = self._rolling(df, "max", column, window, min_periods=1)
+        roll_min = self._rolling(df, "min", column, window, min_periods=1)
         return (roll_max - roll_min) / roll_max
 
     def _calc_sharpe_estimate(self, df: pd.DataFrame, window: int = 20, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Sharpe Estimate")
-        returns = df[column].pct_change()
-        mean = returns.rolling(window=window).mean()
-        std = returns.rolling(window=window).std()
+        mean = self._rolling(df, "mean", f"returns:{column}", window)
+        std = self._rolling(df, "std", f"returns:{column}", window)
         return mean / (std + 1e-8)
 
     def _calc_risk_on_off(self, df: pd.DataFrame, **kwargs) -> pd.Series:
@@ -551,13 +1580,13 @@ class FeatureCalculator:
     def _calc_higher_tf_trend(self, df: pd.DataFrame, tf: str = "H1", window: int = 10, column: str = "close", **kwargs) -> pd.Series:
         # Dummy para exemplo: tendência do rolling window
         self._require_cols(df, {column}, "Higher TF Trend")
-        return df[column].rolling(window=window).mean().diff().apply(np.sign)
+        return self._rolling(df, "mean", column, window).diff().apply(np.sign)
 
     def _calc_daily_range_position(self, df: pd.DataFrame, lookback: int = 1, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Daily Range Position")
-        day = pd.to_datetime(df["datetime"]).dt.date
-        high = df.groupby(day)["high"].transform("max")
-        low = df.groupby(day)["low"].transform("min")
+        day = self._day_groups(df)
+        high = df["high"].groupby(day).transform("max")
+        low = df["low"].groupby(day).transform("min")
         return (df[column] - low) / (high - low + 1e-8)
 
     def _calc_weekly_momentum(self, df: pd.DataFrame, lag: int = 5, column: str = "close", **kwargs) -> pd.Series:
@@ -583,7 +1612,7 @@ class FeatureCalculator:
     def _calc_forecast_error(self, df: pd.DataFrame, method: str = "rolling_mean", window: int = 5, column: str = "close", **kwargs) -> pd.Series:
         self._require_cols(df, {column}, "Forecast Error")
         if method == "rolling_mean":
-            pred = df[column].rolling(window=window).mean()
+            pred = self._rolling(df, "mean", column, window)
             return df[column] - pred
         return pd.Series(0, index=df.index)
 
@@ -639,8 +1668,8 @@ class FeatureCalculator:
         # Adiciona colunas de time/ciclo para downstream (exemplo simples)
         df = df.copy()
         if "datetime" in df.columns:
-            dt = pd.to_datetime(df["datetime"])
-            df["bar_of_day"] = dt.dt.hour * 12 + dt.dt.minute // 5  # exemplo M5
+            cal = calendar_fields(df["datetime"])
+            df["bar_of_day"] = _calendar_values(cal, cal["minute"] // 5)  # exemplo M5
             df["sin_time"] = np.sin(2 * np.pi * df["bar_of_day"] / 288)
             df["cos_time"] = np.cos(2 * np.pi * df["bar_of_day"] / 288)
         return df
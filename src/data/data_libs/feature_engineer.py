@@ -14,6 +14,7 @@ Data: 2025-06-14
 
 from typing import List, Dict, Optional
 from src.data.data_libs.feature_calculator import FeatureCalculator
+from src.data.data_libs.trading_calendar import TradingCalendar
 from src.utils.logging_utils import get_logger
 
 class FeatureEngineer:
@@ -29,6 +30,9 @@ class FeatureEngineer:
         features: List[str],
         params: Optional[Dict[str, Dict[str, any]]] = None,
         debug: bool = False,
+        cache_dir: Optional[str] = None,
+        dtype: str = "float64",
+        calendar: Optional[TradingCalendar] = None,
     ):
         """
         Parâmetros
@@ -44,10 +48,21 @@ class FeatureEngineer:
             }
         debug : bool, opcional
             Ativa log detalhado para troubleshooting.
+        cache_dir : str, opcional
+            Diretório do cache em disco de features (FeatureCache). Features
+            com mesmas entradas e parâmetros são reaproveitadas entre execuções.
+        dtype : str, opcional
+            "float64" (padrão) ou "float32": features contínuas em float32 e
+            discretas (flags, padrões, calendário) em int8.
+        calendar : TradingCalendar, opcional
+            Agenda do instrumento repassada ao FeatureCalculator (market_hours).
         """
         self.features = features
         self.params = params or {}
         self.debug = debug
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self.calendar = calendar
         self.logger = get_logger("op_trader.feature_engineer", "DEBUG" if debug else None)
 
     def transform(self, df):
@@ -67,7 +82,9 @@ class FeatureEngineer:
         self.logger.info(f"Calculando features: {self.features}")
         if self.debug:
             self.logger.debug(f"Parâmetros de features: {self.params}")
-        calculator = FeatureCalculator(debug=self.debug)
+        calculator = FeatureCalculator(
+            debug=self.debug, cache_dir=self.cache_dir, dtype=self.dtype, calendar=self.calendar
+        )
         return calculator.calculate_all(
             df,
             features=self.features,
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/feature_kernels.py
+
+Kernels numba do FeatureCalculator (engine="numba") e da detecção de
+outliers rolling do OutlierGapCorrector.
+
+Cada kernel percorre arrays float64 contíguos uma única vez e escreve em
+colunas de saída pré-alocadas pelo chamador. As janelas rolling reproduzem a
+semântica do pandas (NaN ignorado na contagem, `min_periods`, soma compensada
+de Kahan), de modo que os resultados batem com o engine "pandas" dentro da
+precisão de ponto flutuante.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-20
+"""
+
+import math
+
+import numba as nb
+import numpy as np
+
+# nogil: kernels liberam o GIL para o backend "threads" do FeatureCalculator
+_JIT = dict(cache=True, error_model="numpy", nogil=True)
+
+
+# ======================== SOMA COMPENSADA =====================================
+
+@nb.njit(**_JIT)
+def _kahan_add(total, comp, val):
+    """Acrescenta `val` a uma soma compensada (Kahan, como o pandas); devolve (soma, compensação)."""
+    y = val - comp
+    t = total + y
+    return t, t - total - y
+
+
+@nb.njit(**_JIT)
+def _kahan_remove(total, comp, val):
+    """Retira `val` da soma; usa uma compensação própria de remoção, como o pandas."""
+    return _kahan_add(total, comp, -val)
+
+
+# ======================== MÉDIA / DESVIO ROLLING ==============================
+
+@nb.njit(**_JIT)
+def rolling_mean_std(x, window, min_periods, out_mean, out_std):
+    """
+    Média e desvio padrão amostral (ddof=1) rolling em uma única passada.
+
+    Replica `Series.rolling(window, min_periods).mean()/.std()`; qualquer uma
+    das saídas pode ser omitida passando um array vazio.
+    """
+    n = x.shape[0]
+    want_mean = out_mean.shape[0] == n
+    want_std = out_std.shape[0] == n
+    # estado da média (soma compensada)
+    nobs = 0
+    sum_x = 0.0
+    comp_add = 0.0
+    comp_rem = 0.0
+    neg_ct = 0
+    # estado da variância (Welford compensado)
+    mean_x = 0.0
+    ssqdm = 0.0
+    vcomp_add = 0.0
+    vcomp_rem = 0.0
+    same = 0
+    prev_value = x[0] if n > 0 else 0.0
+
+    for i in range(n):
+        if i >= window:
+            val = x[i - window]
+            if val == val:
+                nobs -= 1
+                sum_x, comp_rem = _kahan_remove(sum_x, comp_rem, val)
+                if math.copysign(1.0, val) < 0:
+                    neg_ct -= 1
+                if nobs:
+                    prev_mean = mean_x - vcomp_rem
+                    y = val - vcomp_rem
+                    t = y - mean_x
+                    vcomp_rem = t + mean_x - y
+                    mean_x -= t / nobs
+                    ssqdm -= (val - prev_mean) * (val - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm = 0.0
+        val = x[i]
+        if val == val:
+            nobs += 1
+            sum_x, comp_add = _kahan_add(sum_x, comp_add, val)
+            if math.copysign(1.0, val) < 0:
+                neg_ct += 1
+            if val == prev_value:
+                same += 1
+            else:
+                same = 1
+            prev_value = val
+            prev_mean = mean_x - vcomp_add
+            y = val - vcomp_add
+            t = y - mean_x
+            vcomp_add = t + mean_x - y
+            mean_x += t / nobs
+            ssqdm += (val - prev_mean) * (val - mean_x)
+
+        if nobs >= min_periods and nobs > 0:
+            if want_mean:
+                m = sum_x / nobs
+                if same >= nobs:
+                    m = prev_value
+                elif neg_ct == 0 and m < 0:
+                    m = 0.0
+                elif neg_ct == nobs and m > 0:
+                    m = 0.0
+                out_mean[i] = m
+            if want_std:
+                if nobs > 1:
+                    if same >= nobs:
+                        out_std[i] = 0.0
+                    else:
+                        v = ssqdm / (nobs - 1)
+                        out_std[i] = math.sqrt(v) if v > 0 else 0.0
+                else:
+                    out_std[i] = np.nan
+        else:
+            if want_mean:
+                out_mean[i] = np.nan
+            if want_std:
+                out_std[i] = np.nan
+
+
+@nb.njit(**_JIT)
+def rolling_mean_abs_dev(x, window, min_periods, out):
+    """
+    Desvio médio absoluto rolling: mean(|x - mean(x)|) por janela.
+
+    Replica `Series.rolling(window, min_periods).apply(f, raw=True)` com
+    `f = np.mean(np.abs(v - np.mean(v)))`: janelas com menos de `min_periods`
+    observações válidas saem NaN e um NaN dentro da janela se propaga.
+    Custo O(n·window) sem chamada Python por barra.
+    """
+    n = x.shape[0]
+    nobs = 0
+    for i in range(n):
+        if x[i] == x[i]:
+            nobs += 1
+        start = i - window + 1
+        if start > 0 and x[start - 1] == x[start - 1]:
+            nobs -= 1
+        if start < 0:
+            start = 0
+        if nobs < min_periods or nobs == 0:
+            out[i] = np.nan
+            continue
+        size = i - start + 1
+        s = 0.0
+        for j in range(start, i + 1):
+            s += x[j]
+        m = s / size
+        d = 0.0
+        for j in range(start, i + 1):
+            d += abs(x[j] - m)
+        out[i] = d / size
+
+
+# ======================== MÁXIMO / MÍNIMO / MEDIANA ROLLING ===================
+
+@nb.njit(**_JIT)
+def _rolling_extreme(x, window, min_periods, out, is_max):
+    # Deque monotônica de índices: a frente guarda o extremo da janela; cada
+    # índice entra e sai uma única vez → O(n). Buffer linear (sem módulo).
+    n = x.shape[0]
+    dq = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    nobs = 0
+    for i in range(n):
+        val = x[i]
+        if val == val:
+            nobs += 1
+            if is_max:
+                while tail > head and x[dq[tail - 1]] <= val:
+                    tail -= 1
+            else:
+                while tail > head and x[dq[tail - 1]] >= val:
+                    tail -= 1
+            dq[tail] = i
+            tail += 1
+        if i >= window:
+            old = x[i - window]
+            if old == old:
+                nobs -= 1
+        while tail > head and dq[head] <= i - window:
+            head += 1
+        if nobs >= min_periods and nobs > 0:
+            out[i] = x[dq[head]]
+        else:
+            out[i] = np.nan
+
+
+@nb.njit(**_JIT)
+def rolling_max(x, window, min_periods, out):
+    """Replica `Series.rolling(window, min_periods).max()` com deque monotônica."""
+    _rolling_extreme(x, window, min_periods, out, True)
+
+
+@nb.njit(**_JIT)
+def rolling_min(x, window, min_periods, out):
+    """Replica `Series.rolling(window, min_periods).min()` com deque monotônica."""
+    _rolling_extreme(x, window, min_periods, out, False)
+
+
+@nb.njit(**_JIT)
+def rolling_median(x, window, out):
+    """
+    Mediana rolling de janela completa (posições < window-1 saem NaN).
+
+    Mantém a janela em um buffer ordenado: a cada barra o valor que sai é
+    substituído pelo que entra e reposicionado por inserção, sem alocação nem
+    ordenação por barra. Pressupõe `x` sem NaN.
+    """
+    n = x.shape[0]
+    buf = np.empty(window)
+    size = 0
+    half = window // 2
+    for i in range(n):
+        val = x[i]
+        if size < window:
+            p = size
+            size += 1
+        else:
+            # posição do valor que sai (busca binária pelo primeiro igual)
+            old = x[i - window]
+            lo = 0
+            hi = size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if buf[mid] < old:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            p = lo
+        buf[p] = val
+        while p > 0 and buf[p - 1] > val:
+            buf[p] = buf[p - 1]
+            p -= 1
+            buf[p] = val
+        while p < size - 1 and buf[p + 1] < val:
+            buf[p] = buf[p + 1]
+            p += 1
+            buf[p] = val
+        if size < window:
+            out[i] = np.nan
+        elif window % 2 == 0:
+            out[i] = (buf[half - 1] + buf[half]) / 2.0
+        else:
+            out[i] = buf[half]
+
+
+@nb.njit(**_JIT)
+def _sorted_remove(buf, m, v):
+    # remove uma ocorrência de v do buffer ordenado buf[:m] (busca binária)
+    lo = 0
+    hi = m
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if buf[mid] < v:
+            lo = mid + 1
+        else:
+            hi = mid
+    for j in range(lo, m - 1):
+        buf[j] = buf[j + 1]
+
+
+@nb.njit(**_JIT)
+def _sorted_insert(buf, m, v):
+    # insere v mantendo buf[:m + 1] ordenado
+    j = m
+    while j > 0 and buf[j - 1] > v:
+        buf[j] = buf[j - 1]
+        j -= 1
+    buf[j] = v
+
+
+@nb.njit(**_JIT)
+def rolling_mad_outliers(values, window, threshold, scale, out):
+    """
+    Outliers causais por coluna de uma matriz (linhas × colunas): a barra i é
+    marcada se |x[i] - med| > threshold · scale · MAD, com mediana e MAD das
+    `window` barras anteriores (NaN ignorados, como `np.nanmedian`). Barras NaN,
+    janelas sem valores válidos e MAD nulo não marcam.
+
+    A janela é mantida ordenada (sai uma barra, entra outra) e o MAD sai de
+    uma intercalação dos desvios à esquerda/direita da mediana: O(window) por
+    barra, sem ordenação nem alocação.
+    """
+    n, k = values.shape
+    buf = np.empty(window)
+    for c in range(k):
+        m = 0
+        for i in range(n):
+            out[i, c] = False
+            if i > window:
+                old = values[i - window - 1, c]
+                if old == old:
+                    _sorted_remove(buf, m, old)
+                    m -= 1
+            if i > 0:
+                new = values[i - 1, c]
+                if new == new:
+                    _sorted_insert(buf, m, new)
+                    m += 1
+            x = values[i, c]
+            if i < window or x != x or m == 0:
+                continue
+            half = m // 2
+            med = buf[half] if m % 2 else (buf[half - 1] + buf[half]) / 2.0
+            # desvios |buf - med| crescem para fora a partir da mediana: intercala
+            # os dois lados até a(s) posição(ões) central(is)
+            right = 0
+            while right < m and buf[right] < med:
+                right += 1
+            left = right - 1
+            prev = 0.0
+            dev = 0.0
+            for _ in range(half + 1):
+                prev = dev
+                if left >= 0 and (right >= m or med - buf[left] <= buf[right] - med):
+                    dev = med - buf[left]
+                    left -= 1
+                else:
+                    dev = buf[right] - med
+                    right += 1
+            mad = (dev if m % 2 else (prev + dev) / 2.0) * scale
+            out[i, c] = mad > 0 and abs(x - med) > threshold * mad
+
+
+# ======================== CALENDÁRIO ==========================================
+
+@nb.njit(**_JIT)
+def calendar_fields(ts, per_minute, nat, minute, day, dow, dom):
+    """
+    Campos de calendário de timestamps epoch int64 (`per_minute` unidades por
+    minuto) em uma única passada: minuto do dia, dias desde 1970-01-01, dia da
+    semana (0=segunda) e dia do mês (calendário civil proléptico). Posições
+    iguais a `nat` saem zeradas.
+    """
+    n = ts.shape[0]
+    last_day = nat
+    last_dow = 0
+    last_dom = 0
+    for i in range(n):
+        t = ts[i]
+        if t == nat:
+            minute[i] = 0
+            day[i] = 0
+            dow[i] = 0
+            dom[i] = 0
+            continue
+        m = t // per_minute
+        d = m // 1440
+        minute[i] = m - d * 1440
+        day[i] = d
+        if d != last_day:
+            # barras intradiárias repetem o dia: a data civil só é refeita na virada
+            last_day = d
+            last_dow = (d + 3) % 7  # 1970-01-01 foi quinta-feira
+            z = d + 719468
+            era = z // 146097
+            doe = z - era * 146097
+            yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+            doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+            last_dom = doy - (153 * ((5 * doy + 2) // 153) + 2) // 5 + 1
+        dow[i] = last_dow
+        dom[i] = last_dom
+
+
+# ======================== OHLC ================================================
+
+@nb.njit(**_JIT)
+def true_range(high, low, close, out):
+    """True range: max(H-L, |H-C[-1]|, |L-C[-1]|), ignorando termos NaN."""
+    n = high.shape[0]
+    for i in range(n):
+        best = high[i] - low[i]
+        if i > 0:
+            prev = close[i - 1]
+            a = abs(high[i] - prev)
+            b = abs(low[i] - prev)
+            if best != best or a > best:
+                best = a
+            if best != best or b > best:
+                best = b
+        out[i] = best
+
+
+@nb.njit(**_JIT)
+def pct_change(x, out):
+    """Retorno simples x[i] / x[i-1] - 1 (primeira posição NaN)."""
+    n = x.shape[0]
+    if n:
+        out[0] = np.nan
+    for i in range(1, n):
+        out[i] = x[i] / x[i - 1] - 1.0
+
+
+@nb.njit(**_JIT)
+def adx(high, low, close, window, out):
+    """
+    ADX do FeatureCalculator (médias simples, não Wilder) em uma passada:
+    true range, +DM/-DM, somas rolling, DI, DX e média rolling do DX.
+
+    As quatro somas rolling (TR, +DM, -DM, DX) são compensadas na adição e na
+    remoção, como no pandas: um pico isolado não deixa erro acumulado depois
+    de sair da janela.
+    """
+    n = high.shape[0]
+    # por soma: total, compensação da adição e compensação da remoção
+    tr_sum = tr_add = tr_rem = 0.0
+    tr_n = 0
+    p_sum = p_add = p_rem = 0.0
+    p_n = 0
+    m_sum = m_add = m_rem = 0.0
+    m_n = 0
+    dx_sum = dx_add = dx_rem = 0.0
+    dx_n = 0
+    tr_buf = np.empty(window)
+    p_buf = np.empty(window)
+    m_buf = np.empty(window)
+    dx_buf = np.empty(window)
+    for i in range(n):
+        # true range
+        tr = high[i] - low[i]
+        if i > 0:
+            prev = close[i - 1]
+            a = abs(high[i] - prev)
+            b = abs(low[i] - prev)
+            if tr != tr or a > tr:
+                tr = a
+            if tr != tr or b > tr:
+                tr = b
+            pdm = high[i] - high[i - 1]
+            mdm = low[i] - low[i - 1]
+            if pdm < 0:
+                pdm = 0.0
+            if mdm > 0:
+                mdm = 0.0
+            mdm = abs(mdm)
+        else:
+            pdm = np.nan
+            mdm = np.nan
+        k = i % window
+        if i >= window:
+            old = tr_buf[k]
+            if old == old:
+                tr_sum, tr_rem = _kahan_remove(tr_sum, tr_rem, old)
+                tr_n -= 1
+            old = p_buf[k]
+            if old == old:
+                p_sum, p_rem = _kahan_remove(p_sum, p_rem, old)
+                p_n -= 1
+            old = m_buf[k]
+            if old == old:
+                m_sum, m_rem = _kahan_remove(m_sum, m_rem, old)
+                m_n -= 1
+        tr_buf[k] = tr
+        p_buf[k] = pdm
+        m_buf[k] = mdm
+        if tr == tr:
+            tr_sum, tr_add = _kahan_add(tr_sum, tr_add, tr)
+            tr_n += 1
+        if pdm == pdm:
+            p_sum, p_add = _kahan_add(p_sum, p_add, pdm)
+            p_n += 1
+        if mdm == mdm:
+            m_sum, m_add = _kahan_add(m_sum, m_add, mdm)
+            m_n += 1
+
+        dx = np.nan
+        if tr_n >= window and p_n >= window and m_n >= window:
+            tr_smooth = tr_sum / tr_n
+            plus_di = 100 * (p_sum / tr_smooth)
+            minus_di = 100 * (m_sum / tr_smooth)
+            dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
+        if i >= window:
+            old = dx_buf[k]
+            if old == old:
+                dx_sum, dx_rem = _kahan_remove(dx_sum, dx_rem, old)
+                dx_n -= 1
+        dx_buf[k] = dx
+        if dx == dx:
+            dx_sum, dx_add = _kahan_add(dx_sum, dx_add, dx)
+            dx_n += 1
+        out[i] = dx_sum / dx_n if dx_n >= window else np.nan
+
+# EOF
@@ -11,18 +11,43 @@ Mudança recente
   * `model_type == 'ppo'` → não normaliza.
   * Pode ser sobrescrita programaticamente (`cfg.normalize = True/False`).
 * **Barra de progresso ultra-granular**: Mostra progresso detalhado de cada sub-etapa.
+* **Poda de correlação em blocos**: `_remove_corr` usa o motor de
+  `correlation_engine` (covariância acumulada por blocos de linhas, produto
+  matricial em float32) com a mesma regra de limiar de `X.corr()`.
+* **Motor de importância para históricos longos** (`importance_engine`):
+  hold-out cronológico opcional (`time_split`), subamostra de treino
+  estratificada por blocos temporais (`sample_rows`/`sample_block`),
+  HistGradientBoosting como modelo rápido (`importance_model="hgb"`), cache
+  de modelos ajustados por (hash dos dados, configuração) em
+  `model_cache_dir` (limitado a `model_cache_max_bytes`, descarte LRU) e comparação lado a lado com o combo RF+Permutation
+  (`compare_models`).
+* **Progresso real, sem atrasos artificiais**: o RandomForest é treinado em lotes
+  de árvores (`warm_start`) e a barra avança a cada lote concluído. No modo
+  `quiet` (jobs batch) nenhuma mensagem de progresso é formatada e o modelo é
+  treinado em uma única chamada.
+* **Permutation importance com matriz compartilhada** (`permutation_engine`):
+  o teste é aberto em memmap pelos workers (sem uma cópia de X por núcleo),
+  as colunas são permutadas in-place com restauração e a predição é feita em
+  blocos; grupos de features com |r| > `perm_group_threshold` podem ser
+  permutados juntos.
+* **Resultados persistidos**: com `results_cache_dir`, `fit` grava a seleção
+  (`recommended`, `dropped_corr`, importâncias e `combo`) sob a impressão
+  digital de (DataFrame de entrada, configuração); reexecuções com a mesma
+  impressão digital carregam o resultado sem re-treinar (`fit(reselect=True)`
+  força um novo ajuste).
 
 Uso típico no pipeline
 ---------------------
 ```python
 from src.data.data_libs.feature_selector import FeatureSelector, FeatureSelectorConfig
-import yaml, pandas as pd
+from src.utils.file_saver import load_dataframe
+import yaml
 
 cfg_dict = yaml.safe_load(open("cfg/feat_sel_ppo.yaml", "r"))
 fs_cfg = FeatureSelectorConfig.from_dict(cfg_dict)  # ok mesmo sem 'normalize'
 
-df = pd.read_csv("data/features.csv")
-selector = FeatureSelector(df, fs_cfg)
+df = load_dataframe("data/features.parquet")  # csv/parquet/feather pela extensão
+selector = FeatureSelector(df, fs_cfg)   # quiet=True em jobs batch
 selector.fit()      # barra de progresso ultra-granular integrada
 best_feats = selector.get_recommendations()
 ```
@@ -33,9 +58,12 @@ from __future__ import annotations
 
 import json
 import logging
-import time
-from dataclasses import dataclass, field
+import os
+import uuid
+import warnings
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Dict, List, Literal, Optional
 
@@ -43,11 +71,22 @@ import numpy as np
 import pandas as pd
 import yaml  # type: ignore
 from tqdm.auto import tqdm
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 
+from src.data.data_libs.correlation_engine import CORR_CHUNK_ROWS, correlated_features
+from src.data.data_libs.feature_cache import DEFAULT_MAX_BYTES
+from src.data.data_libs.importance_engine import (
+    SUPPORTED_IMPORTANCE_MODELS,
+    ModelCache,
+    build_importance_model,
+    frame_digest,
+    time_block_sample,
+    training_digest,
+)
+from src.data.data_libs.permutation_engine import correlated_groups, permutation_importance_shared
+from src.utils.hash_utils import generate_config_hash
+
 # ---------------------------------------------------------------------------
 # Logging padrão
 # ---------------------------------------------------------------------------
@@ -60,6 +99,9 @@ if not logger.handlers:
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
 
+# Nº de lotes de árvores (warm_start) usados para reportar o treino do RandomForest
+RF_PROGRESS_BATCHES = 10
+
 # ---------------------------------------------------------------------------
 # Configuração
 # ---------------------------------------------------------------------------
@@ -82,6 +124,27 @@ class FeatureSelectorConfig:
     permutation_repeats: int
     scaler_type: Literal["standard", "minmax"] = "standard"
     normalize: Optional[bool] = None  # Auto se None
+    corr_chunk_rows: int = CORR_CHUNK_ROWS  # Linhas por bloco na matriz de correlação
+
+    # ---------- motor de importância (históricos longos) ------------
+    importance_model: Literal["rf", "hgb"] = "rf"  # Modelo que decide a seleção
+    compare_models: bool = False  # Ajusta também o outro modelo e reporta lado a lado
+    sample_rows: Optional[int] = None  # Máx. linhas de treino (blocos temporais); None = todas
+    sample_block: int = 1000  # Linhas contíguas por bloco da subamostra
+    time_split: bool = False  # Hold-out cronológico (teste = fim do histórico)
+    perm_max_samples: int = 50_000  # Máx. linhas do teste na permutation importance
+    perm_group_threshold: Optional[float] = None  # Permuta juntos grupos com |r| > limiar (None = por feature)
+    perm_n_jobs: int = -1  # Processos da permutation importance (memmap compartilhado)
+    model_cache_dir: Optional[str] = None  # Cache de modelos ajustados (None = desligado)
+    model_cache_max_bytes: int = DEFAULT_MAX_BYTES  # Limite do cache de modelos (descarte LRU)
+    results_cache_dir: Optional[str] = None  # Resultados de seleção persistidos (None = desligado)
+
+    def __post_init__(self):
+        if self.importance_model not in SUPPORTED_IMPORTANCE_MODELS:
+            raise ValueError(
+                f"importance_model '{self.importance_model}' não suportado. "
+                f"Escolha um dos: {SUPPORTED_IMPORTANCE_MODELS}"
+            )
 
     # ---------- helpers ------------
     @classmethod
@@ -98,25 +161,64 @@ class FeatureSelectorConfig:
         with open(path, "r", encoding="utf-8") as f:
             return cls.from_dict(yaml.safe_load(f))
 
+
+_ENGINE_FIELDS = {
+    "importance_model": str,
+    "compare_models": lambda v: str(v).strip().lower() == "true",
+    "sample_rows": lambda v: int(v) or None,
+    "sample_block": int,
+    "time_split": lambda v: str(v).strip().lower() == "true",
+    "perm_max_samples": int,
+    "perm_group_threshold": lambda v: float(v) or None,
+    "perm_n_jobs": int,
+    "model_cache_dir": lambda v: str(v).strip() or None,
+    "model_cache_max_bytes": int,
+    "results_cache_dir": lambda v: str(v).strip() or None,
+}
+
+# Versão do algoritmo de seleção: mudanças que alteram o resultado invalidam
+# os resultados persistidos (entra na impressão digital)
+SELECTION_VERSION = 2
+# Diretórios e limites de cache não alteram o resultado: fora da impressão digital
+_FINGERPRINT_EXCLUDE = ("model_cache_dir", "model_cache_max_bytes", "results_cache_dir")
+_PERSISTED_LISTS = ("recommended", "dropped_corr")
+_PERSISTED_SERIES = ("rf_imp", "perm_imp", "hgb_perm_imp", "combo")
+
+
+def engine_params_from_ini(section: Optional[Dict[str, str]]) -> Dict[str, object]:
+    """
+    Parâmetros do motor de importância (e dos caches) presentes na seção [FEATURE_SELECTOR]
+    do config.ini (strings), convertidos para os campos de FeatureSelectorConfig.
+    Chaves ausentes ou vazias mantêm o padrão do dataclass.
+    """
+    params = {}
+    for key, convert in _ENGINE_FIELDS.items():
+        value = (section or {}).get(key)
+        if value is not None and str(value).strip() != "":
+            params[key] = convert(str(value).strip())
+    return params
+
 # ---------------------------------------------------------------------------
 # Core Selector
 # ---------------------------------------------------------------------------
 class FeatureSelector:
     """Seleção de features com barra de progresso ultra-granular integrada."""
 
+    _MODEL_LABELS = {"rf": "RandomForest", "hgb": "HistGradientBoosting"}
+
     _STEPS = [
         ("Preparando X/y", "_split_xy", 5),
         ("Tratando valores ausentes", "_handle_missing", 10),
         ("Removendo alta correlação", "_remove_corr", 15),
         ("Train/test split", "_train_test_split", 5),
         ("Normalização (se aplicável)", "_maybe_scale", 10),
-        ("Importância RandomForest", "_rf_importance", 35),
+        ("Modelos de importância", "_fit_importance_models", 35),
         ("Perm. Importance", "_perm_importance", 15),
         ("Combinando scores", "_combine_scores", 5),
     ]
 
     # ---------------------------------------------------------
-    def __init__(self, df: pd.DataFrame, cfg: FeatureSelectorConfig):
+    def __init__(self, df: pd.DataFrame, cfg: FeatureSelectorConfig, quiet: bool = False):
         # Auto‑define normalize quando omitido
         if cfg.normalize is None:
             cfg.normalize = cfg.model_type == "mlp"
@@ -125,13 +227,24 @@ class FeatureSelector:
         self.X: pd.DataFrame
         self.y: pd.Series
         self.results: Dict[str, object] = {}
+        self.quiet = quiet
         self._pbar: Optional[tqdm] = None
         self._current_step_progress = 0
 
     # ---------------------------------------------------------
-    def fit(self, show_progress: bool = True) -> "FeatureSelector":
-        """Executa pipeline de seleção com barra de progresso ultra-granular."""
-        if show_progress:
+    def fit(self, show_progress: bool = True, reselect: bool = False) -> "FeatureSelector":
+        """Executa pipeline de seleção com barra de progresso ultra-granular
+        (desligada se `show_progress=False` ou no modo `quiet`).
+
+        Com `cfg.results_cache_dir`, reutiliza o resultado persistido para a
+        mesma impressão digital (DataFrame + configuração), exceto se
+        `reselect=True`; um ajuste novo é sempre persistido.
+        """
+        results_path = self._results_path()
+        if results_path and not reselect and self._load_results(results_path):
+            return self
+
+        if show_progress and not self.quiet:
             total_weight = sum(weight for _, _, weight in self._STEPS)
             self._pbar = tqdm(
                 total=total_weight,
@@ -162,8 +275,19 @@ class FeatureSelector:
                 self._pbar.close()
                 self._pbar = None
         
+        if results_path:
+            self._save_results(results_path)
         return self
 
+    def fingerprint(self) -> str:
+        """Impressão digital do DataFrame de entrada e da configuração (sem diretórios de cache)."""
+        if "fingerprint" not in self.results:
+            cfg = {k: v for k, v in asdict(self.cfg).items() if k not in _FINGERPRINT_EXCLUDE}
+            self.results["fingerprint"] = generate_config_hash(
+                {"data": frame_digest(self.df), "config": cfg, "version": SELECTION_VERSION}, length=32
+            )
+        return self.results["fingerprint"]
+
     # ---------------------------------------------------------
     def get_recommendations(self) -> List[str]:
         return self.results.get("recommended", [])
@@ -183,13 +307,11 @@ class FeatureSelector:
         
         # Sub-etapas ultra-granulares
         self._update_progress(0.5, progress_weight, "🔍 Analisando estrutura do DataFrame")
-        time.sleep(0.01)  # Simula trabalho para mostrar progresso
         
         self._update_progress(1.5, progress_weight, "🔢 Identificando colunas numéricas")
         num_cols = self.df.select_dtypes(include=[np.number]).columns.tolist()
         
         self._update_progress(2.5, progress_weight, "🎯 Validando coluna target")
-        time.sleep(0.01)
         
         self._update_progress(3.5, progress_weight, "📊 Separando variável dependente")
         self.y = self.df[target]
@@ -199,10 +321,10 @@ class FeatureSelector:
 
     def _handle_missing(self, progress_weight: int = 0):
         """Trata valores ausentes com progresso ultra-detalhado."""
-        missing_count = self.X.isnull().sum().sum()
-        
-        self._update_progress(1, progress_weight, f"🔍 Detectados {missing_count} valores ausentes")
-        time.sleep(0.02)
+        if self._pbar:
+            self._update_progress(
+                1, progress_weight, "🔍 Detectados {} valores ausentes", self.X.isnull().sum().sum()
+            )
         
         self._update_progress(3, progress_weight, "⏭️ Aplicando forward fill")
         self.X.ffill(inplace=True)
@@ -216,46 +338,59 @@ class FeatureSelector:
         self._update_progress(9, progress_weight, "✂️ Removendo linhas com target inválido")
         self.X, self.y = self.X[mask], self.y[mask]
         
-        self._update_progress(10, progress_weight, f"✅ Dados limpos: {len(self.X)} amostras")
+        self._update_progress(10, progress_weight, "✅ Dados limpos: {} amostras", len(self.X))
 
     def _remove_corr(self, progress_weight: int = 0):
         """Remove features altamente correlacionadas com progresso detalhado."""
         n_features = len(self.X.columns)
         
-        self._update_progress(1, progress_weight, f"🧮 Calculando matriz de correlação ({n_features}x{n_features})")
-        corr = self.X.corr().abs()
-        
-        self._update_progress(5, progress_weight, "🔺 Extraindo triângulo superior")
-        upper = corr.where(np.triu(np.ones_like(corr), k=1).astype(bool))
-        
-        self._update_progress(8, progress_weight, f"🔍 Buscando correlações > {self.cfg.correlation_threshold}")
-        drop_cols = []
-        for i, col in enumerate(upper.columns):
-            self._update_progress(8 + (i / len(upper.columns)) * 5, progress_weight, 
-                                f"📊 Analisando {col[:15]}...")
-            if (upper[col] > self.cfg.correlation_threshold).any():
-                drop_cols.append(col)
+        self._update_progress(
+            1, progress_weight, "🧮 Calculando matriz de correlação ({0}x{0}) em blocos de {1:,} linhas",
+            n_features, self.cfg.corr_chunk_rows,
+        )
+        # Triângulo superior de |corr| > threshold (float32 por bloco, pares no limiar em float64)
+        drop_cols = correlated_features(
+            self.X, self.cfg.correlation_threshold, chunk_rows=self.cfg.corr_chunk_rows
+        )
         
-        self._update_progress(14, progress_weight, f"❌ Removendo {len(drop_cols)} features correlacionadas")
+        self._update_progress(14, progress_weight, "❌ Removendo {} features correlacionadas", len(drop_cols))
         self.X.drop(columns=drop_cols, inplace=True)
         self.results["dropped_corr"] = drop_cols
         
-        self._update_progress(15, progress_weight, f"✅ Restam {len(self.X.columns)} features")
+        self._update_progress(15, progress_weight, "✅ Restam {} features", len(self.X.columns))
 
     def _train_test_split(self, progress_weight: int = 0):
         """Divide dados em treino e teste com detalhamento."""
-        self._update_progress(1, progress_weight, "🎲 Configurando estratificação")
-        strat = self.y if self._is_classification() else None
+        if self.cfg.time_split:
+            # Hold-out cronológico: o teste é o fim do histórico (sem vazamento do futuro)
+            self._update_progress(1, progress_weight, "🕒 Hold-out cronológico")
+            split = dict(shuffle=False)
+        else:
+            self._update_progress(1, progress_weight, "🎲 Configurando estratificação")
+            split = dict(
+                random_state=self.cfg.random_state,
+                stratify=self.y if self._is_classification() else None,
+            )
         
-        self._update_progress(2.5, progress_weight, f"✂️ Dividindo {len(self.X)} amostras")
+        self._update_progress(2.5, progress_weight, "✂️ Dividindo {} amostras", len(self.X))
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X, self.y,
-            test_size=self.cfg.test_size,
-            random_state=self.cfg.random_state,
-            stratify=strat,
+            self.X, self.y, test_size=self.cfg.test_size, **split
         )
         
-        self._update_progress(4, progress_weight, f"📋 Treino: {len(self.X_train)}, Teste: {len(self.X_test)}")
+        rows = time_block_sample(
+            len(self.X_train), self.cfg.sample_rows, self.cfg.sample_block, self.cfg.random_state
+        )
+        if len(rows) < len(self.X_train):
+            # Subamostra estratificada por blocos temporais (treino em ordem cronológica)
+            order = np.argsort(self.X_train.index.to_numpy(), kind="stable")[rows]
+            self._update_progress(
+                3.5, progress_weight, "📉 Subamostra temporal: {:,}/{:,} linhas de treino",
+                len(order), len(self.X_train),
+            )
+            self.X_train, self.y_train = self.X_train.iloc[order], self.y_train.iloc[order]
+        self.results["train_rows"] = len(self.X_train)
+        
+        self._update_progress(4, progress_weight, "📋 Treino: {}, Teste: {}", len(self.X_train), len(self.X_test))
         self._update_progress(5, progress_weight, "✅ Split realizado")
 
     def _maybe_scale(self, progress_weight: int = 0):
@@ -266,11 +401,10 @@ class FeatureSelector:
         
         scaler_name = "StandardScaler" if self.cfg.scaler_type == "standard" else "MinMaxScaler"
         
-        self._update_progress(1, progress_weight, f"⚙️ Inicializando {scaler_name}")
+        self._update_progress(1, progress_weight, "⚙️ Inicializando {}", scaler_name)
         scaler = StandardScaler() if self.cfg.scaler_type == "standard" else MinMaxScaler()
         
         self._update_progress(3, progress_weight, "🔧 Fitting scaler nos dados de treino")
-        time.sleep(0.02)
         
         self._update_progress(6, progress_weight, "🔄 Transformando conjunto de treino")
         self.X_train = pd.DataFrame(
@@ -286,59 +420,73 @@ class FeatureSelector:
             index=self.X_test.index,
         )
         
-        self._update_progress(10, progress_weight, f"✅ Normalização {scaler_name} concluída")
+        self._update_progress(10, progress_weight, "✅ Normalização {} concluída", scaler_name)
 
-    def _rf_importance(self, progress_weight: int = 0):
-        """Calcula importância usando Random Forest com progresso ultra-detalhado."""
+    def _fit_importance_models(self, progress_weight: int = 0):
+        """Ajusta o(s) modelo(s) de importância (RF e/ou HGB), reutilizando o cache se configurado."""
         task_type = "Classificação" if self._is_classification() else "Regressão"
-        
-        self._update_progress(1, progress_weight, f"🤖 Configurando RandomForest para {task_type}")
-        if self._is_classification():
-            rf = RandomForestClassifier(
-                n_estimators=self.cfg.n_estimators,
-                random_state=self.cfg.random_state,
-                n_jobs=-1,
-                class_weight="balanced",
+        kinds = self._importance_models()
+        span = 30 / len(kinds)
+        for n, kind in enumerate(kinds):
+            start = 1 + n * span
+            label = self._MODEL_LABELS[kind]
+            self._update_progress(start, progress_weight, "🤖 Configurando {} para {}", label, task_type)
+            model = build_importance_model(
+                kind, self._is_classification(), self.cfg.n_estimators, self.cfg.random_state
             )
-        else:
-            rf = RandomForestRegressor(
-                n_estimators=self.cfg.n_estimators,
-                random_state=self.cfg.random_state,
-                n_jobs=-1,
+            if kind == "rf":
+                fit = partial(self._fit_rf, start=start + 1, span=span - 1, progress_weight=progress_weight)
+            else:
+                fit = self._fit_model
+            cached = False
+            if self.cfg.model_cache_dir:
+                if "train_digest" not in self.results:
+                    self.results["train_digest"] = training_digest(self.X_train, self.y_train)
+                cache = ModelCache(self.cfg.model_cache_dir, self.cfg.model_cache_max_bytes)
+                entry = cache.load_or_fit(model, self.results["train_digest"], fit)
+                model, cached = entry["model"], entry["cached"]
+                if cached:
+                    logger.info(f"Modelo {label} reutilizado do cache ({entry['key'][:10]})")
+            else:
+                model = fit(model)
+            self.results[f"{kind}_model"] = model
+            self.results[f"{kind}_cached"] = cached
+            self._update_progress(
+                start + span, progress_weight, "♻️ {} reutilizado do cache" if cached else "✅ {} treinado", label
             )
         
-        # Progresso ultra-granular do treinamento
-        n_trees = self.cfg.n_estimators
-        self._update_progress(2, progress_weight, f"🌳 Iniciando treinamento de {n_trees} árvores")
-        
-        # Simula progresso de treinamento com mais granularidade
-        training_steps = 20  # Dividir treinamento em 20 etapas
-        step_size = 28 / training_steps  # 28 pontos de progresso para treinamento (30-2)
+        if "rf" in kinds:
+            self._update_progress(32, progress_weight, "📊 Extraindo importâncias das features")
+            self.results["rf_imp"] = pd.Series(self.results["rf_model"].feature_importances_, index=self.X.columns)
         
-        for i in range(1, training_steps + 1):
-            progress = 2 + (i * step_size)
-            trees_trained = int((i / training_steps) * n_trees)
-            
-            self._update_progress(progress, progress_weight, 
-                                f"🌲 Treinando árvore {trees_trained}/{n_trees} ({i*5}%)")
-            
-            # Simula tempo de processamento variável
-            if i < 10:
-                time.sleep(0.01)  # Início mais rápido
-            elif i < 15:
-                time.sleep(0.02)  # Meio mais lento
-            else:
-                time.sleep(0.015)  # Final médio
-            
-            # Treina o modelo apenas na última iteração
-            if i == training_steps:
+        self._update_progress(35, progress_weight, "✅ Modelos de importância prontos: {}", ", ".join(kinds))
+
+    def _fit_model(self, model):
+        return model.fit(self.X_train, self.y_train)
+
+    def _fit_rf(self, rf, start: float, span: float, progress_weight: int):
+        """Treina o RandomForest; com barra ativa, em lotes de árvores (progresso real)."""
+        n_trees = self.cfg.n_estimators
+        self._update_progress(start, progress_weight, "🌳 Iniciando treinamento de {} árvores", n_trees)
+        
+        if not self._pbar:
+            return rf.fit(self.X_train, self.y_train)
+        # Progresso real: lotes de árvores via warm_start (mesma floresta do fit
+        # único, pois as sementes das árvores seguem a sequência de random_state)
+        batch = max(1, -(-n_trees // RF_PROGRESS_BATCHES))
+        rf.set_params(warm_start=True)
+        with warnings.catch_warnings():
+            # class_weight="balanced" + warm_start: os lotes usam os mesmos dados
+            warnings.filterwarnings("ignore", message=".*warm_start.*", category=UserWarning)
+            for trees in range(batch, n_trees + batch, batch):
+                rf.set_params(n_estimators=min(trees, n_trees))
                 rf.fit(self.X_train, self.y_train)
-        
-        self._update_progress(32, progress_weight, "📊 Extraindo importâncias das features")
-        self.results["rf_imp"] = pd.Series(rf.feature_importances_, index=self.X.columns)
-        self.results["rf_model"] = rf
-        
-        self._update_progress(35, progress_weight, f"✅ Random Forest treinado ({n_trees} árvores)")
+                self._update_progress(
+                    start + span * rf.n_estimators / n_trees, progress_weight,
+                    "🌲 Treinando árvore {}/{}", rf.n_estimators, n_trees,
+                )
+        rf.set_params(warm_start=False)
+        return rf
 
     def _perm_importance(self, progress_weight: int = 0):
         """Calcula permutation importance com otimizações para datasets grandes."""
@@ -346,14 +494,14 @@ class FeatureSelector:
         n_features = len(self.X.columns)
         n_samples = len(self.X_test)
         
-        self._update_progress(1, progress_weight, f"🔄 {n_repeats} repetições × {n_features} features × {n_samples:,} amostras")
+        self._update_progress(1, progress_weight, "🔄 {} repetições × {} features × {:,} amostras", n_repeats, n_features, n_samples)
         
         # OTIMIZAÇÃO: Reduz amostra para datasets muito grandes
         X_test_sample = self.X_test
         y_test_sample = self.y_test
         
-        if n_samples > 50000:
-            sample_size = min(50000, n_samples)  # Máximo 50k amostras
+        if n_samples > self.cfg.perm_max_samples:
+            sample_size = self.cfg.perm_max_samples
             sample_idx = np.random.RandomState(self.cfg.random_state).choice(
                 n_samples, size=sample_size, replace=False
             )
@@ -361,30 +509,42 @@ class FeatureSelector:
             y_test_sample = self.y_test.iloc[sample_idx]
             
             self._update_progress(3, progress_weight, 
-                                f"📉 Amostragem: {sample_size:,}/{n_samples:,} para acelerar")
+                                "📉 Amostragem: {:,}/{:,} para acelerar", sample_size, n_samples)
         
         # OTIMIZAÇÃO: Reduz repetições para datasets grandes
         actual_repeats = n_repeats
         if n_samples > 100000 and n_repeats > 3:
             actual_repeats = max(3, n_repeats // 2)
             self._update_progress(5, progress_weight, 
-                                f"⚡ Reduzindo repetições: {actual_repeats}/{n_repeats}")
-        
-        self._update_progress(8, progress_weight, f"🎲 Executando permutation_importance...")
-        
-        # Executa com timeout implícito via amostragem
-        perm = permutation_importance(
-            self.results["rf_model"],
-            X_test_sample,
-            y_test_sample,
-            n_repeats=actual_repeats,
-            random_state=self.cfg.random_state,
-            n_jobs=-1,  # Usa todos os cores disponíveis
-        )
+                                "⚡ Reduzindo repetições: {}/{}", actual_repeats, n_repeats)
+        
+        groups = None
+        if self.cfg.perm_group_threshold:
+            self._update_progress(6, progress_weight, "🔗 Agrupando features com |r| > {}", self.cfg.perm_group_threshold)
+            groups = correlated_groups(X_test_sample, self.cfg.perm_group_threshold)
+            self.results["perm_groups"] = [
+                [self.X.columns[j] for j in group] for group in groups if len(group) > 1
+            ]
+        
+        kinds = self._importance_models()
+        for n, kind in enumerate(kinds):
+            self._update_progress(
+                8 + 6 * n / len(kinds), progress_weight, "🎲 Executando permutation_importance ({})...",
+                self._MODEL_LABELS[kind],
+            )
+            perm = permutation_importance_shared(
+                self.results[f"{kind}_model"],
+                X_test_sample,
+                y_test_sample,
+                n_repeats=actual_repeats,
+                random_state=self.cfg.random_state,
+                n_jobs=self.cfg.perm_n_jobs,  # teste em memmap compartilhado entre os processos
+                groups=groups,
+            )
+            key = "perm_imp" if kind == "rf" else f"{kind}_perm_imp"
+            self.results[key] = pd.Series(perm.importances_mean, index=self.X.columns)
         
         self._update_progress(14, progress_weight, "📊 Processando resultados")
-        self.results["perm_imp"] = pd.Series(perm.importances_mean, index=self.X.columns)
-        
         if actual_repeats != n_repeats or len(X_test_sample) != n_samples:
             logger.info(f"Permutation otimizada: {actual_repeats} rep. × {len(X_test_sample):,} amostras")
         
@@ -392,36 +552,104 @@ class FeatureSelector:
 
     def _combine_scores(self, progress_weight: int = 0):
         """Combina scores e seleciona features finais com progresso detalhado."""
-        self._update_progress(0.5, progress_weight, "📊 Obtendo scores Random Forest")
-        rf = self.results["rf_imp"]
-        
-        self._update_progress(1.2, progress_weight, "🔢 Normalizando RF importance")
-        rf_norm = (rf - rf.min()) / (rf.max() - rf.min())
-        
-        self._update_progress(2.0, progress_weight, "📊 Obtendo scores Permutation")
-        pi = self.results["perm_imp"]
-        
-        self._update_progress(2.8, progress_weight, "🔢 Normalizando Perm importance")
-        pi_norm = (pi - pi.min()) / (pi.max() - pi.min())
-        
-        self._update_progress(3.5, progress_weight, "🔗 Combinando scores (média)")
-        combo = (rf_norm + pi_norm) / 2
-        
-        self._update_progress(4.2, progress_weight, f"⚖️ Aplicando threshold {self.cfg.importance_threshold}")
-        selected = combo[combo > self.cfg.importance_threshold].index.tolist()
-        
-        self._update_progress(4.8, progress_weight, "🧹 Removendo features correlacionadas")
-        selected = [f for f in selected if f not in self.results.get("dropped_corr", [])]
+        scores = {}
+        if "rf_imp" in self.results:
+            self._update_progress(1.2, progress_weight, "🔢 Normalizando RF + Permutation importance")
+            scores["rf"] = (self._minmax(self.results["rf_imp"]) + self._minmax(self.results["perm_imp"])) / 2
+        if "hgb_perm_imp" in self.results:
+            # HistGradientBoosting não expõe importância por impureza: só permutation
+            self._update_progress(2.8, progress_weight, "🔢 Normalizando HGB permutation importance")
+            scores["hgb"] = self._minmax(self.results["hgb_perm_imp"])
+        
+        self._update_progress(3.5, progress_weight, "🔗 Score do modelo {}", self.cfg.importance_model)
+        combo = scores[self.cfg.importance_model]
+        
+        self._update_progress(4.2, progress_weight, "⚖️ Aplicando threshold {}", self.cfg.importance_threshold)
+        dropped = set(self.results.get("dropped_corr", []))
+        selections = {
+            kind: [f for f in score[score > self.cfg.importance_threshold].index if f not in dropped]
+            for kind, score in scores.items()
+        }
+        selected = selections[self.cfg.importance_model]
         
         self.results.update({"combo": combo, "recommended": selected})
+        if len(scores) > 1:
+            comparison = pd.DataFrame({f"{kind}_score": score for kind, score in scores.items()})
+            for kind, feats in selections.items():
+                comparison[f"{kind}_selected"] = comparison.index.isin(feats)
+            self.results["comparison"] = comparison
+            common = set(selections["rf"]) & set(selections["hgb"])
+            logger.info(
+                "Comparação RF×HGB: %d (RF+Perm) / %d (HGB) features selecionadas, %d em comum",
+                len(selections["rf"]), len(selections["hgb"]), len(common),
+            )
         
-        self._update_progress(5.0, progress_weight, f"🎉 {len(selected)} features selecionadas")
+        self._update_progress(5.0, progress_weight, "🎉 {} features selecionadas", len(selected))
         logger.info("%d features selecionadas", len(selected))
 
+    # ---------- resultados persistidos ----------
+    def _results_path(self) -> Optional[Path]:
+        if not self.cfg.results_cache_dir:
+            return None
+        return Path(self.cfg.results_cache_dir) / f"selection_{self.fingerprint()}.json"
+
+    def _load_results(self, path: Path) -> bool:
+        """Carrega a seleção persistida; False se ausente ou ilegível."""
+        if not path.exists():
+            return False
+        try:
+            stored = json.loads(path.read_text(encoding="utf-8"))["results"]
+        except Exception as e:
+            logger.warning(f"Resultado de seleção ilegível ({path}): {e}. Re-selecionando.")
+            return False
+        for key in _PERSISTED_LISTS:
+            self.results[key] = stored[key]
+        for key in _PERSISTED_SERIES:
+            if key in stored:
+                self.results[key] = pd.Series(stored[key], dtype=float)
+        if "comparison" in stored:
+            self.results["comparison"] = pd.DataFrame(stored["comparison"])
+        if "perm_groups" in stored:
+            self.results["perm_groups"] = stored["perm_groups"]
+        self.results["reused"] = True
+        logger.info(
+            f"Seleção reutilizada ({self.fingerprint()[:10]}): "
+            f"{len(self.results['recommended'])} features de {path}"
+        )
+        return True
+
+    def _save_results(self, path: Path) -> None:
+        """Grava a seleção sob a impressão digital (escrita atômica)."""
+        stored = {key: list(self.results[key]) for key in _PERSISTED_LISTS}
+        for key in _PERSISTED_SERIES:
+            if key in self.results:
+                stored[key] = self.results[key].to_dict()
+        if "comparison" in self.results:
+            stored["comparison"] = self.results["comparison"].to_dict()
+        if "perm_groups" in self.results:
+            stored["perm_groups"] = self.results["perm_groups"]
+        payload = {
+            "fingerprint": self.fingerprint(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "results": stored,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(payload, indent=2, default=lambda v: v.item()), encoding="utf-8")
+        os.replace(tmp, path)
+        self.results["reused"] = False
+        logger.info(f"Seleção persistida em {path}")
+
     # ---------- helpers ----------
-    def _update_progress(self, current: float, total: int, message: str = ""):
-        """Atualiza progresso com granularidade decimal."""
+    def _update_progress(self, current: float, total: int, message: str = "", *args):
+        """Atualiza progresso com granularidade decimal.
+
+        `message` é formatada com `args` (`str.format`) só quando há barra ativa,
+        de modo que o modo silencioso não paga a formatação das mensagens.
+        """
         if self._pbar and message:
+            if args:
+                message = message.format(*args)
             # Calcula quanto avançar desde a última atualização
             advance = current - self._current_step_progress
             if advance > 0:
@@ -431,6 +659,17 @@ class FeatureSelector:
             # Atualiza mensagem com emoji e info
             self._pbar.set_postfix_str(message)
 
+    def _importance_models(self) -> List[str]:
+        """Modelo que decide a seleção primeiro; o outro só com `compare_models`."""
+        kinds = [self.cfg.importance_model]
+        if self.cfg.compare_models:
+            kinds += [k for k in SUPPORTED_IMPORTANCE_MODELS if k != self.cfg.importance_model]
+        return kinds
+
+    @staticmethod
+    def _minmax(score: pd.Series) -> pd.Series:
+        return (score - score.min()) / (score.max() - score.min())
+
     def _is_classification(self) -> bool:
         return pd.api.types.is_integer_dtype(self.y) and self.y.nunique() < 20
 
@@ -441,9 +680,22 @@ class FeatureSelector:
         rep.extend(f"- {f}" for f in self.results.get("recommended", []))
         rep += ["", "## Descartadas por Alta Correlação", ""]
         rep.extend(f"- {f}" for f in self.results.get("dropped_corr", []))
-        rep += ["", "## Top-10 Importância RandomForest", ""]
-        top10 = self.results["rf_imp"].sort_values(ascending=False).head(10)
-        rep.extend(f"- {f}: {s:.4f}" for f, s in top10.items())
+        if "rf_imp" in self.results:
+            rep += ["", "## Top-10 Importância RandomForest", ""]
+            top10 = self.results["rf_imp"].sort_values(ascending=False).head(10)
+            rep.extend(f"- {f}: {s:.4f}" for f, s in top10.items())
+        if self.results.get("perm_groups"):
+            rep += ["", f"## Grupos Permutados Juntos (|r| > {self.cfg.perm_group_threshold})", ""]
+            rep.extend(f"- {', '.join(group)}" for group in self.results["perm_groups"])
+        comparison = self.results.get("comparison")
+        if comparison is not None:
+            rep += ["", f"## Comparação de Modelos (seleção por {self.cfg.importance_model.upper()})", ""]
+            rep += ["| Feature | RF+Perm | HGB | Sel. RF | Sel. HGB |", "|---|---|---|---|---|"]
+            for f, row in comparison.sort_values("rf_score", ascending=False).iterrows():
+                rep.append(
+                    f"| {f} | {row['rf_score']:.4f} | {row['hgb_score']:.4f} "
+                    f"| {'x' if row['rf_selected'] else ''} | {'x' if row['hgb_selected'] else ''} |"
+                )
         return "\n".join(rep)
 
 # ---------------------------------------------------------------------------
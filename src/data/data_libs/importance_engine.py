@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/importance_engine.py
+
+Motor de importância de features do FeatureSelector para históricos longos.
+
+- `time_block_sample`: subamostragem estratificada por blocos temporais — o
+  histórico é dividido em estratos de mesmo tamanho e um bloco contíguo é
+  sorteado em cada estrato, preservando a autocorrelação local e cobrindo
+  todos os regimes do período.
+- `build_importance_model`: RandomForest (padrão atual) ou
+  HistGradientBoosting (histogramas, muito mais rápido em milhões de linhas).
+- `ModelCache`: modelos ajustados em disco (joblib), endereçados pelo hash dos
+  dados de treino e da configuração do modelo; reexecuções do mesmo
+  finalize reutilizam o modelo sem re-treinar. Limitado a `max_bytes`, com
+  descarte LRU como o FeatureCache.
+- `frame_digest`: impressão digital do DataFrame de entrada (base da chave
+  dos resultados de seleção persistidos pelo FeatureSelector).
+
+Autor: Equipe Op_Trader
+Data: 2025-06-28
+"""
+
+import hashlib
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier,
+    HistGradientBoostingRegressor,
+    RandomForestClassifier,
+    RandomForestRegressor,
+)
+
+from src.data.data_libs.feature_cache import DEFAULT_MAX_BYTES, column_digest, index_digest
+from src.utils.hash_utils import generate_config_hash
+from src.utils.logging_utils import get_logger
+
+SUPPORTED_IMPORTANCE_MODELS = ("rf", "hgb")
+
+logger = get_logger("op_trader.importance_engine")
+
+
+def time_block_sample(n_rows: int, max_rows: Optional[int], block_size: int, random_state: int) -> np.ndarray:
+    """
+    Posições (ordenadas) de uma subamostra estratificada por blocos temporais.
+
+    Args:
+        n_rows (int): Nº de linhas do histórico.
+        max_rows (int, opcional): Tamanho máximo da amostra (None/0 = todas).
+        block_size (int): Linhas contíguas por bloco.
+        random_state (int): Semente do sorteio dos blocos.
+
+    Returns:
+        np.ndarray: Posições int64 em ordem crescente.
+
+    Raises:
+        ValueError: `block_size` menor que 1.
+    """
+    if block_size < 1:
+        raise ValueError(f"block_size deve ser positivo, recebido: {block_size}")
+    if not max_rows or n_rows <= max_rows:
+        return np.arange(n_rows)
+    block_size = min(block_size, max_rows)
+    n_blocks = max_rows // block_size
+    # estratos de mesmo tamanho; um bloco sorteado dentro de cada estrato
+    bounds = np.linspace(0, n_rows, n_blocks + 1).astype(np.int64)
+    rng = np.random.RandomState(random_state)
+    starts = bounds[:-1] + rng.randint(0, np.maximum(bounds[1:] - bounds[:-1] - block_size, 0) + 1)
+    return (starts[:, None] + np.arange(block_size)).ravel()
+
+
+def build_importance_model(kind: str, classification: bool, n_estimators: int, random_state: int) -> Any:
+    """
+    Estimador de importância: "rf" (RandomForest, `n_estimators` árvores) ou
+    "hgb" (HistGradientBoosting, `n_estimators` iterações de boosting).
+
+    Raises:
+        ValueError: Modelo não suportado.
+    """
+    if kind == "rf":
+        if classification:
+            return RandomForestClassifier(
+                n_estimators=n_estimators, random_state=random_state, n_jobs=-1, class_weight="balanced"
+            )
+        return RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=-1)
+    if kind == "hgb":
+        if classification:
+            return HistGradientBoostingClassifier(
+                max_iter=n_estimators, random_state=random_state, class_weight="balanced"
+            )
+        return HistGradientBoostingRegressor(max_iter=n_estimators, random_state=random_state)
+    raise ValueError(f"Modelo de importância '{kind}' não suportado. Escolha um dos: {SUPPORTED_IMPORTANCE_MODELS}")
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Hash do conteúdo do DataFrame: colunas (nome + valores, na ordem) e índice."""
+    digest = hashlib.blake2b(digest_size=16)
+    for col in df.columns:
+        digest.update(str(col).encode())
+        digest.update(column_digest(df[col]).encode())
+    digest.update(index_digest(df.index).encode())
+    return digest.hexdigest()
+
+
+def training_digest(X: pd.DataFrame, y: pd.Series) -> str:
+    """Hash do conteúdo de treino: colunas (nome + valores), alvo e índice."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(frame_digest(X).encode())
+    digest.update(column_digest(y).encode())
+    return digest.hexdigest()
+
+
+def model_key(model: Any, data_digest: str) -> str:
+    """Chave do modelo: hash dos dados, da classe, dos hiperparâmetros e da versão do sklearn."""
+    params = {k: repr(v) for k, v in sorted(model.get_params().items())}
+    return generate_config_hash(
+        {"data": data_digest, "model": type(model).__name__, "params": params, "sklearn": sklearn.__version__},
+        length=32,
+    )
+
+
+class ModelCache:
+    """
+    Modelos ajustados em disco (`<cache_dir>/<modelo>_<chave>.joblib`).
+
+    Cada novo modelo gravado dispara o descarte LRU: os arquivos menos usados
+    recentemente (mtime, atualizado a cada acerto) são removidos até o
+    diretório caber em `max_bytes`.
+
+    Args:
+        cache_dir (str): Diretório do cache (criado se ausente).
+        max_bytes (int): Tamanho máximo ocupado pelos modelos.
+
+    Raises:
+        ValueError: `max_bytes` não é um inteiro positivo.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        if not isinstance(max_bytes, int) or max_bytes <= 0:
+            raise ValueError(f"max_bytes deve ser inteiro positivo, recebido: {max_bytes}")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, model: Any, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{type(model).__name__}_{key}.joblib")
+
+    def load_or_fit(self, model: Any, data_digest: str, fit: Callable[[Any], Any]) -> Dict[str, Any]:
+        """
+        Devolve o modelo em cache para (dados, configuração) ou ajusta com
+        `fit(model)` e o grava (escrita atômica), descartando os modelos menos
+        usados se o cache passar de `max_bytes`.
+
+        Returns:
+            dict: {"model": estimador ajustado, "key": chave, "cached": bool}.
+        """
+        key = model_key(model, data_digest)
+        path = self._path(model, key)
+        if os.path.exists(path):
+            try:
+                fitted = joblib.load(path)
+                try:
+                    os.utime(path)  # marca o acesso para o LRU
+                except OSError:
+                    pass
+                return {"model": fitted, "key": key, "cached": True}
+            except Exception as e:
+                logger.warning(f"Modelo em cache ilegível ({path}): {e}. Re-treinando.")
+        fitted = fit(model)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        joblib.dump(fitted, tmp)
+        os.replace(tmp, path)
+        self.evict()
+        return {"model": fitted, "key": key, "cached": False}
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Modelos em cache: arquivo, bytes e último acesso (mtime)."""
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".joblib"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            found.append({"name": name, "bytes": stat.st_size, "atime": stat.st_mtime})
+        return found
+
+    def size_bytes(self) -> int:
+        return sum(e["bytes"] for e in self.entries())
+
+    def evict(self) -> List[str]:
+        """Remove os modelos menos usados recentemente até caber em `max_bytes`."""
+        removed: List[str] = []
+        entries = sorted(self.entries(), key=lambda e: e["atime"])
+        total = sum(e["bytes"] for e in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["name"]))
+            except FileNotFoundError:
+                pass  # já removido por outro processo
+            except OSError as e:
+                logger.debug(f"Modelo {entry['name']} não removido: {e}")
+                continue
+            total -= entry["bytes"]
+            removed.append(entry["name"])
+        if removed:
+            logger.info(f"Cache de modelos: {len(removed)} modelos descartados (LRU).")
+        return removed
+
+# EOF
@@ -0,0 +1,684 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/incremental_feature_calculator.py
+
+IncrementalFeatureCalculator — atualização barra a barra das features causais
+do FeatureCalculator, com estado O(1) por indicador.
+
+Cada feature mantém estado próprio (EMA, somas compensadas de janelas rolling,
+deques de extremos, buffers de defasagem) e intermediários são compartilhados
+pelas mesmas chaves do planejador DAG (`_intermediate_key`). As somas rolling e
+as EMAs reproduzem os algoritmos do pandas, então `warmup(df)` devolve as
+mesmas colunas que `FeatureCalculator.calculate_all(df)` (dentro da precisão de
+ponto flutuante).
+
+Features que dependem da amostra inteira (médias/quantis globais, agregados do
+dia completo, rótulos futuros) não têm versão incremental e são rejeitadas.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-22
+"""
+
+import math
+from collections import deque
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.data_libs.feature_calculator import FeatureCalculator, _intermediate_key, market_hours_codes
+from src.data.data_libs.trading_calendar import TradingCalendar
+from src.utils.logging_utils import get_logger
+
+# Features que olham a amostra inteira ou o futuro: sem equivalente incremental
+NON_CAUSAL_FEATURES = (
+    "session_phase",           # pd.cut sobre o range de minutos da amostra
+    "intraday_mean_reversion",  # média do dia completo
+    "daily_range_position",    # máx/mín do dia completo
+    "market_regime",           # média global do desvio rolling
+    "volatility_regime",       # média global do ATR
+    "price_clusters",          # quantis da amostra
+    "delta_points",            # rótulo com janela futura
+)
+
+_MOMENT_STATS = ("mean", "std", "sum")
+
+# Minutos por dia de market_hours (1500 cobre o dia de 25 h do fim do horário de verão)
+_MARKET_DAY_MINUTES = 1500
+
+
+# ======================== ESTADOS ROLLING =====================================
+
+class _RollingMoments:
+    """
+    Soma/média/desvio rolling com o algoritmo compensado do pandas
+    (mesma sequência de add/remove de `roll_sum`, `roll_mean` e `roll_var`).
+    """
+
+    __slots__ = (
+        "window", "min_periods", "bar", "values", "nobs", "sum_x", "comp_add", "comp_rem",
+        "neg_ct", "mean_x", "ssqdm", "vcomp_add", "vcomp_rem", "same", "prev_value",
+    )
+
+    def __init__(self, window: int, min_periods: int):
+        self.window = window
+        self.min_periods = min_periods
+        self.bar = -1
+        self.values: deque = deque()
+        self._reset(None)
+
+    def _reset(self, first: Optional[float]) -> None:
+        self.nobs = 0
+        self.sum_x = self.comp_add = self.comp_rem = 0.0
+        self.neg_ct = 0
+        self.mean_x = self.ssqdm = self.vcomp_add = self.vcomp_rem = 0.0
+        self.same = 0
+        self.prev_value = first
+
+    def push(self, val: float) -> None:
+        val = float(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        if self.window == 1:
+            # janelas sem sobreposição: o pandas reinicia o estado a cada barra
+            self._reset(val)
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(val)
+        self._add(val)
+
+    def _add(self, val: float) -> None:
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        self.same = self.same + 1 if val == self.prev_value else 1
+        self.prev_value = val
+        prev_mean = self.mean_x - self.vcomp_add
+        y = val - self.vcomp_add
+        t = y - self.mean_x
+        self.vcomp_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float) -> None:
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_rem
+        t = self.sum_x + y
+        self.comp_rem = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.vcomp_rem
+            y = val - self.vcomp_rem
+            t = y - self.mean_x
+            self.vcomp_rem = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm = 0.0
+
+    def _ready(self) -> bool:
+        return self.nobs >= self.min_periods and self.nobs > 0
+
+    def mean(self) -> np.float64:
+        if not self._ready():
+            return np.float64(np.nan)
+        m = self.sum_x / self.nobs
+        if self.same >= self.nobs:
+            m = self.prev_value
+        elif self.neg_ct == 0 and m < 0:
+            m = 0.0
+        elif self.neg_ct == self.nobs and m > 0:
+            m = 0.0
+        return np.float64(m)
+
+    def sum(self) -> np.float64:
+        if not self._ready():
+            return np.float64(np.nan)
+        if self.same >= self.nobs:
+            return np.float64(self.prev_value * self.nobs)
+        return np.float64(self.sum_x)
+
+    def std(self) -> np.float64:
+        if not self._ready() or self.nobs < 2:
+            return np.float64(np.nan)
+        if self.same >= self.nobs:
+            return np.float64(0.0)
+        v = self.ssqdm / (self.nobs - 1)
+        return np.float64(math.sqrt(v) if v > 0 else 0.0)
+
+
+class _RollingExtreme:
+    """Máximo ou mínimo rolling com deque monotônica (semântica de NaN do pandas)."""
+
+    __slots__ = ("window", "min_periods", "is_max", "bar", "count", "nobs", "dq", "values")
+
+    def __init__(self, window: int, min_periods: int, is_max: bool):
+        self.window = window
+        self.min_periods = min_periods
+        self.is_max = is_max
+        self.bar = -1
+        self.count = 0
+        self.nobs = 0
+        self.dq: deque = deque()
+        self.values: deque = deque()
+
+    def push(self, val: float) -> None:
+        val = float(val)
+        i = self.count
+        self.count += 1
+        if val == val:
+            self.nobs += 1
+            dq = self.dq
+            if self.is_max:
+                while dq and dq[-1][1] <= val:
+                    dq.pop()
+            else:
+                while dq and dq[-1][1] >= val:
+                    dq.pop()
+            dq.append((i, val))
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+        while self.dq and self.dq[0][0] <= i - self.window:
+            self.dq.popleft()
+
+    def value(self) -> np.float64:
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            return np.float64(self.dq[0][1])
+        return np.float64(np.nan)
+
+
+class _RollingMeanAbsDev:
+    """Desvio médio absoluto rolling (mesma ordem de soma do kernel compilado)."""
+
+    __slots__ = ("window", "min_periods", "bar", "values", "nobs")
+
+    def __init__(self, window: int, min_periods: int):
+        self.window = window
+        self.min_periods = min_periods
+        self.bar = -1
+        self.values: deque = deque()
+        self.nobs = 0
+
+    def push(self, val: float) -> None:
+        val = float(val)
+        if val == val:
+            self.nobs += 1
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+
+    def value(self) -> np.float64:
+        if self.nobs < self.min_periods or self.nobs == 0:
+            return np.float64(np.nan)
+        size = len(self.values)
+        s = 0.0
+        for v in self.values:
+            s += v
+        m = s / size
+        d = 0.0
+        for v in self.values:
+            d += abs(v - m)
+        return np.float64(d / size)
+
+
+class _Ewm:
+    """EWM `adjust=False` com a normalização e o tratamento de NaN do pandas."""
+
+    __slots__ = ("alpha", "old_wt_factor", "bar", "weighted", "old_wt", "nobs")
+
+    def __init__(self, span: int):
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.bar = -1
+        self.weighted: Optional[float] = None
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def push(self, cur: float) -> None:
+        cur = float(cur)
+        is_obs = cur == cur
+        self.nobs += is_obs
+        weighted = self.weighted
+        if weighted is None:
+            self.weighted = cur
+            return
+        if weighted == weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = self.old_wt * weighted + self.alpha * cur
+                    weighted /= self.old_wt + self.alpha
+                self.old_wt = 1.0
+                self.weighted = weighted
+        elif is_obs:
+            self.weighted = cur
+
+    def value(self) -> np.float64:
+        return np.float64(self.weighted if self.nobs >= 1 else np.nan)
+
+
+class _Lag:
+    """Valor de `lag` barras atrás (equivale a `shift(lag)`)."""
+
+    __slots__ = ("lag", "bar", "values")
+
+    def __init__(self, lag: int):
+        self.lag = lag
+        self.bar = -1
+        self.values: deque = deque(maxlen=lag + 1)
+
+    def push(self, val: float) -> None:
+        self.values.append(val)
+
+    def value(self) -> np.float64:
+        if len(self.values) <= self.lag:
+            return np.float64(np.nan)
+        return np.float64(self.values[0])
+
+
+# ======================== CALCULADORA INCREMENTAL =============================
+
+class IncrementalFeatureCalculator:
+    """
+    Versão stateful do FeatureCalculator para o caminho live: cada nova barra
+    atualiza os indicadores em O(1) em vez de recalcular o histórico.
+
+    Usage:
+        inc = IncrementalFeatureCalculator(features=["ema_fast", "rsi", "atr"])
+        inc.warmup(df_historico)
+        collector.collect_streaming(lambda df: on_row(inc.update(df.iloc[-1])))
+
+    Args:
+        features (List[str], opcional): Features causais a manter (padrão:
+            todas as core features causais).
+        params (dict, opcional): Parâmetros por feature, no mesmo formato de
+            `calculate_all`.
+        debug (bool): Ativa logs detalhados (DEBUG).
+        calendar (TradingCalendar, opcional): Agenda do instrumento (market_hours).
+
+    Raises:
+        ValueError: feature desconhecida ou sem versão incremental.
+    """
+
+    def __init__(
+        self,
+        features: Optional[List[str]] = None,
+        params: Optional[Dict[str, Dict[str, Any]]] = None,
+        debug: bool = False,
+        calendar: Optional[TradingCalendar] = None,
+    ):
+        self.logger = get_logger("op_trader.incremental_feature_calculator", "DEBUG" if debug else None)
+        self._calc = FeatureCalculator(debug=debug, calendar=calendar)
+        self._updaters: Dict[str, Callable[..., Any]] = {
+            name[len("_inc_"):]: getattr(self, name)
+            for name in dir(type(self)) if name.startswith("_inc_")
+        }
+        for name in ("roc_5", "roc_10", "roc_20"):
+            self._updaters[name] = self._inc_roc
+        for name in ("momentum_3", "momentum_5", "weekly_momentum"):
+            self._updaters[name] = self._inc_momentum
+        for name in ("realized_vol_5", "realized_vol_10"):
+            self._updaters[name] = self._inc_realized_vol
+
+        features = features or self.supported_features()
+        unknown = [f for f in features if f not in self._calc.list_available_features()]
+        if unknown:
+            raise ValueError(f"Features não registradas: {unknown}")
+        non_causal = [f for f in features if f not in self._updaters]
+        if non_causal:
+            raise ValueError(f"Features sem versão incremental (não causais): {non_causal}")
+
+        params = params or {}
+        plan = self._calc.build_plan(features, params)
+        self._steps: List[Tuple[str, Callable[..., Any], Dict[str, Any], bool]] = [
+            (feat, self._updaters[feat], self._calc.effective_params(feat, params.get(feat, {})),
+             feat in plan["hidden"])
+            for feat in plan["order"]
+        ]
+        self.features = [feat for feat, _, _, hidden in self._steps if not hidden]
+        self.reset()
+        self.logger.info(f"IncrementalFeatureCalculator pronto: {self.features}")
+
+    def supported_features(self) -> List[str]:
+        """Core features com atualização incremental."""
+        return [f for f in self._calc.list_available_features() if f in self._updaters]
+
+    def reset(self) -> None:
+        """Descarta todo o estado acumulado."""
+        self._state: Dict[Tuple[Any, ...], Any] = {}
+        self._bar_values: Dict[Any, Any] = {}
+        self._bar: Mapping[str, Any] = {}
+        self._n = -1
+
+    def warmup(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reinicia o estado e o alimenta com o histórico `df`, barra a barra.
+
+        Returns:
+            DataFrame (mesmo índice de `df`) com as colunas de feature de cada
+            barra — as mesmas geradas por `calculate_all` no mesmo histórico.
+        """
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            raise ValueError("DataFrame vazio ou inválido.")
+        self.reset()
+        rows = [self.update(bar) for bar in df.to_dict("records")]
+        self.logger.info(f"Warmup concluído: {len(rows)} barras")
+        return pd.DataFrame(rows, index=df.index)
+
+    def update(self, bar: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Incorpora uma nova barra (dict/Series com open/high/low/close/volume/
+        datetime conforme as features) e devolve a linha de features.
+        """
+        self._n += 1
+        self._bar = bar
+        self._bar_values = {}
+        row: Dict[str, Any] = {}
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for feat, updater, feat_params, hidden in self._steps:
+                result = updater(**feat_params)
+                self._bar_values[("feature", feat)] = result
+                if hidden:
+                    continue
+                if isinstance(result, dict):
+                    row.update(result)
+                else:
+                    row[feat] = result
+        return row
+
+    # ======================== PRIMITIVAS DE ESTADO ============================
+    def _once(self, key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+        """Valor calculado uma única vez por barra."""
+        try:
+            return self._bar_values[key]
+        except KeyError:
+            value = self._bar_values[key] = compute()
+            return value
+
+    def _feed(self, key: Tuple[Any, ...], factory: Callable[[], Any], value: Any) -> Any:
+        """Estado persistente `key`, alimentado com `value` uma vez por barra."""
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = factory()
+        if state.bar != self._n:
+            state.push(value)
+            state.bar = self._n
+        return state
+
+    def _col(self, name: str) -> np.float64:
+        return np.float64(self._bar[name])
+
+    def _prev(self, name: str, lag: int = 1) -> np.float64:
+        return self._feed(("lag", name, lag), lambda: _Lag(lag), self._col(name)).value()
+
+    def _value(self, source: str) -> np.float64:
+        """Fonte de um intermediário: coluna, true_range, typical_price ou returns:<col>."""
+        if source == "true_range":
+            return self._once(("true_range",), self._true_range)
+        if source == "typical_price":
+            return self._once(
+                ("typical_price",), lambda: (self._col("high") + self._col("low") + self._col("close")) / 3
+            )
+        if source.startswith("returns:"):
+            column = source.split(":", 1)[1]
+            return self._once(("returns", column), lambda: self._col(column) / self._prev(column) - 1)
+        return self._col(source)
+
+    def _true_range(self) -> np.float64:
+        high, low, prev = self._col("high"), self._col("low"), self._prev("close")
+        terms = [t for t in (high - low, abs(high - prev), abs(low - prev)) if t == t]
+        return max(terms) if terms else np.float64(np.nan)
+
+    def _rolling(self, stat: str, source: str, window: int, min_periods: Optional[int] = None) -> np.float64:
+        key = _intermediate_key(f"rolling_{stat}", source, window, min_periods)
+        # média, desvio e soma da mesma janela dividem um único estado
+        state_key = ("moments",) + key[1:] if stat in _MOMENT_STATS else key
+        return self._once(key, lambda: self._roll(state_key, stat, self._value(source), window, key[3]))
+
+    def _roll(self, key: Tuple[Any, ...], stat: str, value: Any, window: int, min_periods: Optional[int] = None) -> np.float64:
+        """Estatística rolling de uma série qualquer, com estado persistente `key`."""
+        min_periods = window if min_periods is None else min_periods
+        if stat in _MOMENT_STATS:
+            return getattr(self._feed(key, lambda: _RollingMoments(window, min_periods), value), stat)()
+        if stat in ("max", "min"):
+            return self._feed(key, lambda: _RollingExtreme(window, min_periods, stat == "max"), value).value()
+        if stat == "mad":
+            return self._feed(key, lambda: _RollingMeanAbsDev(window, min_periods), value).value()
+        raise ValueError(f"Estatística rolling '{stat}' não suportada.")
+
+    def _ema(self, column: str, span: int) -> np.float64:
+        return self._ewm(("ema", column, span), span, self._col(column))
+
+    def _ewm(self, key: Tuple[Any, ...], span: int, value: Any) -> np.float64:
+        return self._once(key, lambda: self._feed(key, lambda: _Ewm(span), value).value())
+
+    def _timestamp(self) -> pd.Timestamp:
+        return self._once(("datetime",), lambda: pd.Timestamp(self._bar["datetime"]))
+
+    def _feature(self, name: str) -> Any:
+        return self._bar_values[("feature", name)]
+
+    # ======================== FEATURES ========================================
+    def _inc_ema_fast(self, window: int = 20, column: str = "close", **kwargs):
+        return self._ema(column, window)
+
+    def _inc_ema_slow(self, window: int = 50, column: str = "close", **kwargs):
+        return self._ema(column, window)
+
+    def _inc_rsi(self, window: int = 14, column: str = "close", **kwargs):
+        delta = self._col(column) - self._prev(column)
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain = self._roll(("rsi_gain", column, window), "mean", gain, window)
+        avg_loss = self._roll(("rsi_loss", column, window), "mean", loss, window)
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+    def _inc_macd_hist(self, span_short: int = 12, span_long: int = 26, span_signal: int = 9,
+                       column: str = "close", **kwargs):
+        macd_line = self._ema(column, span_short) - self._ema(column, span_long)
+        signal_line = self._ewm(("macd_signal", column, span_short, span_long, span_signal), span_signal, macd_line)
+        return macd_line - signal_line
+
+    def _inc_atr(self, window: int = 14, **kwargs):
+        return self._rolling("mean", "true_range", window)
+
+    def _inc_bb_width(self, window: int = 20, column: str = "close", **kwargs):
+        ma = self._rolling("mean", column, window)
+        std = self._rolling("std", column, window)
+        return (ma + 2 * std) - (ma - 2 * std)
+
+    def _inc_return_pct(self, column: str = "close", **kwargs):
+        return self._value(f"returns:{column}")
+
+    def _inc_candle_direction(self, column: str = "close", **kwargs):
+        diff = self._col(column) - self._prev(column)
+        return 1 if diff > 0 else (-1 if diff < 0 else 0)
+
+    def _inc_volume_relative(self, window: int = 20, column: str = "volume", **kwargs):
+        mean_vol = self._rolling("mean", column, window)
+        return self._col(column) / (mean_vol if mean_vol != 0 else np.nan)
+
+    def _inc_pullback(self, window: int = 20, column: str = "close", **kwargs):
+        return self._col(column) - self._rolling("mean", column, window)
+
+    def _candle(self) -> Tuple[np.float64, np.float64, np.float64, np.float64, np.float64]:
+        o, h, l, c = (self._col(k) for k in ("open", "high", "low", "close"))
+        return o, h, l, c, abs(c - o)
+
+    def _inc_hammer_pattern(self, window: int = 5, **kwargs):
+        o, h, l, c, body = self._candle()
+        lower = o - l if c > o else c - l
+        return float(lower >= 2 * body and body <= 0.3 * (h - l))
+
+    def _inc_inverted_hammer_pattern(self, window: int = 5, **kwargs):
+        o, h, l, c, body = self._candle()
+        upper = h - c if c > o else h - o
+        return float(upper >= 2 * body and body <= 0.3 * (h - l))
+
+    def _inc_roc(self, window: int = 5, column: str = "close", **kwargs):
+        lagged = self._prev(column, window)
+        return (self._col(column) - lagged) / lagged
+
+    def _inc_momentum(self, lag: int = 3, column: str = "close", **kwargs):
+        return self._col(column) - self._prev(column, lag)
+
+    def _extremes(self, window: int, min_periods: Optional[int] = None, high: str = "high", low: str = "low"):
+        return self._rolling("max", high, window, min_periods), self._rolling("min", low, window, min_periods)
+
+    def _inc_williams_r(self, window: int = 14, **kwargs):
+        highest_high, lowest_low = self._extremes(window)
+        return -100 * (highest_high - self._col("close")) / (highest_high - lowest_low)
+
+    def _inc_stoch_k(self, window: int = 14, **kwargs):
+        highest_high, lowest_low = self._extremes(window)
+        return 100 * (self._col("close") - lowest_low) / (highest_high - lowest_low)
+
+    def _inc_stoch_d(self, window: int = 3, **kwargs):
+        return self._roll(("stoch_d", window), "mean", self._feature("stoch_k"), window)
+
+    def _inc_adx(self, window: int = 14, **kwargs):
+        plus_dm = self._col("high") - self._prev("high")
+        minus_dm = self._col("low") - self._prev("low")
+        if plus_dm < 0:
+            plus_dm = 0.0
+        if minus_dm > 0:
+            minus_dm = 0.0
+        tr_smooth = self._rolling("mean", "true_range", window)
+        plus_di = 100 * (self._roll(("adx_plus_dm", window), "sum", plus_dm, window) / tr_smooth)
+        minus_di = 100 * (self._roll(("adx_minus_dm", window), "sum", abs(minus_dm), window) / tr_smooth)
+        dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
+        return self._roll(("adx_dx", window), "mean", dx, window)
+
+    def _inc_cci(self, window: int = 20, **kwargs):
+        tp = self._value("typical_price")
+        ma = self._rolling("mean", "typical_price", window)
+        md = self._rolling("mad", "typical_price", window)
+        return (tp - ma) / (0.015 * md)
+
+    def _inc_trix(self, window: int = 15, column: str = "close", **kwargs):
+        ema1 = self._ema(column, window)
+        ema2 = self._ewm(("trix_ema2", column, window), window, ema1)
+        ema3 = self._ewm(("trix_ema3", column, window), window, ema2)
+        prev = self._feed(("trix_lag", column, window), lambda: _Lag(1), ema3).value()
+        return ema3 / prev - 1
+
+    def _inc_atr_normalized(self, window: int = 14, **kwargs):
+        return self._inc_atr(window=window) / self._col("close")
+
+    def _inc_realized_vol(self, window: int = 5, column: str = "close", **kwargs):
+        return self._rolling("std", f"returns:{column}", window)
+
+    def _inc_parkinson_vol(self, window: int = 10, **kwargs):
+        log_hl = np.log(self._col("high") / self._col("low")) ** 2
+        return (1.0 / (4.0 * np.log(2))) * self._roll(("parkinson", window), "mean", log_hl, window)
+
+    def _inc_gap_analysis(self, threshold: float = 0.002, **kwargs):
+        prev_close = self._prev("close")
+        gap = abs(self._col("open") - prev_close) / prev_close
+        return int(gap > threshold)
+
+    def _inc_breakout_signals(self, window: int = 20, threshold: float = 0.002, **kwargs):
+        high_roll, low_roll = self._extremes(window)
+        close = self._col("close")
+        return int(close >= high_roll * (1 + threshold) or close <= low_roll * (1 - threshold))
+
+    def _inc_support_resistance(self, lookback: int = 20, **kwargs):
+        high, low = self._extremes(lookback)
+        close = self._col("close")
+        return {"dist_resistance": high - close, "dist_support": close - low}
+
+    def _inc_pivot_points(self, method: str = "classic", **kwargs):
+        high, low = self._col("high"), self._col("low")
+        pp = self._value("typical_price")
+        if method == "classic":
+            return {
+                "pp": pp, "r1": (2 * pp) - low, "r2": pp + (high - low),
+                "s1": (2 * pp) - high, "s2": pp - (high - low),
+            }
+        return {"pp": pp, "r1": pp, "r2": pp, "s1": pp, "s2": pp}
+
+    def _inc_fibonacci_levels(self, lookback: int = 20, **kwargs):
+        high, low = self._extremes(lookback)
+        diff = high - low
+        return {
+            "fib_0": low, "fib_236": low + 0.236 * diff, "fib_382": low + 0.382 * diff,
+            "fib_5": low + 0.5 * diff, "fib_618": low + 0.618 * diff, "fib_786": low + 0.786 * diff,
+            "fib_1": high,
+        }
+
+    def _inc_price_channels(self, window: int = 20, **kwargs):
+        channel_high, channel_low = self._extremes(window)
+        return {"channel_high": channel_high, "channel_low": channel_low}
+
+    def _inc_day_of_week(self, format: str = "int", **kwargs):
+        dow = self._timestamp().dayofweek
+        return dow if format == "int" else str(dow)
+
+    def _inc_week_of_month(self, mode: str = "simple", **kwargs):
+        return (self._timestamp().day - 1) // 7 + 1
+
+    def _inc_market_hours(self, session: str = "london,newyork,tokyo", **kwargs):
+        # Códigos do dia inteiro calculados na primeira barra do dia (conversão de
+        # fuso por barra custaria ~1 ms); DST e feriados mudam no máximo por dia
+        ts = self._timestamp()
+        day = ts.normalize()
+        key = ("market_hours", session)
+        cached = self._state.get(key)
+        if cached is None or cached[0] != day:
+            minutes = pd.date_range(day, periods=_MARKET_DAY_MINUTES, freq="min")
+            cached = self._state[key] = (day, market_hours_codes(minutes, session, self._calc.calendar))
+        return int(cached[1][(ts - day) // pd.Timedelta(minutes=1)])
+
+    def _inc_trend_strength(self, window: int = 14, **kwargs):
+        high, low = self._extremes(window)
+        return (high - low) / self._inc_atr(window=window)
+
+    def _inc_risk_adjusted_return(self, window: int = 14, **kwargs):
+        atr = self._inc_atr(window=window)
+        return self._value("returns:close") / (atr + 1e-8)
+
+    def _inc_max_drawdown_risk(self, window: int = 20, column: str = "close", **kwargs):
+        roll_max, roll_min = self._extremes(window, 1, column, column)
+        return (roll_max - roll_min) / roll_max
+
+    def _inc_sharpe_estimate(self, window: int = 20, column: str = "close", **kwargs):
+        mean = self._rolling("mean", f"returns:{column}", window)
+        std = self._rolling("std", f"returns:{column}", window)
+        return mean / (std + 1e-8)
+
+    def _inc_risk_on_off(self, **kwargs):
+        return 0
+
+    def _inc_higher_tf_trend(self, tf: str = "H1", window: int = 10, column: str = "close", **kwargs):
+        ma = self._rolling("mean", column, window)
+        prev = self._feed(("higher_tf_lag", column, window), lambda: _Lag(1), ma).value()
+        return np.sign(ma - prev)
+
+    def _inc_anomaly_score(self, **kwargs):
+        return 0
+
+    def _inc_regime_probability(self, states: int = 2, **kwargs):
+        return 1 / states
+
+    def _inc_forecast_error(self, method: str = "rolling_mean", window: int = 5, column: str = "close", **kwargs):
+        pred = self._rolling("mean", column, window)
+        return self._col(column) - pred if method == "rolling_mean" else 0
+
+# EOF
@@ -10,30 +10,33 @@ horários fora de negociação.
 → Adiciona filtragem de *trading‑days* e *trading‑hours* antes de reindexar.
 → Nova flag `gap_fixed` continua sendo criada quando um candle inexistente é
   preenchido dentro do horário de mercado.
+→ Agenda de mercado plugável por instrumento (`TradingCalendar`); o padrão é
+  o calendário "fx" (seg–sex, 00:05–23:55 UTC; ver `BUILTIN_CALENDARS`).
 
 Copyright © 2025
 """
 from __future__ import annotations
 
-from typing import Optional, Dict, Any, List
+import warnings
+from typing import Optional, Dict, Any, List, Tuple
 import pandas as pd
 import numpy as np
 
+from src.data.data_libs import feature_kernels as kernels
+from src.data.data_libs.trading_calendar import TradingCalendar, resolve_calendar
 from src.utils.logging_utils import get_logger
 
+# Fator de consistência do MAD com o desvio padrão (distribuição normal)
+MAD_SCALE = 1.4826
+
+
 class OutlierGapCorrector:  # assinatura preservada
     """Corrige gaps e outliers em DataFrames de candles (batch/streaming)."""
 
-    SUPPORTED_OUTLIER_METHODS = ["iqr", "zscore", "rolling"]
+    SUPPORTED_OUTLIER_METHODS = ["iqr", "zscore", "rolling", "rolling_mad"]
     SUPPORTED_OUTLIER_CORRECTIONS = ["nan", "mean", "interpolate", "zero"]
     SUPPORTED_GAP_METHODS = ["forward_fill", "backward_fill", "interpolate", "drop"]
 
-    # === NOVO: parâmetros default globais de agenda de mercado ===
-    _TRADING_WEEKDAYS = set(range(0, 5))  # 0=segunda … 4=sexta
-    _SESSION_START_MINUTE = 5   # UTC 00:05 (evita rollover)
-    _SESSION_END_HOUR = 23      # UTC 23:55 último candle M5
-    _SESSION_END_MINUTE = 55
-
     def __init__(
         self,
         freq: str,
@@ -41,8 +44,10 @@ class OutlierGapCorrector:  # assinatura preservada
         mode: str = "batch",
         gap_params: Optional[Dict[str, Any]] = None,
         outlier_params: Optional[Dict[str, Any]] = None,
+        calendar: Optional[TradingCalendar] = None,
     ):
         self.freq = freq
+        self.calendar = calendar or resolve_calendar()
         self.debug = debug
         self.mode = mode.lower()
         self.gap_params = gap_params or {}
@@ -61,25 +66,17 @@ class OutlierGapCorrector:  # assinatura preservada
         if "outlier_threshold" in self.outlier_params and "threshold" not in self.outlier_params:
             self.outlier_params["threshold"] = self.outlier_params["outlier_threshold"]
 
-        self._logger.info(f"OutlierGapCorrector inicializado em modo '{self.mode}'.")
+        self._logger.info(
+            f"OutlierGapCorrector inicializado em modo '{self.mode}' (calendário '{self.calendar.name}')."
+        )
         self._logger.debug(f"gap_params={self.gap_params}, outlier_params={self.outlier_params}")
 
     # ---------------------------------------------------------------------
-    # 🆕  Agenda de mercado (helper estático)                                 
+    # Agenda de mercado (TradingCalendar)
     # ---------------------------------------------------------------------
-    @staticmethod
-    def _is_trading_datetime(ts: pd.Timestamp) -> bool:
-        """Retorna True se *ts* estiver dentro de dias/horas normais de trading."""
-        if ts.weekday() not in OutlierGapCorrector._TRADING_WEEKDAYS:
-            return False
-        if ts.hour == 0 and ts.minute < OutlierGapCorrector._SESSION_START_MINUTE:
-            return False
-        if ts.hour > OutlierGapCorrector._SESSION_END_HOUR or (
-            ts.hour == OutlierGapCorrector._SESSION_END_HOUR
-            and ts.minute > OutlierGapCorrector._SESSION_END_MINUTE
-        ):
-            return False
-        return True
+    def _trading_index(self, dt: pd.Series) -> pd.DatetimeIndex:
+        """Grade `self.freq` entre o primeiro e o último candle, só horário de mercado."""
+        return self.calendar.grid(self.freq, dt.min(), dt.max())
 
     # --------------------------- GAPS ------------------------------------
 
@@ -88,14 +85,16 @@ class OutlierGapCorrector:  # assinatura preservada
             self._logger.critical(f"[{self.mode}] Coluna '{datetime_col}' não encontrada.")
             return pd.DataFrame()
 
-        idx_full = pd.date_range(
-            start=df[datetime_col].min(),
-            end=df[datetime_col].max(),
-            freq=self.freq,
-        )
-        # Filtra somente horário de mercado
-        idx = idx_full[[self._is_trading_datetime(ts) for ts in idx_full]]
-        gaps = idx.difference(df[datetime_col])
+        idx = self._trading_index(df[datetime_col])
+        present = pd.DatetimeIndex(df[datetime_col])
+        if present.is_monotonic_increasing:
+            # candles já ordenados: busca binária em vez de diferença de conjuntos
+            grid = idx.asi8
+            stamps = present.as_unit(idx.unit).asi8
+            pos = np.minimum(np.searchsorted(stamps, grid), max(len(stamps) - 1, 0))
+            gaps = idx[stamps[pos] != grid]
+        else:
+            gaps = idx.difference(present)
         if not gaps.empty:
             self._logger.warning(f"[{self.mode}] Gaps detectados: {len(gaps)}")
             self._gaps_report = list(gaps)
@@ -124,83 +123,107 @@ class OutlierGapCorrector:  # assinatura preservada
             self._logger.critical(f"[{self.mode}] Coluna '{datetime_col}' não encontrada.")
             return df
 
-        # Cria grade completa apenas para horários de trading
-        idx_full = pd.date_range(
-            start=df[datetime_col].min(),
-            end=df[datetime_col].max(),
-            freq=self.freq,
-        )
-        idx = [ts for ts in idx_full if self._is_trading_datetime(ts)]
-
-        df.set_index(datetime_col, inplace=True)
-        df = df.reindex(idx)
+        # Grade completa apenas para horários de trading
+        idx = self._trading_index(df[datetime_col]).rename(datetime_col)
+        df = df.set_index(datetime_col).reindex(idx)
 
         # Flag gap_fixed
-        df["gap_fixed"] = df.isnull().any(axis=1)
-
-        # Preenchimento por coluna
-        for col in df.columns.difference(["gap_fixed"]):
-            if method == "forward_fill":
-                df[col] = df[col].ffill()
-            elif method == "backward_fill":
-                df[col] = df[col].bfill()
-            elif method == "interpolate":
-                df[col] = df[col].interpolate(method="linear")
-            elif method == "drop":
-                df = df[~df["gap_fixed"]]
-            else:
-                self._logger.warning(
-                    f"[{self.mode}] Estratégia '{method}' não reconhecida para gaps. Usando forward_fill."
-                )
-                df[col] = df[col].ffill()
-
-        df.reset_index(inplace=True)
-        df.rename(columns={"index": datetime_col}, inplace=True)
+        gap_fixed = df.isnull().any(axis=1)
+
+        # Preenchimento de uma vez sobre o frame inteiro
+        if method == "forward_fill":
+            df = df.ffill()
+        elif method == "backward_fill":
+            df = df.bfill()
+        elif method == "interpolate":
+            df = df.interpolate(method="linear")
+        df["gap_fixed"] = gap_fixed
+        if method == "drop":
+            df = df[~gap_fixed]
+
+        df = df.reset_index()
         self._logger.info(f"[{self.mode}] Gaps corrigidos com '{method}'.")
         return df
 
     # --------------------------- OUTLIERS -------------------------------
-    # (Código intocado da versão original para preservar contratos)
+    # Detecção matricial: estatísticas de todas as colunas numéricas em uma
+    # passada NumPy e uma única máscara booleana (linhas × colunas).
 
-    def detect_outliers(
-        self,
-        df: pd.DataFrame,
-        method: Optional[str] = None,
-        threshold: Optional[float] = None,
-        window: Optional[int] = None,
-    ) -> pd.DataFrame:
+    def _outlier_settings(
+        self, method: Optional[str], threshold: Optional[float], window: Optional[int]
+    ) -> Tuple[str, Optional[float], Optional[int]]:
         method = method or self.outlier_params.get("method", "iqr")
         if threshold is None:
-            threshold = 3.0 if method in ("zscore", "rolling") else None
-        if method == "rolling" and window is None:
+            threshold = 3.0 if method in ("zscore", "rolling", "rolling_mad") else None
+        if method in ("rolling", "rolling_mad") and window is None:
             window = 20
         if method not in self.SUPPORTED_OUTLIER_METHODS:
             raise ValueError(
                 f"Outlier method '{method}' não suportado. Escolha um dos: {self.SUPPORTED_OUTLIER_METHODS}"
             )
+        return method, threshold, window
+
+    @staticmethod
+    def _outlier_mask(
+        values: np.ndarray, method: str, threshold: Optional[float], window: Optional[int]
+    ) -> np.ndarray:
+        """
+        Máscara de outliers de uma matriz float (linhas × colunas).
 
-        df_out = pd.DataFrame(index=df.index)
-        for col in df.select_dtypes(include=[np.number]).columns:
+        - iqr: fora de [Q1 - 1.5·IQR, Q3 + 1.5·IQR] da coluna;
+        - zscore: |x - média| / desvio (ddof=0) acima de `threshold`;
+        - rolling: desvio da média rolling centrada acima de `threshold` desvios;
+        - rolling_mad: desvio da mediana das `window` barras ANTERIORES acima de
+          `threshold` · 1.4826 · MAD dessas barras. Causal (sem lookahead): a
+          decisão de uma barra não muda quando chegam barras novas, então o
+          mesmo código serve ao batch e ao streaming.
+
+        NaN nunca é marcado.
+        """
+        if values.shape[0] == 0:
+            return np.zeros(values.shape, dtype=bool)
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
             if method == "iqr":
-                q1, q3 = df[col].quantile([0.25, 0.75])
+                q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
                 iqr = q3 - q1
-                low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
-                mask = (df[col] < low) | (df[col] > high)
-            elif method == "zscore":
-                z = (df[col] - df[col].mean()) / df[col].std(ddof=0)
-                mask = z.abs() > threshold
-            elif method == "rolling":
-                mean = df[col].rolling(window, center=True, min_periods=1).mean()
-                std = df[col].rolling(window, center=True, min_periods=1).std().replace(0, 1e-8)
-                mask = (df[col] - mean).abs() > threshold * std
-            else:
-                mask = pd.Series(False, index=df.index)
-            df_out[f"{col}_outlier"] = mask
-            cnt = int(mask.sum())
-            if cnt:
-                self._outliers_report.append({"column": col, "count": cnt, "method": method})
-                self._logger.debug(f"[{self.mode}] Outliers em {col}: {cnt}")
-        return df_out
+                return (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+            if method == "zscore":
+                z = (values - np.nanmean(values, axis=0)) / np.nanstd(values, axis=0)
+                return np.abs(z) > threshold
+            if method == "rolling":
+                roll = pd.DataFrame(values).rolling(window, center=True, min_periods=1)
+                mean = roll.mean().to_numpy()
+                std = roll.std().to_numpy()
+                std = np.where(std == 0, 1e-8, std)
+                return np.abs(values - mean) > threshold * std
+            mask = np.empty(values.shape, dtype=np.bool_)
+            kernels.rolling_mad_outliers(np.ascontiguousarray(values), window, threshold, MAD_SCALE, mask)
+            return mask
+
+    def detect_outliers(
+        self,
+        df: pd.DataFrame,
+        method: Optional[str] = None,
+        threshold: Optional[float] = None,
+        window: Optional[int] = None,
+    ) -> pd.DataFrame:
+        method, threshold, window = self._outlier_settings(method, threshold, window)
+        cols = df.select_dtypes(include=[np.number]).columns
+        mask = self._outlier_mask(df[cols].to_numpy(dtype=np.float64), method, threshold, window)
+        self._report_outliers(cols, mask, method)
+        return pd.DataFrame(mask, index=df.index, columns=[f"{col}_outlier" for col in cols])
+
+    def _report_outliers(self, cols: pd.Index, mask: np.ndarray, method: str) -> None:
+        counts = mask.sum(axis=0)
+        hits = np.flatnonzero(counts)
+        self._outliers_report.extend(
+            {"column": cols[j], "count": int(counts[j]), "method": method} for j in hits
+        )
+        if hits.size:
+            self._logger.debug(
+                f"[{self.mode}] Outliers: " + ", ".join(f"{cols[j]}={counts[j]}" for j in hits)
+            )
 
     def fix_outliers(
         self,
@@ -210,37 +233,35 @@ class OutlierGapCorrector:  # assinatura preservada
         threshold: Optional[float] = None,
         window: Optional[int] = None,
     ) -> pd.DataFrame:
-        method = method or self.outlier_params.get("method", "iqr")
+        method, threshold, window = self._outlier_settings(method, threshold, window)
         correction = correction or self.outlier_params.get("correction", "interpolate")
-        if threshold is None:
-            threshold = 3.0 if method in ("zscore", "rolling") else None
-        if method == "rolling" and window is None:
-            window = 20
-        if method not in self.SUPPORTED_OUTLIER_METHODS:
-            raise ValueError(
-                f"Outlier method '{method}' não suportado. Escolha um dos: {self.SUPPORTED_OUTLIER_METHODS}"
-            )
         if correction not in self.SUPPORTED_OUTLIER_CORRECTIONS:
             raise ValueError(
                 f"Correção '{correction}' não suportada. Escolha um dos: {self.SUPPORTED_OUTLIER_CORRECTIONS}"
             )
 
         df = df.copy()
-        flags = self.detect_outliers(df, method=method, threshold=threshold, window=window)
-        for col in df.select_dtypes(include=[np.number]).columns:
-            m = flags.get(f"{col}_outlier", pd.Series(False, index=df.index))
-            if not m.any():
-                continue
+        cols = df.select_dtypes(include=[np.number]).columns
+        mask = self._outlier_mask(df[cols].to_numpy(dtype=np.float64), method, threshold, window)
+        self._report_outliers(cols, mask, method)
+
+        hit = mask.any(axis=0)
+        if hit.any():
+            # correção aplicada de uma vez às colunas com outliers, na mesma cópia
+            hit_cols = cols[hit]
+            flags = pd.DataFrame(mask[:, hit], index=df.index, columns=hit_cols)
+            block = df[hit_cols]
             if correction == "nan":
-                df.loc[m, col] = np.nan
+                block = block.mask(flags)
             elif correction == "mean":
-                df.loc[m, col] = df.loc[~m, col].mean()
+                block = block.mask(flags, block.mask(flags).mean(), axis=1)
             elif correction == "interpolate":
-                df.loc[m, col] = np.nan
-                df[col] = df[col].interpolate(method="linear")
+                block = block.mask(flags).interpolate(method="linear")
             elif correction == "zero":
-                df.loc[m, col] = 0
-            df[f"{col}_fixed"] = m
+                block = block.mask(flags, 0)
+            df[hit_cols] = block
+            for col in hit_cols:
+                df[f"{col}_fixed"] = flags[col]
         fixed_cols = [c for c in df.columns if c.endswith("_fixed")]
         if fixed_cols:
             df["outlier_fixed"] = df[fixed_cols].any(axis=1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/permutation_engine.py
+
+Motor de permutation importance do FeatureSelector (substitui
+`sklearn.inspection.permutation_importance`).
+
+- A matriz de teste é gravada uma única vez em `.npy` e aberta pelos workers
+  com `mmap_mode="r"`: memória compartilhada pelo page cache, sem uma cópia
+  serializada de X por processo (o loky do sklearn serializa X para cada
+  worker).
+- Cada worker avalia um subconjunto dos grupos de features. Para cada bloco de
+  linhas, copia o bloco para um buffer próprio (`batch_rows` × features) e
+  permuta as colunas do grupo in-place, restaurando-as após o `predict` de
+  cada repetição. A memória por worker é o buffer mais as predições de um
+  grupo (n × repetições), independente do nº de núcleos.
+- Grupos de features correlacionadas (`correlated_groups`) podem ser
+  permutados juntos; a importância do grupo é atribuída a cada membro.
+- As permutações derivam de sementes sorteadas por (grupo, repetição) a partir
+  de `random_state`: o resultado não depende de `n_jobs`.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-30
+"""
+
+import os
+import tempfile
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.base import is_classifier
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.utils import Bunch
+
+from src.data.data_libs.correlation_engine import streaming_correlation
+
+# Linhas por bloco de predição
+PERM_BATCH_ROWS = 16_384
+
+
+def correlated_groups(X: pd.DataFrame, threshold: float) -> List[List[int]]:
+    """
+    Grupos (componentes conexas) de features com |r| > `threshold`.
+
+    Returns:
+        list[list[int]]: Posições das colunas por grupo, na ordem da primeira
+        coluna de cada grupo; features isoladas formam grupos unitários.
+    """
+    corr = np.nan_to_num(np.abs(streaming_correlation(X)))
+    np.fill_diagonal(corr, 0.0)
+    _, labels = connected_components(csr_matrix(corr > threshold), directed=False)
+    groups: dict = {}
+    for pos, label in enumerate(labels):
+        groups.setdefault(label, []).append(pos)
+    return list(groups.values())
+
+
+def _default_metric(model: Any) -> Callable[[np.ndarray, np.ndarray], float]:
+    """Mesma métrica de `model.score`: acurácia (classificação) ou R² (regressão)."""
+    return accuracy_score if is_classifier(model) else r2_score
+
+
+def _predict(model: Any, values: np.ndarray) -> np.ndarray:
+    """`predict` preservando os nomes das features com que o modelo foi ajustado."""
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        values = pd.DataFrame(values, columns=names, copy=False)
+    return model.predict(values)
+
+
+def _predict_batched(model: Any, X: np.ndarray, batch_rows: int) -> np.ndarray:
+    return np.concatenate(
+        [_predict(model, np.asarray(X[start:start + batch_rows])) for start in range(0, len(X), batch_rows)]
+    )
+
+
+def _score_groups(
+    model: Any,
+    X: Any,
+    y: np.ndarray,
+    groups: Sequence[Sequence[int]],
+    seeds: np.ndarray,
+    metric: Callable[[np.ndarray, np.ndarray], float],
+    batch_rows: int,
+) -> np.ndarray:
+    """
+    Scores permutados (grupos × repetições) de um subconjunto de grupos.
+
+    `X` é a matriz de teste (ndarray ou caminho `.npy`, aberto em mmap somente
+    leitura); só o buffer do bloco corrente é gravável.
+    """
+    if isinstance(X, str):
+        X = np.load(X, mmap_mode="r")
+    n_rows = len(X)
+    n_repeats = seeds.shape[1]
+    scores = np.empty((len(groups), n_repeats))
+    buf = np.empty((min(batch_rows, n_rows), X.shape[1]), dtype=X.dtype)
+    for g, cols in enumerate(groups):
+        cols = np.asarray(cols)
+        perms = [np.random.RandomState(seed).permutation(n_rows) for seed in seeds[g]]
+        preds = None
+        for start in range(0, n_rows, batch_rows):
+            stop = min(start + batch_rows, n_rows)
+            block = buf[:stop - start]
+            block[:] = X[start:stop]
+            original = block[:, cols].copy()
+            for r, perm in enumerate(perms):
+                # permuta in-place as colunas do grupo (linhas sorteadas de todo o teste)
+                block[:, cols] = X[np.ix_(perm[start:stop], cols)]
+                pred = _predict(model, block)
+                if preds is None:
+                    preds = np.empty((n_repeats, n_rows), dtype=pred.dtype)
+                preds[r, start:stop] = pred
+            block[:, cols] = original  # restaura
+        scores[g] = [metric(y, preds[r]) for r in range(n_repeats)]
+    return scores
+
+
+def permutation_importance_shared(
+    model: Any,
+    X: pd.DataFrame,
+    y: pd.Series,
+    n_repeats: int = 5,
+    random_state: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    groups: Optional[Sequence[Sequence[int]]] = None,
+    metric: Optional[Callable[[np.ndarray, np.ndarray], float]] = None,
+    batch_rows: int = PERM_BATCH_ROWS,
+) -> Bunch:
+    """
+    Permutation importance com matriz de teste compartilhada (memmap).
+
+    Args:
+        model: Estimador ajustado.
+        X (DataFrame): Matriz de teste.
+        y (Series): Alvo de teste.
+        n_repeats (int): Repetições por grupo.
+        random_state (int, opcional): Semente das permutações.
+        n_jobs (int, opcional): Processos (semântica do joblib; None/1 = no processo atual).
+        groups (Sequence[Sequence[int]], opcional): Posições das colunas
+            permutadas juntas; padrão: uma coluna por grupo.
+        metric (callable, opcional): `metric(y_true, y_pred)`; padrão: a
+            métrica de `model.score`.
+        batch_rows (int): Linhas por bloco de predição.
+
+    Returns:
+        Bunch: `importances` (features × repetições), `importances_mean`,
+        `importances_std` (por feature; membros de um grupo recebem a
+        importância do grupo) e `groups`.
+
+    Raises:
+        ValueError: `batch_rows` inválido ou grupos que não cobrem as colunas.
+    """
+    if batch_rows < 1:
+        raise ValueError(f"batch_rows deve ser positivo, recebido: {batch_rows}")
+    n_features = X.shape[1]
+    groups = [list(g) for g in groups] if groups is not None else [[j] for j in range(n_features)]
+    members = sorted(j for g in groups for j in g)
+    if members != list(range(n_features)):
+        raise ValueError(f"Os grupos devem cobrir cada uma das {n_features} colunas exatamente uma vez.")
+    metric = metric or _default_metric(model)
+    values = np.ascontiguousarray(X.to_numpy() if isinstance(X, pd.DataFrame) else X)
+    y_true = np.asarray(y)
+
+    rng = np.random.RandomState(random_state)
+    seeds = rng.randint(np.iinfo(np.int32).max, size=(len(groups), n_repeats))
+    baseline = metric(y_true, _predict_batched(model, values, batch_rows))
+
+    n_workers = min(effective_n_jobs(n_jobs), len(groups))
+    if n_workers <= 1:
+        scores = _score_groups(model, values, y_true, groups, seeds, metric, batch_rows)
+    else:
+        parts = np.array_split(np.arange(len(groups)), n_workers)
+        with tempfile.TemporaryDirectory(prefix="op_trader_perm_") as tmp:
+            path = os.path.join(tmp, "X_test.npy")
+            np.save(path, values)
+            chunks = Parallel(n_jobs=n_workers)(
+                delayed(_score_groups)(
+                    model, path, y_true, [groups[i] for i in part], seeds[part], metric, batch_rows
+                )
+                for part in parts
+            )
+        scores = np.concatenate(chunks)
+
+    group_importances = baseline - scores
+    importances = np.empty((n_features, n_repeats))
+    for g, cols in enumerate(groups):
+        importances[cols] = group_importances[g]
+    return Bunch(
+        importances=importances,
+        importances_mean=importances.mean(axis=1),
+        importances_std=importances.std(axis=1),
+        groups=groups,
+    )
+
+# EOF
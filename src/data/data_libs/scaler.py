@@ -3,44 +3,87 @@
 ScalerUtils — Utilitário oficial de normalização de features Op_Trader
 
 Fornece métodos robustos para ajuste, aplicação e persistência de normalizadores
-(StandardScaler) no pipeline batch/real-time. Em conformidade com padrões:
+(padronização z-score, mesma semântica do StandardScaler) no pipeline
+batch/real-time. Em conformidade com padrões:
 - Logging estruturado, propagate=False
 - Fit/transform com suffix `_norm`
-- Persistência via pickle com tratamento de erros
+- Transformação in-place sobre um bloco contíguo no dtype do scaler
+  (`transform_block`, ou em um buffer do chamador) e caminho rápido por linha
+  para inferência ao vivo (`transform_one`)
+- Persistência em JSON versionado e compacto (colunas, média, escala), lido
+  sem importar sklearn; arquivos pickle legados (StandardScaler) continuam
+  carregáveis
 
 Autor: Equipe Op_Trader
 Data: 2025-06-12
 """
 
+import json
 import pickle
 from pathlib import Path
-from typing import Optional, List
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 
 from src.utils.logging_utils import get_logger
 
+SCALER_FORMAT = "op_trader.standard_scaler"
+SCALER_FORMAT_VERSION = 1
+
 
 class ScalerUtils:
     """
-    Utilitário para ajuste, aplicação e persistência de StandardScaler
-    no Op_Trader.
+    Utilitário para ajuste, aplicação e persistência de padronização
+    (média/desvio populacional) no Op_Trader.
+
+    Args:
+        debug (bool): Ativa logs DEBUG.
+        dtype (str): Dtype do bloco transformado ("float64" ou "float32").
 
     Atributos:
-        scaler (StandardScaler): instância treinada.
+        columns (list[str]): colunas usadas no fit.
+        mean_ (np.ndarray): médias por coluna (float64).
+        scale_ (np.ndarray): desvios por coluna (float64; 1.0 em colunas constantes).
+        n_samples_ (int): linhas usadas no fit.
         logger: logger com propagate=False.
     """
 
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, dtype: str = "float64"):
         level = "DEBUG" if debug else None
         self.logger = get_logger(self.__class__.__name__, level)
         self.logger.propagate = False
-        self.scaler: Optional[StandardScaler] = None
+        self.dtype = np.dtype(dtype)
+        if self.dtype.kind != "f":
+            raise ValueError(f"dtype do scaler deve ser float, recebido: {dtype}")
+        self.columns: Optional[List[str]] = None
+        self.mean_: Optional[np.ndarray] = None
+        self.scale_: Optional[np.ndarray] = None
+        self.n_samples_: int = 0
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.mean_ is not None
+
+    def fit(self, df: pd.DataFrame) -> "ScalerUtils":
+        """
+        Calcula média e desvio populacional por coluna (NaN ignorados).
+
+        Args:
+            df: DataFrame não vazio de colunas contínuas.
+        Raises:
+            ValueError: df inválido.
+        """
+        self._check_frame(df, "fit")
+        cols: List[str] = list(df.columns)
+        self.logger.info(f"Ajustando scaler nas colunas: {cols} (shape={df.shape})")
+        self._fit_values(df.to_numpy(dtype=np.float64), cols)
+        self.logger.debug("Scaler ajustado com sucesso.")
+        return self
 
     def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Ajusta o StandardScaler e retorna DataFrame normalizado.
+        Ajusta o scaler e retorna DataFrame normalizado.
 
         Args:
             df: DataFrame não vazio de colunas contínuas.
@@ -49,25 +92,14 @@ class ScalerUtils:
         Raises:
             ValueError: df inválido.
         """
-        if not isinstance(df, pd.DataFrame) or df.empty:
-            msg = "df deve ser um DataFrame não vazio para fit_transform."
-            self.logger.error(msg)
-            raise ValueError(msg)
-
+        self._check_frame(df, "fit_transform")
         cols: List[str] = list(df.columns)
-        self.logger.info(f"Ajustando StandardScaler nas colunas: {cols} (shape={df.shape})")
-
-        scaler = StandardScaler()
-        arr = scaler.fit_transform(df[cols])
-        df_norm = pd.DataFrame(
-            arr,
-            index=df.index,
-            columns=[f"{c}_norm" for c in cols]
-        )
+        self.logger.info(f"Ajustando scaler nas colunas: {cols} (shape={df.shape})")
 
-        self.scaler = scaler
+        block = df.to_numpy(dtype=self.dtype, copy=True)  # única cópia: bloco contíguo do scaler
+        self._fit_values(block, cols)
         self.logger.debug("Scaler ajustado com sucesso.")
-        return df_norm
+        return self._to_frame(self.transform_block(block), df.index)
 
     def transform(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -79,48 +111,84 @@ class ScalerUtils:
             DataFrame com colunas '<col>_norm'.
         Raises:
             RuntimeError: scaler não treinado.
-            ValueError: df inválido.
+            ValueError: df inválido ou colunas diferentes das do fit.
         """
-        if self.scaler is None:
-            msg = "Scaler não treinado. Use fit_transform ou load_scaler antes."
-            self.logger.error(msg)
-            raise RuntimeError(msg)
-        if not isinstance(df, pd.DataFrame) or df.empty:
-            msg = "df deve ser um DataFrame não vazio para transform."
+        self._check_fitted()
+        self._check_frame(df, "transform")
+        cols: List[str] = [str(c) for c in df.columns]
+        if cols != self.columns:
+            msg = f"Colunas diferentes das usadas no fit: {cols} != {self.columns}"
             self.logger.error(msg)
             raise ValueError(msg)
-
-        cols: List[str] = list(df.columns)
         self.logger.info(f"Aplicando scaler nas colunas: {cols} (shape={df.shape})")
 
-        arr = self.scaler.transform(df[cols])
-        df_norm = pd.DataFrame(
-            arr,
-            index=df.index,
-            columns=[f"{c}_norm" for c in cols]
-        )
-
+        block = df.to_numpy(dtype=self.dtype, copy=True)
+        df_norm = self._to_frame(self.transform_block(block), df.index)
         self.logger.debug("Transformação aplicada com sucesso.")
         return df_norm
 
-    def save_scaler(self, path: Path) -> None:
+    def transform_block(self, block: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
         """
-        Persiste o scaler em disco via pickle.
+        Padroniza um bloco (linhas × colunas do fit) sem alocar.
 
         Args:
-            path: caminho completo com extensão .pkl.
+            block: Matriz no dtype do scaler; transformada in-place se `out` for None.
+            out: Buffer do chamador (mesmo shape) para receber o resultado.
+        Returns:
+            np.ndarray: `out` (ou o próprio `block`).
         Raises:
             RuntimeError: scaler não treinado.
+            ValueError: dtype diferente do scaler na transformação in-place.
         """
-        if self.scaler is None:
-            msg = "Nenhum scaler treinado para salvar."
-            self.logger.error(msg)
-            raise RuntimeError(msg)
+        self._check_fitted()
+        if out is None:
+            if block.dtype != self.dtype:
+                raise ValueError(f"Bloco {block.dtype} para transformação in-place; esperado {self.dtype}.")
+            out = block
+        np.subtract(block, self._mean, out=out, casting="same_kind")
+        np.divide(out, self._scale, out=out)
+        return out
+
+    def transform_one(self, row: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Caminho rápido para uma observação (vetor na ordem de `columns`).
+
+        Args:
+            row: Vetor de features (shape (n,) ou (1, n)).
+            out: Buffer opcional no dtype do scaler.
+        Returns:
+            np.ndarray: Vetor normalizado no dtype do scaler.
+        """
+        if self.mean_ is None:
+            self._check_fitted()
+        out = np.subtract(row, self._mean, out=out, dtype=self.dtype, casting="same_kind")
+        return np.divide(out, self._scale, out=out)
 
+    def save_scaler(self, path: Path) -> None:
+        """
+        Persiste os parâmetros do scaler em JSON versionado (escrita atômica).
+
+        Args:
+            path: caminho completo (ex.: `scaler_mlp_<hash>.json`).
+        Raises:
+            RuntimeError: scaler não treinado.
+        """
+        self._check_fitted()
+        payload = {
+            "format": SCALER_FORMAT,
+            "version": SCALER_FORMAT_VERSION,
+            "dtype": self.dtype.name,
+            "n_samples": self.n_samples_,
+            "columns": self.columns,
+            "mean": self.mean_.tolist(),
+            "scale": self.scale_.tolist(),
+        }
+        path = Path(path)
         try:
             path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, "wb") as f:
-                pickle.dump(self.scaler, f)
+            tmp = path.with_name(f"{path.name}.tmp")
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            tmp.replace(path)
             self.logger.info(f"Scaler salvo com sucesso em: {path}")
         except Exception as e:
             self.logger.error(f"Falha ao salvar scaler em {path}: {e}")
@@ -128,24 +196,86 @@ class ScalerUtils:
 
     def load_scaler(self, path: Path) -> None:
         """
-        Carrega scaler de disco e armazena em self.scaler.
+        Carrega o scaler de disco (JSON versionado ou pickle legado de StandardScaler).
 
         Args:
-            path: caminho completo com extensão .pkl.
+            path: caminho do artefato salvo.
         Raises:
             FileNotFoundError: arquivo não existe.
+            ValueError: formato ou versão desconhecidos.
         """
+        path = Path(path)
         if not path.exists():
             msg = f"Arquivo de scaler não encontrado: {path}"
             self.logger.error(msg)
             raise FileNotFoundError(msg)
 
         try:
-            with open(path, "rb") as f:
-                self.scaler = pickle.load(f)
+            raw = path.read_bytes()
+            if raw[:1] == b"\x80":
+                self._load_legacy_pickle(raw)
+            else:
+                payload = json.loads(raw)
+                if payload.get("format") != SCALER_FORMAT or payload.get("version", 0) > SCALER_FORMAT_VERSION:
+                    raise ValueError(
+                        f"Formato de scaler não suportado: {payload.get('format')} v{payload.get('version')}"
+                    )
+                self.dtype = np.dtype(payload.get("dtype", "float64"))
+                self._set_params(payload["columns"], payload["mean"], payload["scale"], payload.get("n_samples", 0))
             self.logger.info(f"Scaler carregado com sucesso de: {path}")
         except Exception as e:
             self.logger.error(f"Falha ao carregar scaler de {path}: {e}")
             raise
 
+    # ---------- internos ----------
+    def _fit_values(self, values: np.ndarray, cols: List[str]) -> None:
+        """Média/variância em float64; colunas constantes recebem escala 1.0 (como o sklearn)."""
+        if np.isnan(values).any():
+            n_samples = (~np.isnan(values)).sum(axis=0)
+            mean = np.nanmean(values, axis=0, dtype=np.float64)
+            var = np.nanvar(values, axis=0, dtype=np.float64)
+        else:
+            n_samples = len(values)
+            mean = values.mean(axis=0, dtype=np.float64)
+            var = values.var(axis=0, dtype=np.float64)
+        eps = np.finfo(np.float64).eps
+        constant = var <= n_samples * eps * var + (n_samples * mean * eps) ** 2
+        scale = np.sqrt(var)
+        scale[constant | (scale == 0)] = 1.0
+        self._set_params(cols, mean, scale, len(values))
+
+    def _set_params(self, cols: List[str], mean, scale, n_samples: int) -> None:
+        self.columns = [str(c) for c in cols]
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        self.n_samples_ = int(n_samples)
+        # Cópias no dtype do bloco: transform sem conversões por chamada
+        self._mean = self.mean_.astype(self.dtype)
+        self._scale = self.scale_.astype(self.dtype)
+
+    def _load_legacy_pickle(self, raw: bytes) -> None:
+        """StandardScaler serializado pelas versões anteriores (importa sklearn)."""
+        scaler = pickle.loads(raw)
+        cols = getattr(scaler, "feature_names_in_", None)
+        if cols is None:
+            cols = [f"x{i}" for i in range(scaler.n_features_in_)]
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(scaler.n_features_in_)
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(scaler.n_features_in_)
+        self._set_params(list(cols), mean, scale, int(np.max(scaler.n_samples_seen_)))
+
+    def _to_frame(self, block: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        return pd.DataFrame(block, index=index, columns=[f"{c}_norm" for c in self.columns], copy=False)
+
+    def _check_fitted(self) -> None:
+        if not self.is_fitted:
+            msg = "Scaler não foi carregado ou treinado. Use fit_transform ou load_scaler antes."
+            self.logger.error(msg)
+            raise RuntimeError(msg)
+
+    def _check_frame(self, df: pd.DataFrame, op: str) -> None:
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            msg = f"df deve ser um DataFrame não vazio para {op}."
+            self.logger.error(msg)
+            raise ValueError(msg)
+
 # EOF
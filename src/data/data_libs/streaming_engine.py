@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/streaming_engine.py
+
+StreamingEngine — processamento incremental das barras recebidas em streaming
+(`DataCollectorMT5.collect_streaming`) pelas etapas do DataPipeline:
+limpeza → correção de gaps/outliers → features.
+
+Cada lote recebido é reduzido às barras ainda não processadas; apenas elas
+(mais uma cauda de aquecimento de `warmup_bars` barras) passam pelas etapas:
+
+- limpeza: somente as barras novas;
+- gaps: barras novas + última barra corrigida (preenchimento a partir dela);
+- outliers: detecção sobre a cauda de aquecimento + barras novas;
+- features causais: `IncrementalFeatureCalculator` (O(1) por barra);
+- features não causais (dependem da amostra): recalculadas sobre a cauda.
+
+O primeiro lote (histórico) segue o caminho batch (`calculate_all`) e aquece
+o estado incremental. O custo por barra depende apenas de `warmup_bars`, não
+do tamanho do histórico; a latência de cada lote é medida do recebimento até
+a gravação das saídas e consolidada em `latency_report()`.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-23
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data.data_libs.data_cleaner_wrapper import DataCleanerWrapper
+from src.data.data_libs.feature_calculator import FeatureCalculator
+from src.data.data_libs.incremental_feature_calculator import NON_CAUSAL_FEATURES, IncrementalFeatureCalculator
+from src.data.data_libs.outlier_gap_corrector import OutlierGapCorrector
+from src.data.data_libs.trading_calendar import TradingCalendar, resolve_calendar
+from src.utils.logging_utils import get_logger
+
+COLUMNS_REQUIRED = ["datetime", "open", "high", "low", "close", "volume"]
+CORRECTION_FLAGS = ["gap_fixed", "volume_fixed", "outlier_fixed"]
+STAGES = ("raw", "cleaned", "corrected", "features")
+
+# Rótulos calculados com barras futuras: indisponíveis no momento da barra
+LABEL_FEATURES = ("delta_points",)
+
+# Nº máximo de medições de latência mantidas para o relatório
+LATENCY_WINDOW = 10_000
+
+
+class StreamingEngine:
+    """
+    Motor incremental do modo streaming do DataPipeline.
+
+    Usage:
+        engine = StreamingEngine(features=["ema_fast", "rsi"], freq="5min")
+        collector.collect_streaming(lambda df: engine.process(df, sink=appenders.append))
+        engine.latency_report()
+
+    Args:
+        features (List[str]): Features a calcular.
+        params (dict, opcional): Parâmetros por feature (formato de `calculate_all`).
+        freq (str): Frequência pandas do timeframe (grade de gaps).
+        gap_params (dict, opcional): Parâmetros do OutlierGapCorrector para gaps.
+        outlier_params (dict, opcional): Parâmetros do OutlierGapCorrector para outliers.
+        calendar (TradingCalendar, opcional): Agenda de mercado do símbolo (padrão: "fx").
+        warmup_bars (int): Tamanho da cauda de aquecimento (detecção de outliers
+            e features não causais).
+        closed_bars_only (bool): Descarta a barra mais recente de cada lote (ainda
+            em formação); ela é processada quando uma barra posterior chegar.
+        latency_budget_ms (float, opcional): Orçamento de latência por lote; lotes
+            acima dele geram warning e são contados no relatório.
+        ohlc_decimals (int): Casas decimais da limpeza.
+        dtype (str): Política de dtype das features ("float64" ou "float32").
+        debug (bool): Ativa logs detalhados (DEBUG).
+
+    Raises:
+        ValueError: `warmup_bars` inválido ou feature sem suporte.
+    """
+
+    def __init__(
+        self,
+        features: List[str],
+        params: Optional[Dict[str, Dict[str, Any]]] = None,
+        freq: str = "5min",
+        gap_params: Optional[Dict[str, Any]] = None,
+        outlier_params: Optional[Dict[str, Any]] = None,
+        calendar: Optional[TradingCalendar] = None,
+        warmup_bars: int = 500,
+        closed_bars_only: bool = True,
+        latency_budget_ms: Optional[float] = None,
+        ohlc_decimals: int = 10,
+        dtype: str = "float64",
+        debug: bool = False,
+    ):
+        if not isinstance(warmup_bars, int) or warmup_bars < 1:
+            raise ValueError(f"warmup_bars deve ser inteiro positivo, recebido: {warmup_bars}")
+        self.logger = get_logger("op_trader.streaming_engine", "DEBUG" if debug else None)
+        labels = [f for f in features if f in LABEL_FEATURES]
+        if labels:
+            self.logger.warning(f"Rótulos com janela futura ignorados em streaming: {labels}")
+        self.features = [f for f in features if f not in LABEL_FEATURES]
+        self.params = params or {}
+        self.warmup_bars = warmup_bars
+        self.closed_bars_only = closed_bars_only
+        self.latency_budget_ms = latency_budget_ms
+        self.ohlc_decimals = ohlc_decimals
+        self.dtype = dtype
+        calendar = calendar or resolve_calendar()
+
+        causal = [f for f in self.features if f not in NON_CAUSAL_FEATURES]
+        self._windowed = [f for f in self.features if f in NON_CAUSAL_FEATURES]
+        self._inc = (
+            IncrementalFeatureCalculator(features=causal, params=self.params, debug=debug, calendar=calendar)
+            if causal else None
+        )
+        self._calc = FeatureCalculator(debug=debug, dtype=dtype, calendar=calendar)
+        self._cleaner = DataCleanerWrapper(debug=debug, mode="streaming")
+        self._corrector = OutlierGapCorrector(
+            freq=freq, debug=debug, mode="streaming",
+            gap_params=dict(gap_params or {}), outlier_params=dict(outlier_params or {}),
+            calendar=calendar,
+        )
+        self.reset()
+
+    def reset(self) -> None:
+        """Descarta estado, caudas e medições de latência."""
+        self._last_dt: Optional[pd.Timestamp] = None
+        self._gap_tail: Optional[pd.DataFrame] = None
+        self._feat_tail: Optional[pd.DataFrame] = None
+        self._columns: Optional[List[str]] = None
+        self._dtypes: Optional[pd.Series] = None
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.bars = 0
+        self.batches = 0
+        self.over_budget = 0
+        self.bootstrap_seconds: Optional[float] = None
+        self.last_features: Optional[pd.DataFrame] = None
+        if self._inc is not None:
+            self._inc.reset()
+
+    # ======================== PROCESSAMENTO ===================================
+    def process(
+        self, df_raw: pd.DataFrame, sink: Optional[Callable[[str, pd.DataFrame], None]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Processa um lote do coletor: apenas as barras posteriores à última já
+        processada atravessam as etapas. `sink(etapa, df)` recebe as linhas
+        novas de cada etapa (`STAGES`) para gravação incremental.
+
+        Returns:
+            Linhas novas da etapa de features (ou None se não houver barras novas).
+        """
+        start = time.perf_counter()
+        new = self._new_bars(df_raw)
+        if new.empty:
+            return None
+        emit = sink or (lambda etapa, df: None)
+        bootstrap = self._columns is None
+        self._last_dt = new["datetime"].iloc[-1]
+        emit("raw", new)
+
+        clean = self._cleaner.clean(new, self.ohlc_decimals, columns_required=COLUMNS_REQUIRED)
+        features = None
+        if not clean.empty:
+            emit("cleaned", clean)
+            corrected = self._correct(clean)
+            if not corrected.empty:
+                emit("corrected", corrected)
+                features = self._features(corrected, bootstrap)
+                if not features.empty:
+                    emit("features", features)
+        self.last_features = features
+        self._record(time.perf_counter() - start, len(new), bootstrap and self._columns is not None)
+        return features
+
+    def _new_bars(self, df_raw: pd.DataFrame) -> pd.DataFrame:
+        """Barras do lote ainda não processadas, ordenadas e sem duplicatas."""
+        if not isinstance(df_raw, pd.DataFrame) or df_raw.empty:
+            return pd.DataFrame(columns=COLUMNS_REQUIRED)
+        missing = [c for c in COLUMNS_REQUIRED if c not in df_raw.columns]
+        if missing:
+            raise ValueError(f"Colunas obrigatórias ausentes no lote: {missing}")
+        df = df_raw[COLUMNS_REQUIRED].assign(datetime=pd.to_datetime(df_raw["datetime"]))
+        df = df.sort_values("datetime").drop_duplicates("datetime", keep="last")
+        if self.closed_bars_only:
+            df = df.iloc[:-1]
+        if self._last_dt is not None:
+            df = df[df["datetime"] > self._last_dt]
+        return df.reset_index(drop=True)
+
+    def _correct(self, clean: pd.DataFrame) -> pd.DataFrame:
+        """Gaps a partir da última barra corrigida; outliers sobre a cauda + barras novas."""
+        prev = self._gap_tail
+        if prev is not None:
+            ctx = pd.concat([prev[COLUMNS_REQUIRED].iloc[-1:], clean], ignore_index=True)
+            gapped = self._corrector.fix_gaps(ctx)
+            gapped = gapped[gapped["datetime"] > prev["datetime"].iloc[-1]].reset_index(drop=True)
+        else:
+            gapped = self._corrector.fix_gaps(clean)
+        if gapped.empty:
+            return gapped
+
+        window = gapped if prev is None else pd.concat([prev, gapped], ignore_index=True)
+        self._gap_tail = window.iloc[-self.warmup_bars:].reset_index(drop=True)
+        fixed = self._corrector.fix_outliers(window).iloc[len(window) - len(gapped):]
+        flags = {flag: fixed[flag] if flag in fixed.columns else False for flag in CORRECTION_FLAGS}
+        fixed = fixed[COLUMNS_REQUIRED].assign(**flags).astype({flag: int for flag in CORRECTION_FLAGS})
+        return fixed.reset_index(drop=True)
+
+    def _features(self, corrected: pd.DataFrame, bootstrap: bool) -> pd.DataFrame:
+        return self._bootstrap(corrected) if bootstrap else self._update(corrected)
+
+    def _bootstrap(self, corrected: pd.DataFrame) -> pd.DataFrame:
+        """Primeiro lote: caminho batch (`calculate_all`) e aquecimento do estado incremental."""
+        frame = self._calc.calculate_all(corrected, features=self.features, params=self.params)
+        if self._inc is not None:
+            self._inc.warmup(corrected)
+        self._feat_tail = corrected.iloc[-self.warmup_bars:].reset_index(drop=True)
+        self._columns = list(frame.columns)
+        features = self._clean_features(frame)
+        self._dtypes = features.dtypes
+        self.logger.info(
+            f"Streaming aquecido com {len(corrected)} barras "
+            f"({len(self.features) - len(self._windowed)} features incrementais, {len(self._windowed)} por janela)."
+        )
+        return features
+
+    def _update(self, corrected: pd.DataFrame) -> pd.DataFrame:
+        """Features das barras novas: incrementais + não causais sobre a cauda."""
+        parts = [corrected]
+        if self._inc is not None:
+            rows = [self._inc.update(bar) for bar in corrected.to_dict("records")]
+            parts.append(pd.DataFrame(rows, index=corrected.index))
+        window = pd.concat([self._feat_tail, corrected], ignore_index=True)
+        window = window.iloc[-max(self.warmup_bars, len(corrected)):].reset_index(drop=True)
+        if self._windowed:
+            out = self._calc.calculate_all(window, features=self._windowed, params=self.params, features_only=True)
+            parts.append(out.iloc[-len(corrected):].set_axis(corrected.index))
+        self._feat_tail = window.iloc[-self.warmup_bars:].reset_index(drop=True)
+        features = self._clean_features(pd.concat(parts, axis=1).reindex(columns=self._columns))
+        return features.astype(self._dtypes) if not features.empty else features
+
+    def _clean_features(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Mesma limpeza da etapa de features do batch (linhas com NaN descartadas)."""
+        return self._cleaner.clean(
+            frame, self.ohlc_decimals, columns_required=list(frame.columns),
+            keep_dtypes=self.dtype != "float64", inplace=True,
+        )
+
+    # ======================== LATÊNCIA ========================================
+    def _record(self, elapsed: float, bars: int, bootstrap: bool) -> None:
+        self.bars += bars
+        self.batches += 1
+        if bootstrap:
+            self.bootstrap_seconds = elapsed
+            self.logger.info(f"Histórico inicial processado: {bars} barras em {elapsed:.2f}s")
+            return
+        latency_ms = elapsed * 1000
+        self._latencies.append(latency_ms)
+        self.logger.debug(f"Lote de {bars} barra(s) processado em {latency_ms:.1f} ms")
+        if self.latency_budget_ms is not None and latency_ms > self.latency_budget_ms:
+            self.over_budget += 1
+            self.logger.warning(
+                f"Latência {latency_ms:.1f} ms acima do orçamento ({self.latency_budget_ms} ms) "
+                f"para {bars} barra(s)."
+            )
+
+    def latency_report(self) -> Dict[str, Any]:
+        """
+        Resumo da latência ponta a ponta (recebimento do lote → saídas gravadas)
+        dos lotes posteriores ao aquecimento.
+
+        Returns:
+            Dict com bars, batches, bootstrap_s, latency_ms (mean/p50/p95/max,
+            sobre os últimos `LATENCY_WINDOW` lotes), budget_ms e over_budget.
+        """
+        lat = np.fromiter(self._latencies, dtype=float)
+        stats = (
+            {
+                "mean": float(lat.mean()),
+                "p50": float(np.percentile(lat, 50)),
+                "p95": float(np.percentile(lat, 95)),
+                "max": float(lat.max()),
+            }
+            if lat.size else {}
+        )
+        return {
+            "bars": self.bars,
+            "batches": self.batches,
+            "bootstrap_s": self.bootstrap_seconds,
+            "latency_ms": stats,
+            "budget_ms": self.latency_budget_ms,
+            "over_budget": self.over_budget,
+        }
+
+
+class ChunkedEngine(StreamingEngine):
+    """
+    Execução out-of-core do pipeline batch: lotes consecutivos do histórico
+    (em ordem temporal) atravessam limpeza → gaps/outliers → features com a
+    mesma mecânica de caudas do StreamingEngine, de modo que a memória
+    depende do tamanho do lote e de `overlap_bars`, não do histórico.
+
+    As features são calculadas em batch (`calculate_all`) sobre
+    [contexto passado | barras pendentes | lote]: cada barra emitida tem ao
+    menos `overlap_bars` barras de contexto antes e depois (as últimas
+    `overlap_bars` de cada lote ficam pendentes até o próximo), o que mantém
+    rótulos com janela futura (ex.: delta_points). `flush` emite as
+    pendentes ao final.
+
+    Resultado idêntico ao batch para features com janelas ≤ `overlap_bars`;
+    médias exponenciais convergem dentro da sobreposição. Outliers por
+    estatística global (zscore/iqr) usam a cauda + lote, como no streaming.
+
+    Usage:
+        engine = ChunkedEngine(features, freq="1min", overlap_bars=500)
+        for chunk in collector.collect_chunks(chunk_days=30):
+            engine.process(chunk, sink)
+        engine.flush(sink)
+    """
+
+    def __init__(
+        self,
+        features: List[str],
+        params: Optional[Dict[str, Dict[str, Any]]] = None,
+        freq: str = "5min",
+        gap_params: Optional[Dict[str, Any]] = None,
+        outlier_params: Optional[Dict[str, Any]] = None,
+        calendar: Optional[TradingCalendar] = None,
+        overlap_bars: int = 500,
+        ohlc_decimals: int = 10,
+        dtype: str = "float64",
+        debug: bool = False,
+    ):
+        super().__init__(
+            features=[], params=params, freq=freq, gap_params=gap_params, outlier_params=outlier_params,
+            calendar=calendar, warmup_bars=overlap_bars, closed_bars_only=False,
+            ohlc_decimals=ohlc_decimals, dtype=dtype, debug=debug,
+        )
+        self.features = list(features)
+        self.overlap_bars = overlap_bars
+
+    def reset(self) -> None:
+        super().reset()
+        self._ctx: Optional[pd.DataFrame] = None
+        self._past = 0  # barras de self._ctx já emitidas (contexto passado)
+
+    def _features(self, corrected: pd.DataFrame, bootstrap: bool) -> pd.DataFrame:
+        ctx = corrected if self._ctx is None else pd.concat([self._ctx, corrected], ignore_index=True)
+        return self._emit(ctx, end=len(ctx) - self.overlap_bars)
+
+    def flush(self, sink: Optional[Callable[[str, pd.DataFrame], None]] = None) -> Optional[pd.DataFrame]:
+        """Emite as barras pendentes do último lote (fim do histórico)."""
+        if self._ctx is None or self._past >= len(self._ctx):
+            return None
+        features = self._emit(self._ctx, end=len(self._ctx))
+        if sink is not None and not features.empty:
+            sink("features", features)
+        self.last_features = features
+        return features
+
+    def _emit(self, ctx: pd.DataFrame, end: int) -> pd.DataFrame:
+        """Features das posições [self._past, end) de `ctx`; guarda o contexto do próximo lote."""
+        if end <= self._past:
+            self._ctx = ctx
+            return pd.DataFrame()
+        frame = self._calc.calculate_all(ctx, features=self.features, params=self.params)
+        keep_from = max(end - self.overlap_bars, 0)
+        out = frame.iloc[self._past:end]
+        self._ctx = ctx.iloc[keep_from:].reset_index(drop=True)
+        self._past = end - keep_from
+        features = self._clean_features(out)
+        if self._dtypes is None:
+            if not features.empty:
+                self._columns = list(frame.columns)
+                self._dtypes = features.dtypes
+            return features
+        return features.astype(self._dtypes) if not features.empty else features
+
+# EOF
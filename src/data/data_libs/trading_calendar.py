@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+src/data/data_libs/trading_calendar.py
+
+Calendário de negociação por instrumento do Op_Trader.
+
+Cada calendário declara, no fuso da bolsa/mercado:
+- dias da semana negociados (0=segunda … 6=domingo);
+- sessões do dia como faixas [abertura, último candle] "HH:MM" (inclusivas);
+- feriados (datas locais sem negociação).
+
+Os timestamps dos candles (fuso `data_timezone`, MT5 = UTC por convenção do
+pipeline) são convertidos para o fuso do calendário antes da checagem, de modo
+que o horário de verão desloca a sessão automaticamente.
+
+A grade de candles esperada por (calendário, freq, início, fim) é
+memoizada: gaps detectados/preenchidos em etapas diferentes reutilizam a
+mesma grade sem reconstruí-la.
+
+Calendários embutidos (BUILTIN_CALENDARS): fx, crypto, us_index e as sessões
+de mercado london, newyork, tokyo, sydney e frankfurt (`session_calendars`,
+usadas pela feature market_hours). Outros podem ser declarados em um JSON
+(`definitions_file`) com o mesmo formato.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-25
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CALENDAR = "fx"
+
+BUILTIN_CALENDARS: Dict[str, Dict[str, Any]] = {
+    # FX spot: segunda–sexta, evitando o rollover de 00:00–00:05 e 23:55+ (UTC)
+    "fx": {"timezone": "UTC", "weekdays": [0, 1, 2, 3, 4], "sessions": [["00:05", "23:55"]]},
+    "crypto": {"timezone": "UTC", "weekdays": [0, 1, 2, 3, 4, 5, 6], "sessions": [["00:00", "23:59"]]},
+    # Pregão regular NYSE/Nasdaq (feriados via definitions_file)
+    "us_index": {"timezone": "America/New_York", "weekdays": [0, 1, 2, 3, 4], "sessions": [["09:30", "15:59"]]},
+    # Sessões da feature market_hours, no horário local de cada praça (no inverno
+    # do hemisfério norte: london 08–16, newyork 14–23 e tokyo 00–09 UTC)
+    "london": {"timezone": "Europe/London", "weekdays": [0, 1, 2, 3, 4], "sessions": [["08:00", "15:59"]]},
+    "newyork": {"timezone": "America/New_York", "weekdays": [0, 1, 2, 3, 4], "sessions": [["09:00", "17:59"]]},
+    "tokyo": {"timezone": "Asia/Tokyo", "weekdays": [0, 1, 2, 3, 4], "sessions": [["09:00", "17:59"]]},
+    "sydney": {"timezone": "Australia/Sydney", "weekdays": [0, 1, 2, 3, 4], "sessions": [["07:00", "15:59"]]},
+    "frankfurt": {"timezone": "Europe/Berlin", "weekdays": [0, 1, 2, 3, 4], "sessions": [["08:00", "16:59"]]},
+}
+
+# Nº máximo de grades memoizadas (uma grade M1 de 5 anos ocupa ~15 MB)
+GRID_CACHE_SIZE = 16
+
+
+def _parse_minute(value: Any) -> int:
+    """Converte "HH:MM" (ou minuto do dia inteiro) em minuto do dia."""
+    if isinstance(value, (int, np.integer)):
+        minute = int(value)
+    else:
+        hour, _, minute_str = str(value).strip().partition(":")
+        minute = int(hour) * 60 + int(minute_str or 0)
+    if not 0 <= minute < 1440:
+        raise ValueError(f"Horário de sessão inválido: {value}")
+    return minute
+
+
+@dataclass(frozen=True)
+class TradingCalendar:
+    """
+    Agenda de negociação de um instrumento (imutável e hashable).
+
+    Args:
+        name (str): Nome do calendário.
+        timezone (str): Fuso das sessões/feriados (ex.: "America/New_York").
+        weekdays (tuple[int]): Dias negociados (0=segunda).
+        sessions (tuple[tuple[int, int]]): Faixas [abertura, último candle] em
+            minutos do dia, inclusivas.
+        holidays (tuple[str]): Datas "YYYY-MM-DD" sem negociação (fuso local).
+        data_timezone (str): Fuso dos timestamps sem fuso dos candles.
+    """
+
+    name: str
+    timezone: str = "UTC"
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4)
+    sessions: Tuple[Tuple[int, int], ...] = ((0, 1439),)
+    holidays: Tuple[str, ...] = ()
+    data_timezone: str = "UTC"
+
+    @classmethod
+    def from_dict(cls, name: str, spec: Dict[str, Any], data_timezone: str = "UTC") -> "TradingCalendar":
+        """
+        Cria o calendário a partir da definição declarativa (BUILTIN_CALENDARS/JSON).
+
+        Raises:
+            ValueError: Dia da semana ou sessão inválidos.
+        """
+        weekdays = tuple(sorted({int(d) for d in spec.get("weekdays", range(5))}))
+        if any(not 0 <= d <= 6 for d in weekdays):
+            raise ValueError(f"Calendário '{name}': dias da semana inválidos {weekdays}")
+        sessions = []
+        for start, end in spec.get("sessions", [["00:00", "23:59"]]):
+            start, end = _parse_minute(start), _parse_minute(end)
+            if start > end:
+                raise ValueError(f"Calendário '{name}': sessão atravessa a meia-noite ({start} > {end})")
+            sessions.append((start, end))
+        holidays = tuple(sorted(str(pd.Timestamp(h).date()) for h in spec.get("holidays", [])))
+        return cls(
+            name=name,
+            timezone=spec.get("timezone", "UTC"),
+            weekdays=weekdays,
+            sessions=tuple(sessions),
+            holidays=holidays,
+            data_timezone=data_timezone,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Definição serializável (snapshot de configuração/hash)."""
+        return asdict(self)
+
+    def mask(self, idx: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Máscara booleana das posições de `idx` dentro do calendário.
+
+        Aritmética inteira sobre o epoch int64 no horário de parede do fuso do
+        calendário; índices sem fuso são interpretados em `data_timezone`.
+        """
+        if idx.tz is None and self.timezone != self.data_timezone:
+            idx = idx.tz_localize(self.data_timezone, ambiguous="NaT", nonexistent="NaT")
+        if idx.tz is not None:
+            idx = idx.tz_convert(self.timezone).tz_localize(None)
+        stamps = idx.to_numpy()
+        unit, _ = np.datetime_data(stamps.dtype)
+        per_minute = np.timedelta64(1, "m") // np.timedelta64(1, unit)
+        raw = stamps.view(np.int64)
+        minutes = raw // per_minute
+        days = minutes // 1440
+        minute_of_day = minutes - days * 1440
+        weekday = (days + 3) % 7  # 1970-01-01 foi quinta-feira
+
+        in_session = np.zeros(len(idx), dtype=bool)
+        for start, end in self.sessions:
+            in_session |= (minute_of_day >= start) & (minute_of_day <= end)
+        mask = in_session & np.isin(weekday, self.weekdays) & (raw != np.iinfo(np.int64).min)
+        if self.holidays:
+            holiday_days = np.array(self.holidays, dtype="datetime64[D]").view(np.int64)
+            mask &= ~np.isin(days, holiday_days)
+        return mask
+
+    def grid(self, freq: str, start: Any, end: Any) -> pd.DatetimeIndex:
+        """
+        Grade de candles esperados em `freq` entre `start` e `end` (inclusive),
+        ancorada em `start` e restrita ao calendário. Memoizada por
+        (calendário, freq, início, fim); o índice devolvido é imutável.
+        """
+        return _cached_grid(self, freq, pd.Timestamp(start), pd.Timestamp(end))
+
+    def grid_values(self, freq: str, start: Any, end: Any) -> np.ndarray:
+        """Mesma grade de `grid` como array int64 (epoch na resolução do índice)."""
+        return self.grid(freq, start, end).asi8
+
+
+@lru_cache(maxsize=GRID_CACHE_SIZE)
+def _cached_grid(calendar: TradingCalendar, freq: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+    idx_full = pd.date_range(start=start, end=end, freq=freq)
+    return idx_full[calendar.mask(idx_full)]
+
+
+@lru_cache(maxsize=32)
+def session_calendars(session: str, data_timezone: str = "UTC") -> Tuple[TradingCalendar, ...]:
+    """
+    Calendários embutidos de uma lista ordenada de sessões ("london,newyork,tokyo").
+
+    Raises:
+        ValueError: Lista vazia ou sessão não definida.
+    """
+    names = [name.strip() for name in str(session).split(",") if name.strip()]
+    unknown = [name for name in names if name not in BUILTIN_CALENDARS]
+    if not names or unknown:
+        raise ValueError(f"Sessões inválidas '{session}'. Disponíveis: {sorted(BUILTIN_CALENDARS)}")
+    return tuple(TradingCalendar.from_dict(name, BUILTIN_CALENDARS[name], data_timezone=data_timezone) for name in names)
+
+
+def load_calendar_definitions(definitions_file: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Calendários embutidos mesclados com os do JSON `definitions_file`
+    ({nome: {timezone, weekdays, sessions, holidays}}); o arquivo prevalece.
+    """
+    definitions = {name: dict(spec) for name, spec in BUILTIN_CALENDARS.items()}
+    if definitions_file:
+        with open(definitions_file, encoding="utf-8") as f:
+            definitions.update(json.load(f))
+    return definitions
+
+
+def _parse_symbol_map(value: Any) -> Dict[str, str]:
+    """Aceita dict ou string "SIMBOLO:calendario,..." (config.ini)."""
+    if isinstance(value, dict):
+        return {str(k).upper(): str(v) for k, v in value.items()}
+    mapping = {}
+    for item in str(value or "").split(","):
+        if item.strip():
+            symbol, _, name = item.partition(":")
+            mapping[symbol.strip().upper()] = name.strip()
+    return mapping
+
+
+def resolve_calendar(symbol: Optional[str] = None, calendar_params: Optional[Dict[str, Any]] = None) -> TradingCalendar:
+    """
+    Resolve o calendário de um símbolo a partir da seção [CALENDAR].
+
+    Args:
+        symbol (str, opcional): Símbolo (ex.: "EURUSD").
+        calendar_params (dict, opcional): Chaves `default`, `symbol_calendars`
+            (dict ou "SIMBOLO:calendario,..."), `definitions_file` e
+            `data_timezone`.
+
+    Returns:
+        TradingCalendar: Calendário do símbolo (ou o padrão).
+
+    Raises:
+        ValueError: Calendário não definido.
+    """
+    params = calendar_params or {}
+    name = _parse_symbol_map(params.get("symbol_calendars")).get(
+        str(symbol or "").upper(), params.get("default") or DEFAULT_CALENDAR
+    )
+    definitions = load_calendar_definitions(params.get("definitions_file") or None)
+    if name not in definitions:
+        raise ValueError(f"Calendário '{name}' não definido. Disponíveis: {sorted(definitions)}")
+    return TradingCalendar.from_dict(name, definitions[name], data_timezone=params.get("data_timezone") or "UTC")
+
+# EOF
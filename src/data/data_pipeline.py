@@ -17,26 +17,62 @@ import os
 import json
 import pandas as pd
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from src.data.data_libs import data_cleaner_wrapper as cleaner_module
+from src.data.data_libs import feature_engineer as engineer_module
+from src.data.data_libs import feature_kernels as kernels_module
+from src.data.data_libs import outlier_gap_corrector as corrector_module
+from src.data.data_libs import trading_calendar as calendar_module
 from src.data.data_libs.data_collector_mt5 import DataCollectorMT5
 from src.data.data_libs.data_cleaner_wrapper import DataCleanerWrapper
 from src.data.data_libs.feature_engineer import FeatureEngineer
-from src.data.data_libs.feature_calculator import FeatureCalculator
+from src.data.data_libs.feature_calculator import FeatureCalculator, _code_version as feature_code_version
 from src.data.data_libs.feature_selector import FeatureSelector
 from src.data.data_libs.scaler import ScalerUtils
+from src.data.data_libs.streaming_engine import (
+    CORRECTION_FLAGS,
+    STAGES as STREAMING_STAGES,
+    ChunkedEngine,
+    StreamingEngine,
+)
+from src.data.data_libs.trading_calendar import resolve_calendar
 from src.data.data_libs.schema_utils import (
     align_dataframe_to_schema,
     load_feature_list,
     validate_dataframe_schema,
 )
-from src.utils.file_saver import build_filename, get_timestamp, save_dataframe
+from src.utils.file_saver import (
+    SUPPORTED_FORMATS,
+    DataFrameAppender,
+    build_filename,
+    get_timestamp,
+    load_dataframe,
+    save_dataframe,
+    storage_extension,
+)
 from src.utils.hash_utils import generate_config_hash
 from src.utils.logging_utils import get_logger
-from src.utils.pipeline_hash_utils import save_pipeline_hash_json
+from src.utils.pipeline_hash_utils import (
+    file_digest,
+    find_stage_artifact,
+    record_stage_artifact,
+    save_pipeline_hash_json,
+    source_digest,
+    stage_key,
+)
 
 __all__ = ["DataPipeline"]
 
+# Schema tipado das flags de correção gravadas com os estágios
+FLAG_DTYPES = {"gap_fixed": "int8", "volume_fixed": "int8", "outlier_fixed": "int8"}
+
+HASH_DIR = "data/hash"
+# Estágios com cache (pulados quando a chave já tem artefato); a finalização sempre roda
+CACHED_STAGES = ("raw", "cleaned", "corrected", "features")
+COLUMNS_REQUIRED_RAW = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+DECIMAL_PRECISION = 10
+
 class DataPipeline:
     """
     Orquestrador principal do pipeline de dados Op_Trader.
@@ -65,7 +101,21 @@ class DataPipeline:
         scaler_params: dict,
         debug: bool = False,
         callbacks: dict = None,
+        feature_dtype: str = "float64",
+        storage_format: str = "csv",
+        storage_compression: Optional[str] = None,
+        streaming_params: Optional[dict] = None,
+        chunk_params: Optional[dict] = None,
+        skip_unchanged: bool = True,
+        force_stages: Optional[List[str]] = None,
+        calendar_params: Optional[dict] = None,
+        quiet: bool = False,
+        reselect: bool = False,
     ):
+        if storage_format not in SUPPORTED_FORMATS:
+            raise ValueError(
+                f"Formato de armazenamento '{storage_format}' não suportado. Escolha um dos: {SUPPORTED_FORMATS}"
+            )
         self.config = config
         self.mode = mode
         self.pipeline_type = pipeline_type
@@ -83,6 +133,31 @@ class DataPipeline:
         self.scaler_params = scaler_params
         self.debug = debug
         self.callbacks = callbacks or {}
+        self.feature_dtype = feature_dtype
+        self.storage_format = storage_format
+        self.storage_compression = storage_compression or None
+        # CSV comprimido é gravado como `.csv.gz`/`.csv.bz2`/...: legível sem conhecer o codec
+        self.storage_ext = storage_extension(storage_format, self.storage_compression)
+        self.streaming_params = streaming_params or {}
+        self.streaming_report: Dict[str, Any] = {}
+        self.chunk_params = chunk_params or {}
+        self.chunked_report: Dict[str, Any] = {}
+        self.calendar = resolve_calendar(symbol, calendar_params)
+        # Sem barras/mensagens de progresso (jobs batch com log em arquivo)
+        self.quiet = quiet
+        # Ignora a seleção de features persistida e refaz o ajuste (--reselect)
+        self.reselect = reselect
+        force_stages = list(force_stages or [])
+        if "all" in force_stages:
+            force_stages = list(CACHED_STAGES)
+        unknown = [s for s in force_stages if s not in CACHED_STAGES]
+        if unknown:
+            raise ValueError(f"Estágios desconhecidos em force_stages: {unknown}. Escolha entre: {CACHED_STAGES}")
+        self.skip_unchanged = skip_unchanged
+        self.force_stages = set(force_stages)
+        # Manifesto por símbolo/timeframe: jobs paralelos não disputam o mesmo arquivo
+        self.stage_cache_path = os.path.join(HASH_DIR, f"stage_cache_{symbol}_{timeframe}.json")
+        self.stages: Dict[str, Dict[str, Any]] = {}
 
         self.logger = get_logger("op_trader.data_pipeline", "DEBUG" if debug else None)
         self.timestamp: str = get_timestamp()
@@ -94,6 +169,8 @@ class DataPipeline:
         """Executa pipeline completo com rastreabilidade centralizada."""
         if self.mode == "streaming":
             return self.run_streaming()
+        if self.mode == "chunked":
+            return self.run_chunked()
 
         self.logger.info(
             "=== Iniciando DataPipeline [%s] para %s/%s ===",
@@ -102,7 +179,141 @@ class DataPipeline:
             self.timeframe,
         )
 
+        cfg_hash = generate_config_hash(self._snapshot_config())
+        self._cfg_hash = cfg_hash
+
         # === PASSO 1: COLETA BRUTA ===
+        # Coleta com end_date futuro/ausente pode trazer barras novas: nunca é pulada
+        df_raw = self._run_stage("raw", cfg_hash, self._collect_raw, cacheable=self._raw_is_static())
+
+        # === PASSO 2: LIMPEZA INICIAL ===
+        df_clean = self._run_stage(
+            "cleaned", cfg_hash,
+            lambda: DataCleanerWrapper(debug=self.debug).clean(
+                df_raw(), DECIMAL_PRECISION, columns_required=COLUMNS_REQUIRED_RAW
+            ),
+        )
+
+        # === PASSO 3: CORREÇÃO GAPS/OUTLIERS ===
+        df_corr = self._run_stage("corrected", cfg_hash, lambda: self._correct(df_clean()))
+
+        # === PASSO 4: FEATURE ENGINEERING ===
+        df_features_clean = self._run_stage("features", cfg_hash, lambda: self._engineer(df_corr()))()
+
+        # === FINALIZAÇÃO ===
+        df_final = self._finalize(df_features_clean, cfg_hash)
+
+        self._save_pipeline_hash_json()
+        return df_final
+
+    def _finalize(self, df_features: pd.DataFrame, cfg_hash: str) -> pd.DataFrame:
+        """Finalização conforme pipeline_type (ppo, mlp ou ambos)."""
+        if self.pipeline_type == "ppo":
+            return self._finalize_ppo(df_features, cfg_hash)
+        if self.pipeline_type == "mlp":
+            return self._finalize_mlp(df_features, cfg_hash)
+        self._finalize_mlp(df_features, cfg_hash)
+        return self._finalize_ppo(df_features, cfg_hash)
+
+    # ======================== ESTÁGIOS COM CACHE =============================
+    def _run_stage(
+        self, etapa: str, cfg_hash: str, compute: Callable[[], pd.DataFrame], *, cacheable: bool = True
+    ) -> Callable[[], pd.DataFrame]:
+        """
+        Executa (ou pula) um estágio no estilo Make.
+
+        A chave do estágio combina o digest do artefato do estágio anterior com a
+        fatia de configuração e a versão do código do próprio estágio
+        (`_stage_config`). Se o manifesto
+        de estágios já tem um artefato válido para a chave, o estágio é pulado.
+
+        Returns:
+            Função que devolve o DataFrame do estágio. Em estágio pulado o
+            artefato só é lido do disco se um estágio posterior precisar dele.
+        """
+        previous = CACHED_STAGES[CACHED_STAGES.index(etapa) - 1] if etapa != CACHED_STAGES[0] else None
+        input_digest = self.stages[previous]["digest"] if previous else None
+        key = stage_key(etapa, input_digest, self._stage_config(etapa))
+
+        forced = etapa in self.force_stages
+        if self.skip_unchanged and cacheable and not forced:
+            entry = find_stage_artifact(self.stage_cache_path, etapa, key)
+            if entry:
+                self._corretora = self._corretora or entry.get("corretora")
+                self.outputs[etapa] = entry["path"]
+                self.stages[etapa] = {"key": key, "digest": entry["digest"], "status": "skipped"}
+                self.logger.info("Estágio '%s' inalterado (chave %s): reutilizando %s", etapa, key[:10], entry["path"])
+                loaded: Dict[str, pd.DataFrame] = {}
+
+                def _load() -> pd.DataFrame:
+                    if "df" not in loaded:
+                        loaded["df"] = load_dataframe(entry["path"])
+                    return loaded["df"]
+                return _load
+
+        df = compute()
+        self._save(etapa, df, cfg_hash)
+        path = self.outputs[etapa]
+        digest = file_digest(path)
+        record_stage_artifact(
+            self.stage_cache_path, etapa, key, path, digest, extra={"corretora": self._corretora}
+        )
+        self.stages[etapa] = {"key": key, "digest": digest, "status": "forced" if forced else "ok"}
+        return lambda: df
+
+    def _stage_config(self, etapa: str) -> Dict[str, Any]:
+        """
+        Fatia da configuração que afeta cada estágio (entra na chave do estágio),
+        com a versão do código do estágio: atualizar os módulos que o executam
+        refaz o estágio mesmo com a configuração inalterada.
+        """
+        if etapa == "raw":
+            return {
+                "symbol": self.symbol,
+                "timeframe": self.timeframe,
+                "start_date": self.start_date,
+                "end_date": self.end_date,
+                "volume_sources": self.volume_sources,
+                "volume_column": self.volume_column,
+            }
+        if etapa == "cleaned":
+            return {
+                "decimal_precision": DECIMAL_PRECISION,
+                "columns_required": COLUMNS_REQUIRED_RAW,
+                "code": source_digest(cleaner_module),
+            }
+        if etapa == "corrected":
+            cfg = {
+                "timeframe": self.timeframe,
+                "gap_params": self.gap_params,
+                "outlier_params": self.outlier_params,
+                "code": source_digest(corrector_module, calendar_module, kernels_module),
+            }
+            if self.calendar != resolve_calendar():
+                cfg["calendar"] = self.calendar.to_dict()
+            return cfg
+        cfg = {
+            "features": self.features,
+            "features_params": self.features_params,
+            "feature_dtype": self.feature_dtype,
+            "all_features": self._all_feature_outputs(),
+            # mesma versão das chaves do FeatureCache, mais o engineer e o cleaner finais
+            "code": f"{feature_code_version()}:{source_digest(engineer_module, cleaner_module)}",
+        }
+        if self.calendar != resolve_calendar():
+            cfg["calendar"] = self.calendar.to_dict()  # market_hours
+        return cfg
+
+    def _raw_is_static(self) -> bool:
+        """True se o período coletado já está fechado (end_date no passado)."""
+        if not self.end_date:
+            return False
+        try:
+            return pd.Timestamp(self.end_date) < pd.Timestamp.now()
+        except ValueError:
+            return False
+
+    def _collect_raw(self) -> pd.DataFrame:
         collector = DataCollectorMT5(
             symbol=self.symbol,
             timeframe=self.timeframe,
@@ -114,74 +325,220 @@ class DataPipeline:
         )
         df_raw, corretora, ohlc_decimals = collector.collect_batch()
         self._corretora = corretora
-        cfg_hash = generate_config_hash(self._snapshot_config())
-        self._cfg_hash = cfg_hash
-        self._save("raw", df_raw, cfg_hash)
-
-        # === PASSO 2: LIMPEZA INICIAL ===
-        COLUMNS_REQUIRED_RAW = ['datetime', 'open', 'high', 'low', 'close', 'volume']
-        decimal_precision = 10  # Defina aqui ou receba como param do runner
-        df_clean = DataCleanerWrapper(debug=self.debug).clean(
-            df_raw, decimal_precision, columns_required=COLUMNS_REQUIRED_RAW
-        )
-        self._save("cleaned", df_clean, cfg_hash)
+        return df_raw
 
-        # === PASSO 3: CORREÇÃO GAPS/OUTLIERS ===
+    def _correct(self, df_clean: pd.DataFrame) -> pd.DataFrame:
         from src.data.data_libs.outlier_gap_corrector import OutlierGapCorrector
-        gap_params = self.gap_params
-        outlier_params = self.outlier_params
-        freq_pandas = self._timeframe_to_pandas_freq(self.timeframe)
         corr = OutlierGapCorrector(
-            freq=freq_pandas,
+            freq=self._timeframe_to_pandas_freq(self.timeframe),
             debug=self.debug,
             mode=self.mode,
-            gap_params=gap_params,
-            outlier_params=outlier_params,
+            gap_params=self.gap_params,
+            outlier_params=self.outlier_params,
+            calendar=self.calendar,
         )
         df_corr = corr.fix_outliers(corr.fix_gaps(df_clean))
-        self._save("corrected", df_corr, cfg_hash)
+        # Flags sem correção nesta série (ex.: volume_fixed) entram zeradas, como no streaming
+        missing = {flag: 0 for flag in CORRECTION_FLAGS if flag not in df_corr.columns}
+        return df_corr.assign(**missing) if missing else df_corr
 
-        # === PASSO 4: FEATURE ENGINEERING ===
+    @staticmethod
+    def _all_feature_outputs() -> List[str]:
+        with open("config/features.json") as f:
+            return json.load(f)['all_features']
+
+    def _engineer(self, df_corr: pd.DataFrame) -> pd.DataFrame:
         feat_engineer = FeatureEngineer(
             features=self.features,
             params=self.features_params,
-            debug=self.debug
+            debug=self.debug,
+            cache_dir=self.dirs.get("feature_cache") or None,
+            dtype=self.feature_dtype,
+            calendar=self.calendar,
         )
         df_features = feat_engineer.transform(df_corr)
 
-        features_json_path = "config/features.json"
-        with open(features_json_path) as f:
-            all_outputs = json.load(f)['all_features']
-
         columns_required = [
             'datetime', 'open', 'high', 'low', 'close', 'volume',
             'gap_fixed', 'volume_fixed', 'outlier_fixed'
-        ] + all_outputs
+        ] + self._all_feature_outputs()
 
         cleaner = DataCleanerWrapper(debug=self.debug)
         df_features_clean = cleaner.clean(
-            df_features, decimal_precision, columns_required=columns_required
+            df_features, DECIMAL_PRECISION, columns_required=columns_required,
+            keep_dtypes=self.feature_dtype != "float64", inplace=True,
         )
 
         for col in ['gap_fixed', 'volume_fixed', 'outlier_fixed']:
             if col in df_features_clean.columns:
                 df_features_clean[col] = df_features_clean[col].astype(int)
-        self._save("features", df_features_clean, cfg_hash)
+        return df_features_clean
 
-        # === FINALIZAÇÃO ===
-        if self.pipeline_type == "ppo":
-            df_final = self._finalize_ppo(df_features_clean, cfg_hash)
-        elif self.pipeline_type == "mlp":
-            df_final = self._finalize_mlp(df_features_clean, cfg_hash)
-        else:
-            self._finalize_mlp(df_features_clean, cfg_hash)
-            df_final = self._finalize_ppo(df_features_clean, cfg_hash)
+    def run_streaming(self) -> Optional[pd.DataFrame]:
+        """
+        Executa o pipeline em streaming: cada lote de `collect_streaming` passa
+        pelo StreamingEngine (limpeza, gaps/outliers e features incrementais) e
+        as linhas novas são acrescentadas às saídas raw/cleaned/corrected/features.
+
+        As saídas são gravadas em CSV qualquer que seja `storage_format`
+        (legíveis durante a sessão e preservadas até o último lote se o
+        processo for interrompido; ver `_stage_appenders`).
+
+        Parâmetros (`streaming_params`): warmup_bars, poll_interval,
+        latency_budget_ms e closed_bars_only. O callback opcional
+        `callbacks["on_features"]` recebe as linhas novas de features.
 
+        Returns:
+            Linhas de features do último lote processado (ou None).
+        """
+        params = self.streaming_params
+        self.logger.info(
+            "=== Iniciando DataPipeline [STREAMING] para %s/%s ===", self.symbol, self.timeframe
+        )
+        collector = DataCollectorMT5(
+            symbol=self.symbol,
+            timeframe=self.timeframe,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            volume_sources=self.volume_sources,
+            volume_column=self.volume_column,
+            debug=self.debug,
+        )
+        self._corretora = collector.broker_name
+        cfg_hash = generate_config_hash(self._snapshot_config())
+        self._cfg_hash = cfg_hash
+
+        budget = params.get("latency_budget_ms")
+        engine = StreamingEngine(
+            features=self.features,
+            params=self.features_params,
+            freq=self._timeframe_to_pandas_freq(self.timeframe),
+            gap_params=self.gap_params,
+            outlier_params=self.outlier_params,
+            calendar=self.calendar,
+            warmup_bars=int(params.get("warmup_bars", 500)),
+            closed_bars_only=bool(params.get("closed_bars_only", True)),
+            latency_budget_ms=float(budget) if budget not in (None, "") else None,
+            dtype=self.feature_dtype,
+            debug=self.debug,
+        )
+        appenders = self._stage_appenders(cfg_hash, streaming=True)
+        on_features = self.callbacks.get("on_features")
+
+        def _on_batch(df_raw: pd.DataFrame) -> None:
+            df_features = engine.process(df_raw, sink=lambda etapa, df: appenders[etapa].append(df))
+            if on_features is not None and df_features is not None and not df_features.empty:
+                on_features(df_features)
+
+        try:
+            collector.collect_streaming(_on_batch, poll_interval=float(params.get("poll_interval", 5.0)))
+        finally:
+            self._close_appenders(appenders)
+            self.streaming_report = engine.latency_report()
+            self.logger.info("Streaming encerrado: %s", self.streaming_report)
+            self._save_pipeline_hash_json()
+        return engine.last_features
+
+    def run_chunked(self) -> Optional[pd.DataFrame]:
+        """
+        Executa o pipeline batch out-of-core: o período é coletado em lotes de
+        `chunk_days` dias (`DataCollectorMT5.collect_chunks`) que atravessam o
+        ChunkedEngine (limpeza, gaps/outliers e features com sobreposição de
+        `overlap_bars` barras) e são acrescentados às saídas
+        raw/cleaned/corrected/features (um bloco/row group por lote).
+
+        A memória de pico depende do lote e da sobreposição, não do histórico.
+        A finalização (seleção de features/scaler) precisa do conjunto inteiro:
+        só roda com `chunk_params["finalize"]` verdadeiro, sobre o arquivo de
+        features gravado.
+
+        Parâmetros (`chunk_params`): chunk_days, overlap_bars e finalize.
+
+        Returns:
+            DataFrame final (com finalize) ou None.
+        """
+        params = self.chunk_params
+        self.logger.info(
+            "=== Iniciando DataPipeline [CHUNKED] para %s/%s ===", self.symbol, self.timeframe
+        )
+        collector = DataCollectorMT5(
+            symbol=self.symbol,
+            timeframe=self.timeframe,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            volume_sources=self.volume_sources,
+            volume_column=self.volume_column,
+            debug=self.debug,
+        )
+        self._corretora = collector.broker_name
+        cfg_hash = generate_config_hash(self._snapshot_config())
+        self._cfg_hash = cfg_hash
+
+        engine = ChunkedEngine(
+            features=self.features,
+            params=self.features_params,
+            freq=self._timeframe_to_pandas_freq(self.timeframe),
+            gap_params=self.gap_params,
+            outlier_params=self.outlier_params,
+            calendar=self.calendar,
+            overlap_bars=int(params.get("overlap_bars", 500)),
+            ohlc_decimals=DECIMAL_PRECISION,
+            dtype=self.feature_dtype,
+            debug=self.debug,
+        )
+        appenders = self._stage_appenders(cfg_hash)
+
+        def sink(etapa: str, df: pd.DataFrame) -> None:
+            appenders[etapa].append(df)
+
+        try:
+            for df_raw in collector.collect_chunks(chunk_days=int(params.get("chunk_days", 30))):
+                engine.process(df_raw, sink=sink)
+            engine.flush(sink=sink)
+        finally:
+            self._close_appenders(appenders)
+        self.chunked_report = engine.latency_report()
+        self.logger.info("Execução em lotes concluída: %s", self.chunked_report)
+
+        df_final = None
+        if params.get("finalize") and "features" in self.outputs:
+            df_final = self._finalize(load_dataframe(self.outputs["features"]), cfg_hash)
         self._save_pipeline_hash_json()
         return df_final
 
-    def _save(self, etapa: str, df: pd.DataFrame, cfg_hash: str, *, ext: str = "csv") -> None:
-        """Salva DataFrame em diretório apropriado."""
+    def _stage_appenders(self, cfg_hash: str, *, streaming: bool = False) -> Dict[str, DataFrameAppender]:
+        """
+        Um gravador incremental por etapa (raw/cleaned/corrected/features).
+
+        Em streaming as saídas são sempre CSV: o laço não termina sozinho e um
+        writer Parquet/Feather só produz arquivo válido no `close()` (saídas
+        ilegíveis durante a sessão e perdidas se o processo for morto). Em CSV
+        cada lote é um append completo, legível logo após a gravação.
+        """
+        ext, compression = self.storage_ext, self.storage_compression
+        if streaming and self.storage_format != "csv":
+            self.logger.warning(
+                "Streaming grava as saídas dos estágios em CSV (storage_format '%s' vale para batch/chunked).",
+                self.storage_format,
+            )
+            ext, compression = "csv", None
+        return {
+            etapa: DataFrameAppender(
+                self._build_output_path(etapa, etapa, cfg_hash, ext=ext),
+                compression=compression,
+                dtypes=FLAG_DTYPES,
+            )
+            for etapa in STREAMING_STAGES
+        }
+
+    def _close_appenders(self, appenders: Dict[str, DataFrameAppender]) -> None:
+        for etapa, appender in appenders.items():
+            appender.close()
+            if appender.rows:
+                self.outputs[etapa] = appender.filepath
+
+    def _save(self, etapa: str, df: pd.DataFrame, cfg_hash: str, *, ext: Optional[str] = None) -> None:
+        """Salva DataFrame em diretório apropriado, no formato `storage_format` (ou `ext`)."""
         target_dir = self.dirs.get(etapa, "data/")
         step_name = f"{etapa}_{self.pipeline_type}"
         filename = build_filename(
@@ -193,15 +550,17 @@ class DataPipeline:
             timeframe=self.timeframe,
             period=f"{self.start_date}_{self.end_date}" if self.start_date and self.end_date else "",
             timestamp=f"{cfg_hash}_{self.timestamp}",
-            extension=ext,
+            extension=ext or self.storage_ext,
         )
-        save_dataframe(df, filename)
+        save_dataframe(df, filename, compression=self.storage_compression, dtypes=FLAG_DTYPES)
         self.logger.info("Salvo: %s", filename)
         self.outputs[etapa] = filename
 
     def _finalize_ppo(self, df_features: pd.DataFrame, cfg_hash: str) -> pd.DataFrame:
         """Alinha ao schema, seleciona features e salva artefato PPO."""
-        from src.data.data_libs.feature_selector import FeatureSelector, FeatureSelectorConfig
+        from src.data.data_libs.feature_selector import (
+            FeatureSelector, FeatureSelectorConfig, engine_params_from_ini,
+        )
         
         # 1. Preserva datetime se existir
         datetime_col = None
@@ -231,13 +590,14 @@ class DataPipeline:
             n_estimators=100,
             permutation_repeats=3,
             scaler_type="standard",
-            normalize=False
+            normalize=False,
+            **engine_params_from_ini(self.config.get("FEATURE_SELECTOR")),
         )
         
         # 5. Executa seleção de features
         try:
-            selector = FeatureSelector(df_aligned, fs_config)
-            selector.fit(show_progress=True)
+            selector = FeatureSelector(df_aligned, fs_config, quiet=self.quiet)
+            selector.fit(show_progress=True, reselect=self.reselect)
             recommended_features = selector.get_recommendations()
             
             # Log das features selecionadas
@@ -293,25 +653,8 @@ class DataPipeline:
             # 9. Cria esquemas PPO baseados na seleção de features
             ppo_features = list(df_aligned.columns)
             
-            # Salva feature_ppo.json (features selecionadas finais)
-            ppo_schema = {
-                "all_features": ppo_features
-            }
-            ppo_path = "config/feature_ppo.json"
-            os.makedirs("config", exist_ok=True)
-            with open(ppo_path, 'w') as f:
-                import json
-                json.dump(ppo_schema, f, indent=2)
-            
-            # Salva feature_schema_ppo.json (com metadados)
-            ppo_schema_full = {
-                "schema_file": "feature_ppo.json",
-                "all_features": ppo_features
-            }
-            ppo_schema_path = "config/feature_schema_ppo.json"
-            with open(ppo_schema_path, 'w') as f:
-                json.dump(ppo_schema_full, f, indent=2)
-            
+            # Salva feature_ppo_<símbolo>_<timeframe>.json e o schema com metadados
+            ppo_path, ppo_schema_path = self._save_feature_schema("ppo", ppo_features)
             self.logger.info(f"Schemas PPO salvos: {ppo_path} e {ppo_schema_path}")
             self.logger.info(f"Features no schema PPO: {len(ppo_features)} ({ppo_features})")
             
@@ -339,12 +682,7 @@ class DataPipeline:
             df_aligned = df_final
             
             # Salva schema básico de fallback
-            ppo_schema = {"all_features": list(df_aligned.columns)}
-            ppo_path = "config/feature_ppo.json"
-            os.makedirs("config", exist_ok=True)
-            with open(ppo_path, 'w') as f:
-                import json
-                json.dump(ppo_schema, f, indent=2)
+            self._save_feature_schema("ppo", list(df_aligned.columns))
         
         # 11. Formatação final datetime
         if 'datetime' in df_aligned.columns:
@@ -380,7 +718,9 @@ class DataPipeline:
 
     def _finalize_mlp(self, df_features: pd.DataFrame, cfg_hash: str) -> pd.DataFrame:
         """Alinha ao schema, seleciona features, normaliza e salva artefatos MLP."""
-        from src.data.data_libs.feature_selector import FeatureSelector, FeatureSelectorConfig
+        from src.data.data_libs.feature_selector import (
+            FeatureSelector, FeatureSelectorConfig, engine_params_from_ini,
+        )
         import os
         import json
         from pathlib import Path
@@ -413,13 +753,14 @@ class DataPipeline:
             n_estimators=100,
             permutation_repeats=3,
             scaler_type="standard",
-            normalize=True  # MLP sempre normaliza
+            normalize=True,  # MLP sempre normaliza
+            **engine_params_from_ini(self.config.get("FEATURE_SELECTOR")),
         )
         
         # 5. Executa seleção de features
         try:
-            selector = FeatureSelector(df_aligned, fs_config)
-            selector.fit(show_progress=True)
+            selector = FeatureSelector(df_aligned, fs_config, quiet=self.quiet)
+            selector.fit(show_progress=True, reselect=self.reselect)
             recommended_features = selector.get_recommendations()
             
             # Log das features selecionadas
@@ -504,7 +845,7 @@ class DataPipeline:
         normalize_cols = [col for col in df_selected.columns if col not in preserve_cols]
         
         # 11. Normalização usando ScalerUtils
-        scaler = ScalerUtils(debug=self.debug)
+        scaler = ScalerUtils(debug=self.debug, dtype=self.feature_dtype)
         
         # Aplica normalização nas colunas selecionadas
         self.logger.info(f"Normalizando {len(normalize_cols)} colunas: {normalize_cols}")
@@ -538,30 +879,14 @@ class DataPipeline:
         # 15. Cria schemas MLP baseados no DataFrame final
         mlp_features = list(df_final.columns)
         
-        # Salva feature_mlp.json (features do DataFrame final)
-        mlp_schema = {
-            "all_features": mlp_features
-        }
-        mlp_path = "config/feature_mlp.json"
-        os.makedirs("config", exist_ok=True)
-        with open(mlp_path, 'w') as f:
-            json.dump(mlp_schema, f, indent=2)
-        
-        # Salva feature_schema_mlp.json (com metadados)
-        mlp_schema_full = {
-            "schema_file": "feature_mlp.json",
-            "all_features": mlp_features
-        }
-        mlp_schema_path = "config/feature_schema_mlp.json"
-        with open(mlp_schema_path, 'w') as f:
-            json.dump(mlp_schema_full, f, indent=2)
-        
+        # Salva feature_mlp_<símbolo>_<timeframe>.json e o schema com metadados
+        mlp_path, mlp_schema_path = self._save_feature_schema("mlp", mlp_features)
         self.logger.info(f"Schemas MLP salvos: {mlp_path} e {mlp_schema_path}")
         self.logger.info(f"Features no schema MLP: {len(mlp_features)} ({mlp_features})")
         
         # 16. Salva o scaler na pasta correta com tags
         os.makedirs("data/scalers", exist_ok=True)
-        scaler_filename = f"scaler_mlp_{cfg_hash[:8]}.pkl"
+        scaler_filename = f"scaler_mlp_{cfg_hash[:8]}.json"
         scaler_path = Path("data/scalers") / scaler_filename
         scaler.save_scaler(scaler_path)
         
@@ -603,6 +928,32 @@ class DataPipeline:
         
         return df_final
 
+    def _save_feature_schema(self, kind: str, features: List[str]) -> Tuple[str, str]:
+        """
+        Grava em config/ a lista de features finais (`feature_<kind>_<símbolo>_<timeframe>.json`)
+        e o schema com metadados (`feature_schema_<kind>_<símbolo>_<timeframe>.json`).
+
+        Os nomes por símbolo/timeframe isolam os jobs paralelos da grade; os
+        caminhos entram em `outputs` (manifesto do pipeline e do orquestrador).
+
+        Returns:
+            Tuple[str, str]: Caminhos da lista de features e do schema.
+        """
+        suffix = f"{kind}_{self.symbol}_{self.timeframe}"
+        list_file = f"feature_{suffix}.json"
+        list_path = os.path.join("config", list_file)
+        schema_path = os.path.join("config", f"feature_schema_{suffix}.json")
+        os.makedirs("config", exist_ok=True)
+        for path, payload in (
+            (list_path, {"all_features": features}),
+            (schema_path, {"schema_file": list_file, "all_features": features}),
+        ):
+            with open(path, "w") as f:
+                json.dump(payload, f, indent=2)
+        self.outputs[f"feature_list_{kind}"] = list_path
+        self.outputs[f"feature_schema_{kind}"] = schema_path
+        return list_path, schema_path
+
     def _build_output_path(self, etapa: str, prefix: str, cfg_hash: str, *, ext: str = "csv") -> str:
         """Gera caminho completo (sem salvar) para artefatos auxiliares."""
         target_dir = self.dirs.get(etapa, "data/")
@@ -621,7 +972,7 @@ class DataPipeline:
 
     def _snapshot_config(self) -> Dict[str, Any]:
         """Snapshot dos parâmetros críticos – base para config_hash."""
-        return {
+        snapshot = {
             "pipeline_type": self.pipeline_type,
             "mode": self.mode,
             "symbol": self.symbol,
@@ -634,6 +985,13 @@ class DataPipeline:
             "outlier_params": self.outlier_params,
             "scaler_params": self.scaler_params,
         }
+        # dtype padrão fora do snapshot: mantém os hashes de execuções anteriores
+        if self.feature_dtype != "float64":
+            snapshot["feature_dtype"] = self.feature_dtype
+        # idem para o calendário padrão ("fx")
+        if self.calendar != resolve_calendar():
+            snapshot["calendar"] = self.calendar.to_dict()
+        return snapshot
 
     @staticmethod
     def _timeframe_to_pandas_freq(timeframe: str) -> str:
@@ -648,7 +1006,7 @@ class DataPipeline:
 
     def _save_pipeline_hash_json(self):
         """Salva JSON centralizador de rastreamento do pipeline."""
-        hash_dir = "data/hash"
+        hash_dir = HASH_DIR
         os.makedirs(hash_dir, exist_ok=True)
         hash_filename = os.path.join(
             hash_dir, f"hash_{self.pipeline_type}_{self._cfg_hash}_{self.timestamp}.json"
@@ -667,6 +1025,7 @@ class DataPipeline:
             end_date=self.end_date,
             status={k: "ok" if v else "pending" for k, v in self.outputs.items()},
             log_path=None,
+            extra={"stages": self.stages} if self.stages else None,
         )
         self.logger.info(f"Hash centralizador salvo: {hash_filename}")
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+src/data/pipeline_orchestrator.py
+
+Orquestrador batch Op_Trader: expande a grade símbolo × timeframe do config.ini
+em jobs independentes de DataPipeline e os executa em um pool de processos.
+
+- Cada job roda em processo próprio (pool com `workers` processos) e tem
+  stdout/stderr (logs, barras de progresso) redirecionados para um arquivo
+  de log exclusivo.
+- As saídas de cada job são isoladas por símbolo/timeframe: artefatos dos
+  estágios e finais (ativo/timeframe no nome), schemas de features
+  selecionadas (`config/feature[_schema]_<ppo|mlp>_<símbolo>_<timeframe>.json`),
+  relatórios e scalers (hash da configuração, que inclui o par) e o cache de
+  estágios por símbolo/timeframe do DataPipeline. Todos os caminhos constam
+  em `outputs` no manifesto.
+- A falha de um job é registrada e não interrompe os demais. Se um worker
+  morre abruptamente (falha nativa, `os._exit`) e quebra o pool, os jobs
+  não concluídos são re-executados cada um em processo exclusivo, de modo
+  que só o job culpado é marcado como falho.
+- Um manifesto consolidado (status, duração, saídas, estágios e log de cada
+  job) é gravado ao final.
+
+Autor: Equipe Op_Trader
+Data: 2025-06-24
+"""
+
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.utils.file_saver import get_timestamp, save_json
+from src.utils.logging_utils import get_logger
+
+logger = get_logger("op_trader.pipeline_orchestrator")
+
+JobRunner = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def build_jobs(base_args: Dict[str, Any], symbols: List[str], timeframes: List[str]) -> List[Dict[str, Any]]:
+    """
+    Expande a grade símbolo × timeframe em argumentos de DataPipeline.
+
+    Args:
+        base_args (dict): Argumentos comuns do DataPipeline (sem symbol/timeframe).
+        symbols (List[str]): Símbolos (ex.: ["EURUSD", "GBPUSD"]).
+        timeframes (List[str]): Timeframes (ex.: ["M5", "H1"]).
+
+    Returns:
+        List[dict]: Um dicionário de argumentos por combinação, na ordem da grade.
+
+    Raises:
+        ValueError: Lista de símbolos ou timeframes vazia.
+    """
+    if not symbols or not timeframes:
+        raise ValueError(f"Grade vazia: symbols={symbols}, timeframes={timeframes}")
+    return [
+        {**base_args, "symbol": symbol, "timeframe": timeframe}
+        for symbol in symbols
+        for timeframe in timeframes
+    ]
+
+
+def run_pipeline_job(pipeline_args: Dict[str, Any]) -> Dict[str, Any]:
+    """Executa um DataPipeline e devolve suas saídas e o status dos estágios."""
+    from src.data.data_pipeline import DataPipeline
+
+    pipeline = DataPipeline(**pipeline_args)
+    pipeline.run()
+    return {"outputs": dict(pipeline.outputs), "stages": dict(pipeline.stages)}
+
+
+@contextmanager
+def _redirect_output(log_path: str) -> Iterator[None]:
+    """
+    Redireciona stdout/stderr do processo para `log_path`: os descritores 1/2
+    (handlers de logging, bibliotecas nativas) e `sys.stdout`/`sys.stderr`
+    (caso tenham sido substituídos, ex.: captura de saída).
+    """
+    directory = os.path.dirname(log_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    saved_streams = (sys.stdout, sys.stderr)
+    try:
+        with open(log_path, "a", encoding="utf-8", buffering=1) as f:
+            os.dup2(f.fileno(), 1)
+            os.dup2(f.fileno(), 2)
+            sys.stdout = sys.stderr = f
+            try:
+                yield
+            finally:
+                f.flush()
+                sys.stdout, sys.stderr = saved_streams
+                os.dup2(saved[0], 1)
+                os.dup2(saved[1], 2)
+    finally:
+        for fd in saved:
+            os.close(fd)
+
+
+def _execute_job(pipeline_args: Dict[str, Any], log_path: str, runner: JobRunner) -> Dict[str, Any]:
+    """Executa um job isolado; exceções viram status "failed" no resultado."""
+    result: Dict[str, Any] = {
+        "symbol": pipeline_args.get("symbol"),
+        "timeframe": pipeline_args.get("timeframe"),
+        "log": log_path,
+    }
+    start = time.perf_counter()
+    with _redirect_output(log_path):
+        try:
+            result.update(runner(pipeline_args))
+            result["status"] = "ok"
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["duration_s"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_jobs(
+    jobs: List[Dict[str, Any]],
+    workers: int = 1,
+    log_dir: str = "logs/pipeline",
+    manifest_dir: str = "data/hash",
+    runner: Optional[JobRunner] = None,
+) -> Dict[str, Any]:
+    """
+    Executa os jobs (sequencialmente se `workers == 1`, senão em pool de
+    processos) e grava o manifesto consolidado da rodada.
+
+    Args:
+        jobs (List[dict]): Argumentos de DataPipeline por job (ver `build_jobs`).
+        workers (int): Nº de processos simultâneos.
+        log_dir (str): Diretório dos logs por job.
+        manifest_dir (str): Diretório do manifesto `run_manifest_<timestamp>.json`.
+        runner (callable, opcional): Função executada por job (padrão:
+            `run_pipeline_job`); deve ser importável para o pool de processos.
+
+    Returns:
+        dict: Manifesto (timestamp, workers, jobs, summary, path).
+
+    Raises:
+        ValueError: `workers` menor que 1.
+    """
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError(f"workers deve ser inteiro positivo, recebido: {workers}")
+    runner = runner or run_pipeline_job
+    timestamp = get_timestamp()
+    log_paths = [
+        os.path.join(log_dir, f"pipeline_{job.get('symbol')}_{job.get('timeframe')}_{timestamp}.log")
+        for job in jobs
+    ]
+    workers = min(workers, len(jobs)) or 1
+    logger.info(f"Orquestrando {len(jobs)} jobs com {workers} worker(s).")
+
+    start = time.perf_counter()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    if workers == 1:
+        for i, job in enumerate(jobs):
+            results[i] = _execute_job(job, log_paths[i], runner)
+            _log_result(results[i])
+    else:
+        # Pool compartilhado; se um worker morrer (falha nativa) o pool inteiro
+        # quebra e todos os futures pendentes falham sem culpa: esses jobs são
+        # re-executados isolados (um processo por job) e só o culpado é marcado.
+        suspects: List[int] = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_execute_job, job, log_paths[i], runner): i for i, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    suspects.append(i)
+                    continue
+                _log_result(results[i])
+        if suspects:
+            logger.warning(
+                f"Pool de processos quebrado (worker encerrado abruptamente): "
+                f"re-executando {len(suspects)} job(s) isolados."
+            )
+            for batch_start in range(0, len(suspects), workers):
+                batch = sorted(suspects)[batch_start:batch_start + workers]
+                isolated = {i: ProcessPoolExecutor(max_workers=1) for i in batch}
+                try:
+                    futures = {
+                        isolated[i].submit(_execute_job, jobs[i], log_paths[i], runner): i for i in batch
+                    }
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        try:
+                            results[i] = future.result()
+                        except BrokenProcessPool as e:
+                            # processo exclusivo do job morreu: só este job é marcado
+                            results[i] = {
+                                "symbol": jobs[i].get("symbol"),
+                                "timeframe": jobs[i].get("timeframe"),
+                                "log": log_paths[i],
+                                "status": "failed",
+                                "error": f"Worker encerrado abruptamente: {e}",
+                            }
+                        _log_result(results[i])
+                finally:
+                    for executor in isolated.values():
+                        executor.shutdown(wait=True)
+
+    failed = [r for r in results if r["status"] != "ok"]
+    manifest = {
+        "timestamp": timestamp,
+        "workers": workers,
+        "jobs": results,
+        "summary": {
+            "total": len(results),
+            "ok": len(results) - len(failed),
+            "failed": len(failed),
+            "duration_s": round(time.perf_counter() - start, 3),
+        },
+    }
+    manifest["path"] = os.path.join(manifest_dir, f"run_manifest_{timestamp}.json")
+    save_json(manifest, manifest["path"])
+    logger.info(
+        f"Rodada concluída: {manifest['summary']['ok']}/{len(results)} ok. Manifesto: {manifest['path']}"
+    )
+    return manifest
+
+
+def _log_result(result: Dict[str, Any]) -> None:
+    label = f"{result['symbol']}/{result['timeframe']}"
+    if result["status"] == "ok":
+        logger.info(f"Job {label} concluído em {result.get('duration_s', 0):.1f}s")
+    else:
+        logger.error(f"Job {label} falhou: {result.get('error')} (log: {result['log']})")
+
+# EOF
@@ -23,6 +23,7 @@ from typing import Tuple, List, Dict, Any
 from src.utils.path_setup import ensure_project_root
 from src.utils.logging_utils import get_logger
 from src.data.data_pipeline import DataPipeline
+from src.data.pipeline_orchestrator import build_jobs, run_jobs
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -34,6 +35,19 @@ def parse_args():
     parser.add_argument("--diagnosis-debug-level", help="Nível detalhado de debug")
     parser.add_argument("--diagnosis-max-log-size", help="Tamanho máximo do arquivo de log")
     parser.add_argument("--diagnosis-backup-count", type=int, help="Qtd. de arquivos de backup de log")
+    parser.add_argument(
+        "--force-stage", action="append", default=[],
+        choices=["raw", "cleaned", "corrected", "features", "all"],
+        help="Reexecuta o estágio mesmo com artefato em cache (repetível; 'all' força todos)",
+    )
+    parser.add_argument(
+        "--reselect", action="store_true",
+        help="Refaz a seleção de features mesmo com resultado persistido ([FEATURE_SELECTOR] results_cache_dir)",
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="Processos simultâneos na grade símbolo × timeframe (padrão: [DATA] pipeline_workers)",
+    )
     return parser.parse_args()
 
 def load_config(path: str) -> dict:
@@ -75,7 +89,8 @@ def parse_feature_params(feature_cfg: dict, logger=None) -> Tuple[List[str], Dic
                 # Parâmetros mais comuns em features de finanças
                 if tokens[-1] in {
                     "window", "lag", "method", "short", "long", "signal", "lookback", "bins",
-                    "format", "mode", "threshold", "span", "n", "states", "pip_size", "min_hold"
+                    "format", "mode", "threshold", "span", "n", "states", "pip_size", "min_hold",
+                    "session",
                 }:
                     feature = "_".join(tokens[:-1])
                     param = tokens[-1]
@@ -177,12 +192,17 @@ def main():
     scaler_cfg = config.get("SCALER", {})
     feature_cfg = config.get("FEATURE_ENGINEER", {})
     env_cfg = config.get("ENV", {})
+    streaming_cfg = config.get("STREAMING", {})
+    calendar_cfg = config.get("CALENDAR", {})
+    chunked_cfg = config.get("CHUNKED", {})
 
     # 7. Parsing seguro dos parâmetros de features e outros dicionários!
     features_lista, features_params = parse_feature_params(feature_cfg, logger=logger)
     gap_params = parse_params(gap_cfg, logger=logger)
     outlier_params = parse_params(outlier_cfg, logger=logger)
     scaler_params = parse_params(scaler_cfg, logger=logger)
+    streaming_params = parse_params(streaming_cfg, logger=logger)
+    chunk_params = parse_params(chunked_cfg, logger=logger)
 
     logger.debug(f"Lista de features: {features_lista}")
     logger.debug(f"Dicionário de parâmetros de features: {features_params}")
@@ -194,8 +214,6 @@ def main():
         "config": config,
         "mode": env_cfg.get("mode", "batch"),
         "pipeline_type": data_cfg.get("pipeline_type", "ppo"),
-        "symbol": data_cfg.get("symbols", "EURUSD").split(",")[0].strip(),
-        "timeframe": data_cfg.get("timeframes", "M5").split(",")[0].strip(),
         "features": features_lista,
         "features_params": features_params,
         "start_date": data_cfg.get("start_date", ""),
@@ -211,21 +229,50 @@ def main():
             "scaler": data_cfg.get("scaler_dir", "data/scaler"),
             "final_ppo": data_cfg.get("final_ppo_dir", "data/final_ppo"),
             "final_mlp": data_cfg.get("final_mlp_dir", "data/final_mlp"),
+            "feature_cache": data_cfg.get("feature_cache_dir", ""),
         },
         "gap_params": gap_params,
         "outlier_params": outlier_params,
         "scaler_params": scaler_params,
         "debug": args.debug,
         "callbacks": None,
+        "feature_dtype": data_cfg.get("feature_dtype", "float64").strip(),
+        "storage_format": data_cfg.get("storage_format", "csv").strip().lower(),
+        "storage_compression": data_cfg.get("storage_compression", "").strip() or None,
+        "streaming_params": streaming_params,
+        "chunk_params": chunk_params,
+        "skip_unchanged": data_cfg.get("skip_unchanged_stages", "true").strip().lower() == "true",
+        "force_stages": args.force_stage,
+        "reselect": args.reselect,
+        "calendar_params": {k: v.strip() for k, v in calendar_cfg.items()},
     }
 
+    symbols = [s.strip() for s in data_cfg.get("symbols", "EURUSD").split(",") if s.strip()]
+    timeframes = [t.strip() for t in data_cfg.get("timeframes", "M5").split(",") if t.strip()]
+    if pipeline_args["mode"] == "streaming" and len(symbols) * len(timeframes) > 1:
+        logger.warning("Modo streaming roda um único símbolo/timeframe: usando o primeiro de cada lista.")
+        symbols, timeframes = symbols[:1], timeframes[:1]
+    jobs = build_jobs(pipeline_args, symbols, timeframes)
+
     logger.debug(f"Parâmetros finais injetados no DataPipeline: {pipeline_args}")
 
     # 8. Instancia e executa o pipeline (agora tudo passado explicitamente!)
-    pipeline = DataPipeline(**pipeline_args)
-    result = pipeline.run()
+    if len(jobs) == 1:
+        pipeline = DataPipeline(**jobs[0])
+        result = pipeline.run()
+        logger.info(f"Pipeline finalizado. Etapas executadas: {list(pipeline.outputs.keys())}")
+        return
 
-    logger.info(f"Pipeline finalizado. Etapas executadas: {list(pipeline.outputs.keys())}")
+    # 9. Grade símbolo × timeframe: jobs isolados em pool de processos (log por
+    #    job em arquivo, sem barras de progresso da seleção de features)
+    for job in jobs:
+        job["quiet"] = True
+    workers = args.workers or int(data_cfg.get("pipeline_workers", "1"))
+    manifest = run_jobs(jobs, workers=workers)
+    if manifest["summary"]["failed"]:
+        failed = [f"{j['symbol']}/{j['timeframe']}" for j in manifest["jobs"] if j["status"] != "ok"]
+        logger.error(f"Jobs com falha: {failed}. Manifesto: {manifest['path']}")
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
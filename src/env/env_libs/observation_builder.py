@@ -113,10 +113,16 @@ class ObservationBuilder:
             dict: Dicionário normalizado.
         """
         try:
-            arr = np.array([observation[k] for k in self.feature_schema], dtype=np.float32).reshape(1, -1)
-            arr_norm = self.scaler.transform(arr)
-            obs_norm = {k: float(arr_norm[0, i]) for i, k in enumerate(self.feature_schema)}
-            return obs_norm
+            arr = np.fromiter(
+                (observation[k] for k in self.feature_schema), dtype=np.float32, count=len(self.feature_schema)
+            )
+            # Caminho rápido por linha (ScalerUtils); demais scalers recebem a matriz 1 × n
+            transform_one = getattr(self.scaler, "transform_one", None)
+            if transform_one is not None:
+                arr_norm = transform_one(arr)
+            else:
+                arr_norm = np.asarray(self.scaler.transform(arr.reshape(1, -1)))[0]
+            return dict(zip(self.feature_schema, arr_norm.tolist()))
         except Exception as e:
             self.logger.warning(f"Falha ao normalizar: {e}")
             return observation
@@ -15,7 +15,7 @@ import os
 import json
 import pickle
 from datetime import datetime
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 
 import pandas as pd
 
@@ -25,6 +25,15 @@ from src.utils.path_setup import ensure_project_root
 ROOT_DIR = ensure_project_root(__file__)
 logger = get_logger("file_saver")
 
+# Formatos tabulares suportados (pela extensão do arquivo). Parquet e Feather
+# preservam dtypes (datetime, int8, float32) e dispensam parsing na leitura;
+# ambos dependem de `pyarrow`.
+SUPPORTED_FORMATS = ("csv", "parquet", "feather")
+
+# CSV comprimido leva o sufixo do codec no nome (`.csv.gz`, ...): a leitura
+# infere o codec pela extensão, sem precisar conhecer a configuração de escrita.
+CSV_COMPRESSION_SUFFIXES = {"gzip": "gz", "bz2": "bz2", "xz": "xz", "zstd": "zst"}
+
 # ======= Funções de utilidade base =======
 
 def get_timestamp() -> str:
@@ -80,10 +89,80 @@ def build_filename(
 
 # ======= Salvamento de artefatos =======
 
-def save_dataframe(df: pd.DataFrame, filepath: str) -> None:
+def storage_format(filepath: str) -> str:
+    """
+    Formato tabular de um caminho pela extensão: "parquet", "feather" ou, para
+    qualquer outra extensão (inclusive `.csv.gz` e demais CSV comprimidos),
+    "csv" (comportamento histórico de save_dataframe).
     """
-    Salva DataFrame como CSV, criando diretórios e logando todo o processo.
+    fmt = os.path.splitext(str(filepath))[1].lstrip(".").lower()
+    return fmt if fmt in SUPPORTED_FORMATS else "csv"
+
+def csv_compression(filepath: str) -> Optional[str]:
+    """Codec de um CSV comprimido pelo sufixo (`.csv.gz` → "gzip"); None se não comprimido."""
+    base, suffix = os.path.splitext(str(filepath).lower())
+    if not base.endswith(".csv"):
+        return None
+    codecs = {ext: codec for codec, ext in CSV_COMPRESSION_SUFFIXES.items()}
+    return codecs.get(suffix.lstrip("."))
+
+def is_tabular_file(filepath: str) -> bool:
+    """True para extensões de SUPPORTED_FORMATS e CSV comprimido (`.csv.gz`, ...)."""
+    ext = os.path.splitext(str(filepath))[1].lstrip(".").lower()
+    return ext in SUPPORTED_FORMATS or csv_compression(filepath) is not None
+
+def storage_extension(fmt: str, compression: Optional[str] = None) -> str:
+    """
+    Extensão dos artefatos em `fmt`; CSV comprimido recebe o sufixo do codec
+    ("csv" + "gzip" → "csv.gz").
+
+    Raises:
+        ValueError: Codec de CSV não suportado.
     """
+    if fmt != "csv" or not compression:
+        return fmt
+    if compression not in CSV_COMPRESSION_SUFFIXES:
+        raise ValueError(
+            f"Compressão '{compression}' não suportada em CSV. Escolha uma das: {list(CSV_COMPRESSION_SUFFIXES)}"
+        )
+    return f"csv.{CSV_COMPRESSION_SUFFIXES[compression]}"
+
+def _check_csv_compression(filepath: str, compression: Optional[str]) -> None:
+    """Garante que o codec de escrita do CSV é o indicado pela extensão (legível na leitura)."""
+    if compression and compression != csv_compression(filepath):
+        msg = (
+            f"Compressão '{compression}' requer a extensão '.{storage_extension('csv', compression)}' "
+            f"(recebido: '{filepath}')."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+def save_dataframe(
+    df: pd.DataFrame,
+    filepath: str,
+    compression: Optional[str] = None,
+    dtypes: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Salva DataFrame no formato indicado pela extensão (.csv, .parquet, .feather),
+    criando diretórios e logando todo o processo.
+
+    Args:
+        df (pd.DataFrame): DataFrame a salvar (o índice não é gravado).
+        filepath (str): Caminho do arquivo.
+        compression (str, opcional): Codec de compressão do formato (ex.: "snappy",
+            "zstd", "lz4" em parquet/feather; "gzip" em CSV, com caminho `.csv.gz`
+            — ver `storage_extension`). None usa o padrão do formato (CSV
+            comprimido pelo sufixo do caminho).
+        dtypes (dict, opcional): Schema tipado {coluna: dtype} aplicado antes da
+            escrita (ex.: {"gap_fixed": "int8"}); colunas ausentes são ignoradas.
+
+    Raises:
+        ValueError: DataFrame vazio ou codec de CSV diferente do sufixo do caminho.
+    """
+    fmt = storage_format(filepath)
+    if fmt == "csv":
+        _check_csv_compression(filepath, compression)
     directory = os.path.dirname(filepath)
     if directory:
         try:
@@ -94,13 +173,178 @@ def save_dataframe(df: pd.DataFrame, filepath: str) -> None:
     if df.empty:
         logger.critical(f"Tentativa de salvar DataFrame vazio em '{filepath}'.")
         raise ValueError("DataFrame fornecido está vazio.")
+    if dtypes:
+        df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
     try:
-        df.to_csv(filepath, index=False, encoding="utf-8")
+        if fmt == "parquet":
+            df.to_parquet(filepath, index=False, compression=compression or "snappy")
+        elif fmt == "feather":
+            df.reset_index(drop=True).to_feather(filepath, compression=compression)
+        else:
+            df.to_csv(filepath, index=False, encoding="utf-8", compression=compression or "infer")
         logger.info(f"DataFrame salvo em: {filepath}")
     except Exception as e:
         logger.error(f"Falha ao salvar DataFrame em '{filepath}': {e}")
         raise IOError(f"Erro ao salvar DataFrame: {e}")
 
+def load_dataframe(
+    filepath: str,
+    columns: Optional[List[str]] = None,
+    nrows: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Carrega DataFrame salvo por `save_dataframe`, pelo formato da extensão.
+
+    Parquet/Feather devolvem os dtypes gravados; em CSV a coluna `datetime`
+    (se existir) é convertida para datetime64 e o codec de compressão é
+    inferido pelo sufixo (`.csv.gz`, ...).
+
+    Args:
+        filepath (str): Caminho do arquivo.
+        columns (list, opcional): Subconjunto de colunas a ler.
+        nrows (int, opcional): Lê apenas as primeiras `nrows` linhas.
+    """
+    fmt = storage_format(filepath)
+    if not os.path.exists(filepath):
+        logger.error(f"Arquivo não encontrado: '{filepath}'.")
+        raise FileNotFoundError(filepath)
+    if fmt == "parquet":
+        if nrows is None:
+            return pd.read_parquet(filepath, columns=columns)
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(filepath).iter_batches(batch_size=nrows, columns=columns)
+        first = next(batches, None)
+        if first is None:
+            return pd.read_parquet(filepath, columns=columns)
+        return first.to_pandas()
+    if fmt == "feather":
+        df = pd.read_feather(filepath, columns=columns)
+        return df.head(nrows) if nrows is not None else df
+    header = pd.read_csv(filepath, nrows=0).columns
+    wanted = header if columns is None else columns
+    parse_dates = ["datetime"] if "datetime" in wanted else None
+    return pd.read_csv(filepath, usecols=columns, nrows=nrows, parse_dates=parse_dates)
+
+def dataframe_info(filepath: str) -> Dict[str, Any]:
+    """
+    Nº de linhas e colunas de um arquivo tabular sem carregá-lo por inteiro
+    (metadados em Parquet/Feather; contagem de linhas em CSV, descomprimido
+    em streaming quando `.csv.gz`/`.bz2`/...).
+
+    Returns:
+        Dict com "rows" (int) e "columns" (lista de nomes).
+    """
+    fmt = storage_format(filepath)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        meta = pq.ParquetFile(filepath)
+        return {"rows": meta.metadata.num_rows, "columns": list(meta.schema_arrow.names)}
+    if fmt == "feather":
+        import pyarrow.ipc as ipc
+
+        with ipc.open_file(filepath) as reader:
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            return {"rows": rows, "columns": list(reader.schema.names)}
+    columns = list(pd.read_csv(filepath, nrows=0).columns)
+    if csv_compression(filepath):
+        rows = sum(len(chunk) for chunk in pd.read_csv(filepath, usecols=[0], chunksize=1 << 20))
+        return {"rows": rows, "columns": columns}
+    with open(filepath, "rb") as f:
+        rows = sum(1 for _ in f) - 1
+    return {"rows": rows, "columns": columns}
+
+class DataFrameAppender:
+    """
+    Escrita incremental de um arquivo tabular (.csv, .parquet, .feather), lote a lote.
+
+    CSV é aberto em modo append a cada lote (cabeçalho só no primeiro); com
+    compressão, cada lote vira um membro/frame do `.csv.gz`/`.bz2`/... (lido
+    como um único arquivo).
+    Parquet/Feather mantêm um writer pyarrow aberto: cada lote vira um row
+    group/record batch com o schema do primeiro lote, e o arquivo só fica
+    legível após `close()` (um processo interrompido deixa arquivo inválido);
+    sessões sem fim previsto (streaming) devem usar CSV.
+
+    Usage:
+        with DataFrameAppender("data/features/features.parquet") as out:
+            out.append(df_lote)
+
+    Args:
+        filepath (str): Caminho do arquivo (sobrescrito no primeiro lote).
+        compression (str, opcional): Codec de compressão, como em `save_dataframe`.
+        dtypes (dict, opcional): Schema tipado {coluna: dtype}, como em `save_dataframe`.
+    """
+
+    def __init__(self, filepath: str, compression: Optional[str] = None, dtypes: Optional[Dict[str, str]] = None):
+        self.filepath = filepath
+        self.format = storage_format(filepath)
+        if self.format == "csv":
+            _check_csv_compression(filepath, compression)
+        self.compression = compression
+        self.dtypes = dtypes or {}
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._columns: Optional[List[str]] = None
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Acrescenta `df` ao arquivo (colunas na ordem do primeiro lote)."""
+        if df.empty:
+            return
+        if self._columns is None:
+            self._columns = list(df.columns)
+            directory = os.path.dirname(self.filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        df = df[self._columns]
+        if self.dtypes:
+            df = df.astype({c: t for c, t in self.dtypes.items() if c in df.columns})
+        try:
+            if self.format == "csv":
+                df.to_csv(
+                    self.filepath, mode="a" if self.rows else "w", header=not self.rows,
+                    index=False, encoding="utf-8", compression=self.compression or "infer",
+                )
+            else:
+                self._append_arrow(df)
+        except Exception as e:
+            logger.error(f"Falha ao acrescentar lote em '{self.filepath}': {e}")
+            raise IOError(f"Erro ao acrescentar DataFrame: {e}")
+        self.rows += len(df)
+
+    def _append_arrow(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == "parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.filepath, self._schema, compression=self.compression or "snappy")
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=self.compression)
+                self._writer = pa.ipc.new_file(self.filepath, self._schema, options=options)
+        else:
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        """Finaliza o arquivo (obrigatório para Parquet/Feather)."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.rows:
+            logger.info(f"{self.rows} linhas gravadas incrementalmente em: {self.filepath}")
+
+    def __enter__(self) -> "DataFrameAppender":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
 def save_json(obj: Any, filepath: str) -> None:
     """
     Salva um objeto (dict, lista, etc) como JSON, criando diretórios e logando.
@@ -286,7 +530,6 @@ save_dataframe_metadata(
 # - save_yaml() para configs avançadas
 # - save_joblib() para modelos scikit-learn/tuning
 # - load_json(), load_pickle() (leitura robusta, rastreável)
-# - Utilitários para exportação incremental (streaming/batch)
 # - Compactação automática (zip, tar.gz)
 # - Versionamento automático de pipelines (hash, git tag)
 # - Logging auditável com ID de execução/pipeline
@@ -4,14 +4,28 @@ src/utils/pipeline_hash_utils.py
 
 Utilitários para criação, atualização e leitura do JSON centralizador de rastreabilidade dos pipelines de dados/treinamento do Op_Trader.
 
+Inclui o cache de estágios (estilo Make): cada estágio recebe uma chave
+derivada do hash do artefato de entrada e da sua fatia de configuração
+(incluindo a versão do código que o executa, ver `source_digest`); o
+manifesto `stage_cache_<symbol>_<timeframe>.json` (um por par, para que jobs
+paralelos da grade não disputem o mesmo arquivo) associa chave → artefato
+gerado, permitindo pular estágios cuja chave já tem artefato válido em disco.
+
 Autor: Equipe Op_Trader
 Data: 2025-06-14
 """
 
+import hashlib
 import json
 import os
+from types import ModuleType
 from typing import Dict, Any, Optional
 
+from src.utils.hash_utils import generate_config_hash
+
+# Entradas mantidas por estágio no manifesto (as mais antigas são descartadas)
+MAX_ENTRIES_PER_STAGE = 20
+
 def save_pipeline_hash_json(
     hash_path: str,
     config_hash: str,
@@ -92,3 +106,102 @@ def save_pipeline_hash_json(
     # Salva de forma segura
     with open(hash_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# ======================== CACHE DE ESTÁGIOS ===================================
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 do conteúdo de um arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_digest(*modules: ModuleType) -> str:
+    """
+    Versão do código de um estágio: hash das fontes dos módulos que o
+    executam (qualquer edição invalida as chaves que o incluem).
+    """
+    h = hashlib.sha256()
+    for module in modules:
+        h.update(file_digest(module.__file__).encode())
+    return h.hexdigest()[:16]
+
+
+def stage_key(stage: str, input_digest: Optional[str], config_slice: Dict[str, Any]) -> str:
+    """
+    Chave de um estágio: hash do nome, do digest do artefato de entrada (None
+    para estágios-fonte) e da fatia de configuração que o afeta.
+    """
+    return generate_config_hash(
+        {"stage": stage, "input": input_digest, "config": config_slice}, length=32
+    )
+
+
+def load_stage_cache(cache_path: str) -> Dict[str, Dict[str, Any]]:
+    """Manifesto {estágio: {chave: entrada}}; vazio se ausente ou corrompido."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def find_stage_artifact(cache_path: str, stage: str, key: str) -> Optional[Dict[str, Any]]:
+    """
+    Entrada do estágio para `key` se o artefato ainda existe com o mesmo
+    tamanho e mtime registrados (senão None: o estágio deve ser refeito).
+    """
+    entry = load_stage_cache(cache_path).get(stage, {}).get(key)
+    if not entry:
+        return None
+    try:
+        st = os.stat(entry["path"])
+    except (OSError, KeyError):
+        return None
+    if st.st_size != entry.get("size") or st.st_mtime != entry.get("mtime"):
+        return None
+    return entry
+
+
+def record_stage_artifact(
+    cache_path: str,
+    stage: str,
+    key: str,
+    path: str,
+    digest: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Registra no manifesto o artefato `path` gerado pelo estágio com `key`.
+    Entradas cujo artefato não existe mais são removidas; a escrita é atômica.
+
+    Returns:
+        Dict: Entrada registrada (path, digest, size, mtime + `extra`).
+    """
+    st = os.stat(path)
+    entry = {
+        "path": path,
+        "digest": digest or file_digest(path),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        **(extra or {}),
+    }
+    data = load_stage_cache(cache_path)
+    entries = {
+        k: v for k, v in data.get(stage, {}).items() if k != key and os.path.exists(v.get("path", ""))
+    }
+    entries[key] = entry
+    data[stage] = dict(list(entries.items())[-MAX_ENTRIES_PER_STAGE:])
+
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{cache_path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, cache_path)
+    return entry
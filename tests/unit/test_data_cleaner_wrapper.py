@@ -109,3 +109,33 @@ def test_batch_mode_ok():
     df = make_valid_df()
     df_clean = wrapper.clean(df, ohlc_decimals=2)
     assert list(df_clean.columns) == COLUMNS_REQUIRED
+
+def test_keep_dtypes_preserves_feature_dtypes():
+    wrapper = DataCleanerWrapper(debug=True)
+    df = make_valid_df()
+    df["rsi"] = (df["close"] * 10).astype("float32")
+    df["candle_direction"] = pd.Series([1, -1] * 5, dtype="int8")
+    cols = COLUMNS_REQUIRED + ["rsi", "candle_direction"]
+    legacy = wrapper.clean(df, ohlc_decimals=3, columns_required=cols)
+    kept = wrapper.clean(df, ohlc_decimals=3, columns_required=cols, keep_dtypes=True)
+    assert legacy["rsi"].dtype == "float64" and legacy["candle_direction"].dtype == "float64"
+    assert kept["rsi"].dtype == "float32" and kept["candle_direction"].dtype == "int8"
+    assert kept["close"].dtype == "float64"
+
+def test_inplace_and_unsorted_match_copy_mode():
+    wrapper = DataCleanerWrapper(debug=True)
+    df = make_valid_df()
+    df["rsi"] = (df["close"] * 10.123456).astype("float32")
+    df["gap_fixed"] = [True, False] * 5
+    df.loc[3, "rsi"] = None
+    df = df.iloc[::-1]
+    cols = COLUMNS_REQUIRED + ["rsi", "gap_fixed"]
+    original = df.copy()
+    copied = wrapper.clean(df, ohlc_decimals=3, columns_required=cols, keep_dtypes=True)
+    pd.testing.assert_frame_equal(df, original)
+    assert copied["datetime"].is_monotonic_increasing and len(copied) == len(df) - 1
+    assert list(copied.index) == list(range(len(copied)))
+    assert copied["rsi"].dtype == "float32" and copied["gap_fixed"].dtype == "int64"
+    inplace = wrapper.clean(df, ohlc_decimals=3, columns_required=cols, keep_dtypes=True, inplace=True)
+    assert inplace is df
+    pd.testing.assert_frame_equal(inplace, copied)
@@ -0,0 +1,121 @@
+# tests/unit/test_data_pipeline_stages.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.data.data_pipeline as dp_module
+from src.data.data_pipeline import DataPipeline
+from src.utils.file_saver import load_dataframe
+
+FEATURES = ["ema_fast", "rsi"]
+
+
+def make_raw(n=250):
+    rng = np.random.default_rng(3)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-4, n))
+    return pd.DataFrame({
+        "datetime": pd.date_range("2024-01-02 00:05", periods=n, freq="5min"),
+        "open": close, "high": close + 2e-4, "low": close - 2e-4, "close": close,
+        "volume": rng.integers(100, 200, n).astype(float),
+    })
+
+
+@pytest.fixture
+def make_pipeline(tmp_path, monkeypatch):
+    calls = {"raw": 0, "finalize": 0}
+
+    def collect(self):
+        calls["raw"] += 1
+        return make_raw()
+
+    def finalize(self, df, cfg_hash):
+        calls["finalize"] += 1
+        return df
+
+    monkeypatch.setattr(dp_module, "HASH_DIR", str(tmp_path / "hash"))
+    monkeypatch.setattr(DataPipeline, "_collect_raw", collect)
+    monkeypatch.setattr(DataPipeline, "_finalize", finalize)
+    monkeypatch.setattr(DataPipeline, "_all_feature_outputs", staticmethod(lambda: FEATURES))
+
+    def build(features_params=None, force_stages=None, symbol="EURUSD", timeframe="M5", storage_format="csv"):
+        return DataPipeline(
+            config={}, mode="batch", pipeline_type="ppo", symbol=symbol, timeframe=timeframe,
+            features=FEATURES, features_params=features_params or {},
+            start_date="2024-01-02", end_date="2024-01-03",
+            volume_sources=["volume"], volume_column="volume",
+            dirs={s: str(tmp_path / s) for s in dp_module.CACHED_STAGES},
+            gap_params={}, outlier_params={}, scaler_params={},
+            force_stages=force_stages, storage_format=storage_format, quiet=True,
+        )
+
+    build.calls = calls
+    return build
+
+
+def statuses(pipeline):
+    return {s: pipeline.stages[s]["status"] for s in dp_module.CACHED_STAGES}
+
+
+def test_unchanged_stages_are_skipped_and_forced_stages_rerun(make_pipeline):
+    first = make_pipeline()
+    df_first = first.run()
+    assert set(statuses(first).values()) == {"ok"}
+
+    second = make_pipeline()
+    df_second = second.run()
+    assert set(statuses(second).values()) == {"skipped"}
+    assert make_pipeline.calls == {"raw": 1, "finalize": 2}  # coleta pulada, finalização sempre
+    pd.testing.assert_frame_equal(df_second.reset_index(drop=True), df_first.reset_index(drop=True), check_dtype=False)
+
+    forced = make_pipeline(force_stages=["corrected"])
+    forced.run()
+    assert statuses(forced) == {"raw": "skipped", "cleaned": "skipped", "corrected": "forced", "features": "skipped"}
+
+
+def test_feature_params_or_code_version_rerun_only_features(make_pipeline, monkeypatch):
+    make_pipeline().run()
+
+    changed = make_pipeline(features_params={"ema_fast": {"window": 5}})
+    changed.run()
+    assert statuses(changed) == {"raw": "skipped", "cleaned": "skipped", "corrected": "skipped", "features": "ok"}
+
+    # nova versão do FeatureCalculator com a mesma configuração
+    monkeypatch.setattr(dp_module, "feature_code_version", lambda: "nova-versao")
+    upgraded = make_pipeline()
+    upgraded.run()
+    assert statuses(upgraded)["features"] == "ok"
+    assert statuses(upgraded)["corrected"] == "skipped"
+    assert make_pipeline.calls["raw"] == 1 and make_pipeline.calls["finalize"] == 3
+
+
+def test_feature_schemas_are_isolated_per_job(make_pipeline, tmp_path, monkeypatch):
+    import json
+    monkeypatch.chdir(tmp_path)
+    jobs = [make_pipeline(symbol="EURUSD", timeframe="M5"), make_pipeline(symbol="USDJPY", timeframe="H1")]
+    for job, features in zip(jobs, (["close", "rsi"], ["close", "atr"])):
+        job._save_feature_schema("ppo", features)
+
+    paths = [(job.outputs["feature_list_ppo"], job.outputs["feature_schema_ppo"]) for job in jobs]
+    assert paths[0] == ("config/feature_ppo_EURUSD_M5.json", "config/feature_schema_ppo_EURUSD_M5.json")
+    assert len({p for pair in paths for p in pair}) == 4
+    with open(paths[1][1]) as f:
+        assert json.load(f) == {"schema_file": "feature_ppo_USDJPY_H1.json", "all_features": ["close", "atr"]}
+    with open(paths[0][0]) as f:
+        assert json.load(f)["all_features"] == ["close", "rsi"]
+
+
+def test_streaming_outputs_are_csv_and_readable_while_open(make_pipeline):
+    pipeline = make_pipeline(storage_format="parquet")
+    appenders = pipeline._stage_appenders("abc", streaming=True)
+    raw = appenders["raw"]
+    assert raw.filepath.endswith(".csv")
+    df = make_raw(10)
+    raw.append(df.iloc[:6])
+    # legível sem close(): um processo morto preserva os lotes já gravados
+    assert len(load_dataframe(raw.filepath)) == 6
+    raw.append(df.iloc[6:])
+    pipeline._close_appenders(appenders)
+    assert len(load_dataframe(pipeline.outputs["raw"])) == 10
+    # chunked termina e fecha os writers: mantém o formato configurado
+    assert pipeline._stage_appenders("abc")["raw"].filepath.endswith(".parquet")
@@ -0,0 +1,115 @@
+import os
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from src.data.data_libs.feature_cache import FeatureCache
+from src.data.data_libs.feature_calculator import FeatureCalculator
+
+FEATURES = ["ema_fast", "rsi", "atr", "stoch_d", "parkinson_vol", "pivot_points", "day_of_week"]
+
+@pytest.fixture
+def df_ohlcv():
+    N = 500
+    np.random.seed(3)
+    dates = pd.date_range("2024-01-01", periods=N, freq="min")
+    price_base = 100 + np.cumsum(np.random.normal(0, 0.05, size=N))
+    return pd.DataFrame({
+        "datetime": dates,
+        "open": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "high": price_base + np.random.uniform(0, 0.07, size=N),
+        "low": price_base - np.random.uniform(0, 0.07, size=N),
+        "close": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "volume": np.random.randint(1000, 5000, size=N),
+    })
+
+def test_cache_hit_reproduces_output(df_ohlcv, tmp_path):
+    calc = FeatureCalculator(cache_dir=str(tmp_path))
+    first = calc.calculate_all(df_ohlcv, features=FEATURES)
+    assert calc.get_last_metadata()["cache"] == {"hits": 0, "misses": 8}  # inclui stoch_k oculto
+    second = FeatureCalculator(cache_dir=str(tmp_path)).calculate_all(df_ohlcv, features=FEATURES)
+    pd.testing.assert_frame_equal(second, first)
+    pd.testing.assert_frame_equal(first, FeatureCalculator().calculate_all(df_ohlcv, features=FEATURES))
+    calc.calculate_all(df_ohlcv, features=FEATURES)
+    assert calc.get_last_metadata()["cache"] == {"hits": 8, "misses": 0}
+
+def test_param_change_recomputes_only_that_feature(df_ohlcv, tmp_path):
+    calc = FeatureCalculator(cache_dir=str(tmp_path))
+    calc.calculate_all(df_ohlcv, features=FEATURES)
+    out = calc.calculate_all(df_ohlcv, features=FEATURES, params={"stoch_k": {"window": 10}})
+    # stoch_k mudou → stoch_d (dependente) também é recalculado
+    assert calc.get_last_metadata()["cache"] == {"hits": 6, "misses": 2}
+    expected = FeatureCalculator().calculate_all(df_ohlcv, features=FEATURES, params={"stoch_k": {"window": 10}})
+    pd.testing.assert_frame_equal(out, expected)
+
+def test_input_change_invalidates_dependent_features(df_ohlcv, tmp_path):
+    calc = FeatureCalculator(cache_dir=str(tmp_path))
+    calc.calculate_all(df_ohlcv, features=FEATURES)
+    changed = df_ohlcv.assign(open=df_ohlcv["open"] + 0.01)
+    calc.calculate_all(changed, features=FEATURES)
+    # nenhuma das features lê "open"
+    assert calc.get_last_metadata()["cache"] == {"hits": 8, "misses": 0}
+    changed = df_ohlcv.assign(high=df_ohlcv["high"] + 0.01)
+    out = calc.calculate_all(changed, features=FEATURES)
+    # ema_fast, rsi (close) e day_of_week (datetime) continuam válidos
+    assert calc.get_last_metadata()["cache"] == {"hits": 3, "misses": 5}
+    pd.testing.assert_frame_equal(out, FeatureCalculator().calculate_all(changed, features=FEATURES))
+
+@pytest.mark.parametrize("kwargs", [{"n_jobs": 2}, {"n_jobs": 2, "backend": "processes"}])
+def test_cache_with_parallel_backends(df_ohlcv, tmp_path, kwargs):
+    FeatureCalculator(cache_dir=str(tmp_path)).calculate_all(df_ohlcv, features=FEATURES)
+    calc = FeatureCalculator(cache_dir=str(tmp_path), **kwargs)
+    out = calc.calculate_all(df_ohlcv, features=FEATURES, params={"rsi": {"window": 7}})
+    assert calc.get_last_metadata()["cache"] == {"hits": 7, "misses": 1}
+    pd.testing.assert_frame_equal(
+        out, FeatureCalculator().calculate_all(df_ohlcv, features=FEATURES, params={"rsi": {"window": 7}})
+    )
+
+def test_lru_eviction_by_size(tmp_path):
+    index = pd.RangeIndex(1000)
+    cache = FeatureCache(str(tmp_path), max_bytes=20_000)
+    for i, key in enumerate(["a", "b", "c"]):
+        assert cache.store(key, "f", pd.Series(np.full(1000, float(i)), index=index), index)
+        os.utime(tmp_path / key / "meta.json", (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.load("a", index) is not None  # "a" passa a ser o mais recente
+    assert cache.evict() == ["b"]
+    assert cache.load("b", index) is None
+    np.testing.assert_array_equal(cache.load("c", index).to_numpy(), np.full(1000, 2.0))
+
+def test_cache_disabled_and_invalid_size(df_ohlcv, tmp_path):
+    calc = FeatureCalculator()
+    calc.calculate_all(df_ohlcv, features=["rsi"])
+    assert calc.get_last_metadata()["cache"] == {"hits": 0, "misses": 0}
+    with pytest.raises(ValueError):
+        FeatureCache(str(tmp_path), max_bytes=0)
+
+def test_cache_hit_result_is_writable_without_touching_cache(df_ohlcv, tmp_path):
+    expected = FeatureCalculator(cache_dir=str(tmp_path)).calculate_all(df_ohlcv, features=FEATURES)
+    calc = FeatureCalculator(cache_dir=str(tmp_path))
+    out = calc.calculate_all(df_ohlcv, features=FEATURES)
+    assert calc.get_last_metadata()["cache"]["hits"] == 8
+    out.loc[10, "rsi"] = 1.0
+    out.fillna(0, inplace=True)
+    assert out.loc[10, "rsi"] == 1.0 and not out.isna().any().any()
+    # escritas são copy-on-write: o cache em disco continua intacto
+    again = FeatureCalculator(cache_dir=str(tmp_path)).calculate_all(df_ohlcv, features=FEATURES)
+    pd.testing.assert_frame_equal(again, expected)
+
+def test_custom_feature_key_tracks_its_whole_module(tmp_path):
+    import importlib.util
+    from src.data.data_libs.feature_calculator import _func_version
+
+    def load(name, factor):
+        path = tmp_path / f"{name}.py"
+        path.write_text(
+            f"def _helper(s):\n    return s * {factor}\n\n"
+            "def my_feature(df):\n    return _helper(df['close'])\n"
+        )
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.my_feature
+
+    # mesma função, helper diferente no módulo → versão (e chave do cache) diferente
+    assert _func_version(load("feat_a", 2)) != _func_version(load("feat_b", 3))
+    assert _func_version(load("feat_c", 2)) == _func_version(load("feat_c", 2))
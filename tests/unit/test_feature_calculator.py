@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 import logging
-from src.data.data_libs.feature_calculator import FeatureCalculator
+from src.data.data_libs.feature_calculator import FeatureCalculator, _copy_on_write_active
 
 @pytest.fixture
 def df_base():
@@ -195,3 +195,167 @@ def test_all_features_math_validation_with_logs(df_base, caplog):
         is_inverted = (upper_shadow >= 2 * body) & (body <= 0.3 * total_range)
         inv_hammer_expected = is_inverted.astype(float)
         assert all(df_out["inverted_hammer_pattern"] == inv_hammer_expected), "inverted_hammer_pattern inválido"
+
+def test_plan_resolves_hidden_dependency(df_base):
+    calc = FeatureCalculator()
+    df_out = calc.calculate_all(df_base, features=["stoch_d"], params={"stoch_k": {"window": 3}})
+    meta = calc.get_last_metadata()
+    assert meta["plan"]["order"] == ["stoch_k", "stoch_d"]
+    assert meta["plan"]["hidden"] == ["stoch_k"]
+    assert "stoch_k" not in df_out.columns
+    expected = calc._calc_stoch_k(df_base, window=3).rolling(window=3).mean()
+    pd.testing.assert_series_equal(df_out["stoch_d"], expected, check_names=False)
+
+def test_shared_intermediates_computed_once(df_base):
+    calc = FeatureCalculator()
+    features = ["atr", "atr_normalized", "adx", "volatility_regime", "trend_strength",
+                "williams_r", "stoch_k", "price_channels", "breakout_signals"]
+    params = {f: {"window": 3} for f in features}
+    plan = calc.build_plan(features, params)
+    df_out = calc.calculate_all(df_base, features=features, params=params)
+    stats = calc.get_last_metadata()["intermediates"]
+    # true_range, média do TR, máx(high) e mín(low) — cada um calculado uma única vez
+    assert stats["computed"] == len(plan["consumers"]) == 4
+    assert stats["reused"] > 0
+    # Resultado idêntico ao cálculo isolado (sem cache)
+    pd.testing.assert_series_equal(
+        df_out["adx"], calc._calc_adx(df_base, window=3), check_names=False
+    )
+    pd.testing.assert_series_equal(
+        df_out["trend_strength"], calc._calc_trend_strength(df_base, window=3), check_names=False
+    )
+
+def test_plan_detects_cycles():
+    from src.data.data_libs.feature_calculator import FeatureSpec
+    calc = FeatureCalculator()
+    calc.register_feature("a", lambda df: df["close"], FeatureSpec(depends_on=("b",)))
+    calc.register_feature("b", lambda df: df["close"], FeatureSpec(depends_on=("a",)))
+    with pytest.raises(ValueError):
+        calc.build_plan(["a"])
+
+@pytest.mark.parametrize("backend", ["threads", "processes"])
+def test_parallel_matches_sequential(df_base, backend):
+    features = ["stoch_d", "atr", "adx", "cci", "ema_fast", "pivot_points", "stoch_k", "day_of_week"]
+    params = {"stoch_k": {"window": 3}, "atr": {"window": 3}, "adx": {"window": 3}, "cci": {"window": 3}}
+    expected = FeatureCalculator().calculate_all(df_base, features=features, params=params)
+    calc = FeatureCalculator(n_jobs=3, backend=backend)
+    df_out = calc.calculate_all(df_base, features=features, params=params)
+    assert list(df_out.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(df_out, expected)
+    assert calc.get_last_metadata()["features"] == FeatureCalculator().build_plan(features, params)["order"]
+
+def test_plan_levels_and_groups(df_base):
+    calc = FeatureCalculator()
+    plan = calc.build_plan(["stoch_d", "atr", "adx", "ema_fast"])
+    assert calc.plan_levels(plan) == [["stoch_k", "atr", "adx", "ema_fast"], ["stoch_d"]]
+    # atr e adx compartilham o TR; stoch_d depende de stoch_k
+    assert calc.plan_groups(plan) == [["stoch_k", "stoch_d"], ["atr", "adx"], ["ema_fast"]]
+
+def test_invalid_parallel_options():
+    with pytest.raises(ValueError):
+        FeatureCalculator(backend="gpu")
+    with pytest.raises(ValueError):
+        FeatureCalculator(n_jobs=0)
+
+def test_features_only_zero_copy(df_base):
+    import warnings
+    calc = FeatureCalculator()
+    features = [f for f in calc.list_available_features() if f != "delta_points"]
+    snapshot = df_base.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.PerformanceWarning)
+        df_out = calc.calculate_all(df_base, features=features)
+        only = calc.calculate_all(df_base, features=features, features_only=True)
+    pd.testing.assert_frame_equal(df_base, snapshot)
+    assert list(only.columns) == [c for c in df_out.columns if c not in df_base.columns]
+    pd.testing.assert_frame_equal(only, df_out[only.columns])
+    shared = np.shares_memory(df_out["close"].to_numpy(), df_base["close"].to_numpy())
+    if _copy_on_write_active():
+        # colunas de entrada não são duplicadas no resultado completo
+        assert shared
+    else:
+        assert not shared
+
+def test_overwritten_input_column_keeps_input_intact(df_base):
+    calc = FeatureCalculator()
+    calc.register_feature("close", lambda df, **kw: df["close"])
+    snapshot = df_base.copy()
+    df_out = calc.calculate_all(df_base, features=["close"])
+    df_out.loc[df_out.index[0], "open"] = -1.0
+    pd.testing.assert_frame_equal(df_base, snapshot)
+
+def test_unspecified_feature_sees_previous_outputs(df_base):
+    calc = FeatureCalculator()
+    calc.register_feature("ema_gap", lambda df, **kw: df["close"] - df["ema_fast"])
+    df_out = calc.calculate_all(df_base, features=["ema_fast", "ema_gap"])
+    pd.testing.assert_series_equal(
+        df_out["ema_gap"], df_out["close"] - df_out["ema_fast"], check_names=False
+    )
+
+def test_float32_dtype_policy():
+    from src.data.data_libs.feature_calculator import FLOAT32_RTOL, FLOAT32_TOLERANCES
+    n = 300
+    df = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=n, freq="h"),
+        "open": 1.1 + 0.01 * np.sin(np.arange(n) / 7),
+        "close": 1.1 + 0.01 * np.sin(np.arange(1, n + 1) / 7),
+        "volume": np.arange(1000, 1000 + n),
+    })
+    df["high"] = df[["open", "close"]].max(axis=1) + 0.002
+    df["low"] = df[["open", "close"]].min(axis=1) - 0.002
+    features = [f for f in FeatureCalculator().list_available_features() if f != "delta_points"]
+    out64 = FeatureCalculator().calculate_all(df, features=features, features_only=True)
+    calc = FeatureCalculator(dtype="float32")
+    out32 = calc.calculate_all(df, features=features, features_only=True)
+    assert list(out32.columns) == list(out64.columns)
+    assert out32.memory_usage().sum() < 0.55 * out64.memory_usage().sum()
+    # features discretas são de coluna única com o próprio nome
+    discrete = {f for f in features if calc._specs[f].discrete}
+    for col in out32.columns:
+        assert out32[col].dtype == (np.int8 if col in discrete else np.float32), col
+        rtol, atol = FLOAT32_TOLERANCES.get(col, (FLOAT32_RTOL, 0.0))
+        np.testing.assert_allclose(
+            out32[col].to_numpy(dtype=float), out64[col].to_numpy(dtype=float),
+            rtol=rtol, atol=atol, equal_nan=True, err_msg=col,
+        )
+    with pytest.raises(ValueError):
+        FeatureCalculator(dtype="float16")
+
+def test_market_hours_follows_sessions_dst_and_instrument_calendar(tmp_path):
+    from src.data.data_libs.trading_calendar import TradingCalendar, resolve_calendar
+    df = pd.DataFrame({"datetime": pd.to_datetime([
+        "2024-01-08 07:30", "2024-07-08 07:30",  # london abre às 08:00 locais (GMT → BST)
+        "2024-01-08 22:30", "2024-07-08 22:30",  # newyork fecha às 18:00 locais (EST → EDT)
+        "2024-07-04 12:00", "2024-07-06 12:00",  # feriado do instrumento / sábado
+    ])})
+    np.testing.assert_array_equal(
+        FeatureCalculator().calculate_all(df, features=["market_hours"])["market_hours"],
+        [2, 0, 1, -1, 0, -1],
+    )
+    fx = resolve_calendar()
+    holiday = TradingCalendar.from_dict("fx_us", {"sessions": [["00:05", "23:55"]], "holidays": ["2024-07-04"]})
+    for calendar, expected in [(fx, [2, 0, 1, -1, 0, -1]), (holiday, [2, 0, 1, -1, -1, -1])]:
+        calc = FeatureCalculator(calendar=calendar, cache_dir=str(tmp_path))
+        out = calc.calculate_all(df, features=["market_hours"], params={"market_hours": {"session": "london, newyork"}})
+        np.testing.assert_array_equal(out["market_hours"], np.where(np.array(expected) == 2, -1, expected))
+    with pytest.raises(ValueError):
+        FeatureCalculator().calculate_all(df, features=["market_hours"], params={"market_hours": {"session": "lisboa"}})
+
+def test_calendar_features_share_single_pass():
+    dates = pd.Series(pd.date_range("2024-02-26 21:00", periods=4000, freq="7min"))
+    df = pd.DataFrame({"datetime": dates, "high": 2.0, "low": 1.0, "close": 1.5})
+    features = ["session_phase", "day_of_week", "week_of_month", "market_hours",
+                "intraday_mean_reversion", "daily_range_position"]
+    calc = FeatureCalculator()
+    out = calc.calculate_all(df, features=features)
+    assert calc.get_last_metadata()["intermediates"] == {"computed": 1, "reused": 4}
+    hours = dates.dt.hour
+    legacy = np.select([(hours >= 8) & (hours < 16), (hours >= 14) & (hours < 23), hours < 9], [0, 1, 2], -1)
+    # faixas UTC antigas valem em dias úteis antes do horário de verão (EUA: 10/03)
+    winter = (dates < "2024-03-10") & (dates.dt.dayofweek < 5)
+    np.testing.assert_array_equal(out["market_hours"][winter], legacy[winter])
+    assert (out["market_hours"][dates.dt.dayofweek >= 5] == -1).all()
+    np.testing.assert_array_equal(out["day_of_week"], dates.dt.dayofweek)
+    np.testing.assert_array_equal(out["week_of_month"], (dates.dt.day - 1) // 7 + 1)
+    day = dates.dt.date
+    np.testing.assert_allclose(out["intraday_mean_reversion"], df["close"] - df["close"].groupby(day).transform("mean"))
@@ -0,0 +1,131 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.data.data_libs import feature_kernels as kernels
+from src.data.data_libs import feature_calculator as fc
+from src.data.data_libs.feature_calculator import FeatureCalculator
+
+@pytest.fixture(scope="module")
+def df_big():
+    """Mesmo gerador do teste bigdata (10.000 candles M1)."""
+    N = 10_000
+    np.random.seed(42)
+    dates = pd.date_range("2024-01-01", periods=N, freq="min")
+    price_base = 100 + np.cumsum(np.random.normal(0, 0.05, size=N))
+    return pd.DataFrame({
+        "datetime": dates,
+        "open": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "high": price_base + np.random.uniform(0, 0.07, size=N),
+        "low": price_base - np.random.uniform(0, 0.07, size=N),
+        "close": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "volume": np.random.randint(1000, 5000, size=N),
+    })
+
+@pytest.mark.parametrize("window,min_periods", [(20, 20), (5, 5), (20, 1)])
+def test_rolling_mean_std_matches_pandas(df_big, window, min_periods):
+    x = df_big["close"].to_numpy(dtype=float).copy()
+    x[100:103] = np.nan
+    mean, std = np.empty(len(x)), np.empty(len(x))
+    kernels.rolling_mean_std(x, window, min_periods, mean, std)
+    roll = pd.Series(x).rolling(window, min_periods=min_periods)
+    np.testing.assert_allclose(mean, roll.mean(), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(std, roll.std(), rtol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize("window,min_periods", [(20, 20), (20, 5)])
+def test_rolling_mean_abs_dev_matches_apply(df_big, window, min_periods):
+    x = df_big["close"].to_numpy(dtype=float).copy()
+    x[200:202] = np.nan
+    out = np.empty(len(x))
+    kernels.rolling_mean_abs_dev(x, window, min_periods, out)
+    expected = pd.Series(x).rolling(window, min_periods=min_periods).apply(
+        lambda v: np.mean(np.abs(v - np.mean(v))), raw=True
+    )
+    np.testing.assert_allclose(out, expected, rtol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize("stat", ["max", "min"])
+@pytest.mark.parametrize("window,min_periods", [(20, 20), (20, 3), (1, 1)])
+def test_rolling_extremes_match_pandas(df_big, stat, window, min_periods):
+    x = df_big["high"].round(2).to_numpy(dtype=float).copy()
+    x[[5, 6, 300]] = np.nan
+    out = np.empty(len(x))
+    getattr(kernels, f"rolling_{stat}")(x, window, min_periods, out)
+    expected = getattr(pd.Series(x).rolling(window, min_periods=min_periods), stat)()
+    np.testing.assert_array_equal(out, expected.to_numpy())
+
+@pytest.mark.parametrize("window", [1, 2, 7, 20])
+def test_rolling_median_matches_pandas(df_big, window):
+    x = df_big["close"].round(2).to_numpy(dtype=float)
+    out = np.empty(len(x))
+    kernels.rolling_median(x, window, out)
+    np.testing.assert_array_equal(out, pd.Series(x).rolling(window).median().to_numpy())
+
+@pytest.mark.parametrize("lookforward", [1, 12, 13, 60, 121])
+def test_delta_points_labels_bit_identical(df_big, lookforward):
+    close = df_big["close"].round(3).to_numpy(dtype=float)
+    pairs = [
+        (fc._calc_optimal_action_numba, fc._optimal_action_scan),
+        (fc._calc_mean_reversion_numba, fc._mean_reversion_scan),
+    ]
+    for fast, scan in pairs:
+        np.testing.assert_array_equal(
+            fast(close, lookforward, 0.0001), scan(close, lookforward, 0.0001)
+        )
+
+def test_true_range_matches_pandas(df_big):
+    h, l, c = (df_big[k].to_numpy(dtype=float) for k in ("high", "low", "close"))
+    out = np.empty(len(h))
+    kernels.true_range(h, l, c, out)
+    prev = df_big["close"].shift(1)
+    expected = pd.concat(
+        [df_big["high"] - df_big["low"], (df_big["high"] - prev).abs(), (df_big["low"] - prev).abs()],
+        axis=1,
+    ).max(axis=1)
+    np.testing.assert_array_equal(out, expected.to_numpy())
+
+def test_adx_does_not_drift_after_spike():
+    # série longa com um pico isolado: somas rolling não compensadas ficam com
+    # erro residual por todo o restante da série
+    n = 300_000
+    rng = np.random.default_rng(11)
+    close = 100 + np.cumsum(rng.normal(0, 0.01, n))
+    high = close + rng.uniform(0, 0.02, n)
+    low = close - rng.uniform(0, 0.02, n)
+    high[1_000] += 1e6
+    low[1_000] -= 1e6
+    df = pd.DataFrame({"open": close, "high": high, "low": low, "close": close})
+    out = np.empty(n)
+    kernels.adx(high, low, close, 14, out)
+    expected = FeatureCalculator(engine="pandas").calculate_all(df, features=["adx"])["adx"].to_numpy()
+    np.testing.assert_allclose(out[2_000:], expected[2_000:], rtol=1e-12)
+    np.testing.assert_allclose(out, expected, rtol=1e-9, equal_nan=True)
+
+def test_numba_engine_equivalent_to_pandas(df_big):
+    features = [f for f in FeatureCalculator().list_available_features() if f != "delta_points"]
+    out_pd = FeatureCalculator(engine="pandas").calculate_all(df_big, features=features)
+    out_nb = FeatureCalculator(engine="numba").calculate_all(df_big, features=features)
+    assert list(out_pd.columns) == list(out_nb.columns)
+    for col in out_pd.columns.drop("datetime"):
+        np.testing.assert_allclose(
+            out_nb[col].to_numpy(dtype=float), out_pd[col].to_numpy(dtype=float),
+            rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=f"{col} diverge entre engines",
+        )
+
+def test_invalid_engine():
+    with pytest.raises(ValueError):
+        FeatureCalculator(engine="cuda")
+
+@pytest.mark.parametrize("tz,unit", [(None, "ns"), (None, "s"), ("America/Sao_Paulo", "us")])
+def test_calendar_fields_match_dt_accessors(tz, unit):
+    rng = np.random.default_rng(5)
+    stamps = pd.Series(pd.to_datetime(rng.integers(-2 * 10**9, 4 * 10**9, 50_000), unit="s"))
+    stamps = stamps.astype(f"datetime64[{unit}]")
+    if tz:
+        stamps = stamps.dt.tz_localize("UTC").dt.tz_convert(tz)
+    stamps.iloc[[3, 400]] = pd.NaT
+    cal = fc.calendar_fields(stamps)
+    valid = stamps.notna().to_numpy()
+    np.testing.assert_array_equal(cal["valid"], valid)
+    dt = stamps.dt
+    np.testing.assert_array_equal(cal["minute"][valid], (dt.hour * 60 + dt.minute)[valid])
+    np.testing.assert_array_equal(cal["dow"][valid], dt.dayofweek[valid])
+    np.testing.assert_array_equal(cal["dom"][valid], dt.day[valid])
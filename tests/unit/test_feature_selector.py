@@ -0,0 +1,192 @@
+# tests/unit/test_feature_selector.py
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.data.data_libs.feature_selector as fs_module
+from src.data.data_libs.correlation_engine import correlated_features, streaming_correlation
+from src.data.data_libs.feature_selector import FeatureSelector, FeatureSelectorConfig, engine_params_from_ini
+from src.data.data_libs.importance_engine import ModelCache, time_block_sample
+from src.data.data_libs.permutation_engine import correlated_groups, permutation_importance_shared
+
+
+def make_df(n=400, classification=True):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({f"f{i}": rng.normal(0, 1, n) for i in range(6)})
+    df["f_dup"] = df["f0"] * 2 + 1e-6 * rng.normal(0, 1, n)
+    signal = df["f0"] + 0.5 * df["f1"]
+    df["target"] = (signal > 0).astype(int) if classification else signal + rng.normal(0, 0.1, n)
+    return df
+
+
+def make_cfg(**overrides):
+    cfg = dict(
+        target_column="target", model_type="ppo", correlation_threshold=0.95,
+        importance_threshold=0.01, test_size=0.2, random_state=42,
+        n_estimators=25, permutation_repeats=2,
+    )
+    cfg.update(overrides)
+    return FeatureSelectorConfig(**cfg)
+
+
+@pytest.mark.parametrize("classification", [True, False])
+def test_progress_batches_match_single_fit(classification):
+    df = make_df(classification=classification)
+    shown = FeatureSelector(df, make_cfg()).fit(show_progress=True)
+    quiet = FeatureSelector(df, make_cfg(), quiet=True).fit(show_progress=True)
+    assert len(shown.results["rf_model"].estimators_) == 25
+    pd.testing.assert_series_equal(shown.results["rf_imp"], quiet.results["rf_imp"])
+    assert shown.get_recommendations() == quiet.get_recommendations()
+    assert shown.results["dropped_corr"] == ["f_dup"]
+
+
+def test_quiet_mode_skips_progress_bar(monkeypatch):
+    def no_bar(*args, **kwargs):
+        raise AssertionError("barra de progresso criada no modo quiet")
+
+    monkeypatch.setattr(fs_module, "tqdm", no_bar)
+    selector = FeatureSelector(make_df(), make_cfg(model_type="mlp"), quiet=True).fit()
+    assert "f0" in selector.get_recommendations()
+
+
+def test_remove_corr_matches_pandas_threshold_semantics():
+    df = make_df(n=2000).drop(columns="target")
+    df["price"] = 1.1 + 1e-4 * df["f2"] + 1e-7 * df["f3"]  # média alta, desvio baixo
+    df["const"] = 5.0
+    df.loc[::7, "f4"] = np.nan
+    corr = df.corr()
+    chunks = (df.iloc[i:i + 300] for i in range(0, len(df), 300))
+    np.testing.assert_allclose(streaming_correlation(chunks), corr.to_numpy(), atol=1e-5)
+
+    upper = corr.abs().where(np.triu(np.ones_like(corr), k=1).astype(bool))
+    r = upper.loc["f0", "f_dup"]
+    # limiares a 1e-9 da correlação do par: decididos pelo recálculo em float64
+    for thr in (0.3, 0.95, r - 1e-9, r + 1e-9):
+        expected = upper.columns[(upper > thr).any()].tolist()
+        assert correlated_features(df, thr, chunk_rows=300) == expected
+
+
+def test_time_block_sample_covers_history_in_contiguous_blocks():
+    rows = time_block_sample(10_000, 1_000, 100, random_state=0)
+    assert len(rows) == 1_000 and np.all(np.diff(rows) > 0)
+    blocks = rows.reshape(10, 100)
+    assert np.all(np.diff(blocks, axis=1) == 1)
+    assert np.array_equal(blocks[:, 0] // 1_000, np.arange(10))  # um bloco por estrato
+    assert np.array_equal(time_block_sample(500, 1_000, 100, 0), np.arange(500))
+    assert np.array_equal(time_block_sample(500, None, 100, 0), np.arange(500))
+
+
+def test_hgb_with_comparison_and_time_split():
+    cfg = make_cfg(importance_model="hgb", compare_models=True, time_split=True, sample_rows=200, sample_block=20)
+    selector = FeatureSelector(make_df(), cfg, quiet=True).fit()
+    res = selector.results
+    assert res["train_rows"] == 200
+    assert selector.X_test.index.min() > selector.X_train.index.max()  # teste = fim do histórico
+    assert {"rf_score", "hgb_score", "rf_selected", "hgb_selected"} <= set(res["comparison"].columns)
+    assert selector.get_recommendations() == res["comparison"].index[res["comparison"]["hgb_selected"]].tolist()
+    assert "f0" in selector.get_recommendations()
+
+
+def test_model_cache_reuses_fitted_model(tmp_path):
+    cfg = make_cfg(importance_model="hgb", model_cache_dir=str(tmp_path))
+    first = FeatureSelector(make_df(), cfg, quiet=True).fit()
+    second = FeatureSelector(make_df(), cfg, quiet=True).fit()
+    assert len(list(tmp_path.glob("*.joblib"))) == 1
+    assert second.results["hgb_cached"] and not first.results["hgb_cached"]
+    assert first.get_recommendations() == second.get_recommendations()
+
+
+def test_model_cache_evicts_least_recently_used(tmp_path):
+    from sklearn.dummy import DummyRegressor
+
+    X, y = np.zeros((10, 1)), np.arange(10.0)
+    fit = lambda model: model.fit(X, y)  # noqa: E731
+    probe = ModelCache(str(tmp_path / "probe"))
+    probe.load_or_fit(DummyRegressor(), "probe", fit)
+    model_bytes = probe.size_bytes()
+
+    cache = ModelCache(str(tmp_path / "models"), max_bytes=2 * model_bytes)
+    for i, digest in enumerate(["a", "b"]):
+        key = cache.load_or_fit(DummyRegressor(), digest, fit)["key"]
+        os.utime(cache._path(DummyRegressor(), key), (1_000 + i, 1_000 + i))
+    assert cache.load_or_fit(DummyRegressor(), "a", fit)["cached"]  # "a" passa a ser o mais recente
+    cache.load_or_fit(DummyRegressor(), "c", fit)
+    assert cache.size_bytes() <= cache.max_bytes
+    assert cache.load_or_fit(DummyRegressor(), "a", fit)["cached"]
+    assert not cache.load_or_fit(DummyRegressor(), "b", fit)["cached"]
+    with pytest.raises(ValueError):
+        ModelCache(str(tmp_path), max_bytes=0)
+
+
+def test_engine_params_from_ini_and_validation():
+    section = {"importance_model": "hgb", "sample_rows": "0", "time_split": "True", "model_cache_dir": ""}
+    assert engine_params_from_ini(section) == {"importance_model": "hgb", "sample_rows": None, "time_split": True}
+    assert engine_params_from_ini(None) == {}
+    with pytest.raises(ValueError):
+        make_cfg(importance_model="xgb")
+
+
+def test_results_persisted_and_reused_by_fingerprint(tmp_path, monkeypatch):
+    cfg = make_cfg(compare_models=True, results_cache_dir=str(tmp_path))
+    first = FeatureSelector(make_df(), cfg, quiet=True).fit()
+    assert first.results["reused"] is False and len(list(tmp_path.glob("selection_*.json"))) == 1
+
+    def no_fit(*args, **kwargs):
+        raise AssertionError("seleção re-treinada com resultado persistido")
+
+    monkeypatch.setattr(FeatureSelector, "_fit_importance_models", no_fit)
+    second = FeatureSelector(make_df(), cfg, quiet=True).fit()
+    assert second.results["reused"] is True
+    assert second.get_recommendations() == first.get_recommendations()
+    assert second.results["dropped_corr"] == first.results["dropped_corr"]
+    for key in ("rf_imp", "perm_imp", "hgb_perm_imp", "combo"):
+        pd.testing.assert_series_equal(second.results[key], first.results[key], check_names=False)
+    pd.testing.assert_frame_equal(second.results["comparison"], first.results["comparison"])
+    assert second._build_report() == first._build_report()
+
+    # dados ou configuração diferentes (ou reselect) → novo ajuste
+    with pytest.raises(AssertionError, match="re-treinada"):
+        FeatureSelector(make_df(), cfg, quiet=True).fit(reselect=True)
+    df = make_df()
+    df.loc[0, "f3"] += 1.0
+    assert FeatureSelector(df, cfg, quiet=True).fingerprint() != second.fingerprint()
+    assert FeatureSelector(make_df(), make_cfg(n_estimators=30), quiet=True).fingerprint() != second.fingerprint()
+    assert FeatureSelector(make_df(), make_cfg(), quiet=True).fingerprint() == FeatureSelector(
+        make_df(), make_cfg(results_cache_dir=str(tmp_path)), quiet=True
+    ).fingerprint()
+
+
+def test_shared_permutation_importance_independent_of_jobs_and_batches():
+    from sklearn.ensemble import RandomForestRegressor
+
+    df = make_df(n=600, classification=False)
+    df["f_near"] = df["f1"] + 0.2 * np.random.default_rng(1).normal(0, 1, len(df))
+    X, y = df.drop(columns="target"), df["target"]
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X[:400], y[:400])
+    X_test, y_test = X[400:], y[400:]
+
+    single = permutation_importance_shared(model, X_test, y_test, n_repeats=3, random_state=0)
+    parallel = permutation_importance_shared(model, X_test, y_test, n_repeats=3, random_state=0, n_jobs=2, batch_rows=64)
+    np.testing.assert_allclose(single.importances, parallel.importances)
+    assert single.importances_mean.argmax() == 0  # f0 domina o alvo
+
+    groups = correlated_groups(X_test, 0.8)
+    assert [X.columns[j] for j in groups[0]] == ["f0", "f_dup"]
+    assert [X.columns[j] for j in groups[1]] == ["f1", "f_near"]
+    grouped = permutation_importance_shared(model, X_test, y_test, n_repeats=3, random_state=0, groups=groups)
+    assert grouped.importances_mean[0] == grouped.importances_mean[X.columns.get_loc("f_dup")]
+    with pytest.raises(ValueError):
+        permutation_importance_shared(model, X_test, y_test, groups=[[0, 1]])
+
+
+def test_selector_reports_permutation_groups():
+    df = make_df()
+    df.insert(0, "f_near", df["f1"] + 0.5 * np.random.default_rng(1).normal(0, 1, len(df)))  # |r| ~0.9
+    selector = FeatureSelector(df, make_cfg(perm_group_threshold=0.8, perm_n_jobs=1), quiet=True).fit()
+    assert selector.results["perm_groups"] == [["f_near", "f1"]]  # f_dup já saiu na poda de correlação
+    assert "f_near, f1" in selector._build_report()
+    imp = selector.results["perm_imp"]
+    assert imp["f_near"] == imp["f1"]
@@ -18,7 +18,8 @@ import pandas as pd
 import pytest
 from unittest.mock import patch
 from src.utils.file_saver import (
-    get_timestamp, build_filename, save_dataframe, save_json, save_pickle, save_dataframe_metadata
+    get_timestamp, build_filename, save_dataframe, save_json, save_pickle, save_dataframe_metadata,
+    load_dataframe, dataframe_info, DataFrameAppender, storage_extension, is_tabular_file,
 )
 
 def test_get_timestamp():
@@ -136,3 +137,74 @@ def test_save_pickle_serialize_error(tmp_path):
     pkl_path = tmp_path / "fail.pkl"
     with pytest.raises(IOError):
         save_pickle(obj, str(pkl_path))
+
+@pytest.mark.parametrize("ext,compression", [("parquet", None), ("parquet", "zstd"), ("feather", "lz4"), ("csv", None)])
+def test_storage_formats_roundtrip(tmp_path, ext, compression):
+    df = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=5, freq="min"),
+        "close": [1.0, 1.1, 1.2, 1.3, 1.4],
+        "gap_fixed": [0, 1, 0, 0, 1],
+    })
+    path = str(tmp_path / f"stage.{ext}")
+    save_dataframe(df, path, compression=compression, dtypes={"gap_fixed": "int8", "ausente": "int8"})
+    out = load_dataframe(path)
+    assert pd.api.types.is_datetime64_any_dtype(out["datetime"])
+    if ext == "csv":
+        pd.testing.assert_frame_equal(out, df, check_dtype=False)
+    else:
+        assert out["gap_fixed"].dtype == "int8"
+        pd.testing.assert_frame_equal(out, df.astype({"gap_fixed": "int8"}), check_index_type=False)
+    assert dataframe_info(path) == {"rows": 5, "columns": ["datetime", "close", "gap_fixed"]}
+    head = load_dataframe(path, columns=["close"], nrows=2)
+    assert list(head.columns) == ["close"] and len(head) == 2
+
+def test_load_dataframe_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_dataframe(str(tmp_path / "nao_existe.parquet"))
+
+@pytest.mark.parametrize("ext", ["csv", "parquet", "feather"])
+def test_dataframe_appender(tmp_path, ext):
+    df = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=6, freq="min"),
+        "close": [1.0, 1.1, 1.2, 1.3, 1.4, 1.5],
+        "gap_fixed": [0, 1, 0, 0, 1, 0],
+    })
+    path = str(tmp_path / "out" / f"stream.{ext}")
+    with DataFrameAppender(path, dtypes={"gap_fixed": "int8"}) as out:
+        out.append(df.iloc[:4])
+        out.append(df.iloc[4:][["gap_fixed", "close", "datetime"]])  # ordem do primeiro lote
+        out.append(df.iloc[:0])
+    assert out.rows == 6
+    pd.testing.assert_frame_equal(load_dataframe(path), df, check_dtype=False)
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_compressed_csv_roundtrip(tmp_path, compression):
+    df = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=6, freq="min"),
+        "close": [1.0, 1.1, 1.2, 1.3, 1.4, 1.5],
+    })
+    ext = storage_extension("csv", compression)
+    path = str(tmp_path / f"stage.{ext}")
+    save_dataframe(df, path, compression=compression)
+    with open(path, "rb") as f:
+        assert not f.read(3).startswith(b"dat")  # conteúdo realmente comprimido
+    assert is_tabular_file(path)
+    pd.testing.assert_frame_equal(load_dataframe(path), df)
+    assert dataframe_info(path) == {"rows": 6, "columns": ["datetime", "close"]}
+
+    stream = str(tmp_path / f"stream.{ext}")
+    with DataFrameAppender(stream, compression=compression) as out:
+        out.append(df.iloc[:4])
+        out.append(df.iloc[4:])
+    pd.testing.assert_frame_equal(load_dataframe(stream), df)
+    assert dataframe_info(stream)["rows"] == 6
+
+def test_compressed_csv_requires_codec_suffix(tmp_path):
+    df = pd.DataFrame({"close": [1.0, 2.0]})
+    with pytest.raises(ValueError):
+        save_dataframe(df, str(tmp_path / "stage.csv"), compression="gzip")
+    with pytest.raises(ValueError):
+        DataFrameAppender(str(tmp_path / "stream.csv.bz2"), compression="gzip")
+    with pytest.raises(ValueError):
+        storage_extension("csv", "snappy")
+    assert storage_extension("parquet", "zstd") == "parquet"
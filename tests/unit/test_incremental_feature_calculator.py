@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.data.data_libs.feature_calculator import FeatureCalculator
+from src.data.data_libs.incremental_feature_calculator import (
+    IncrementalFeatureCalculator, NON_CAUSAL_FEATURES,
+)
+
+@pytest.fixture(scope="module")
+def df_ohlcv():
+    N = 1500
+    np.random.seed(7)
+    dates = pd.date_range("2024-01-01 20:00", periods=N, freq="min")
+    price_base = 100 + np.cumsum(np.random.normal(0, 0.05, size=N))
+    return pd.DataFrame({
+        "datetime": dates,
+        "open": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "high": price_base + np.random.uniform(0, 0.07, size=N),
+        "low": price_base - np.random.uniform(0, 0.07, size=N),
+        "close": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "volume": np.random.randint(1000, 5000, size=N),
+    })
+
+def _assert_frames_match(got, expected):
+    for col in got.columns:
+        np.testing.assert_allclose(
+            got[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+            rtol=1e-12, atol=0, equal_nan=True, err_msg=f"{col} diverge de calculate_all",
+        )
+
+def test_warmup_matches_calculate_all(df_ohlcv):
+    inc = IncrementalFeatureCalculator()
+    got = inc.warmup(df_ohlcv)
+    expected = FeatureCalculator().calculate_all(df_ohlcv, features=inc.features)
+    assert list(got.columns) == [c for c in expected.columns if c not in df_ohlcv.columns]
+    _assert_frames_match(got, expected)
+
+def test_update_continues_after_warmup(df_ohlcv):
+    features = ["ema_fast", "rsi", "atr", "cci", "adx", "bb_width", "stoch_d", "trix"]
+    params = {"ema_fast": {"window": 9}, "stoch_d": {"window": 5}, "adx": {"window": 10}}
+    inc = IncrementalFeatureCalculator(features=features, params=params)
+    inc.warmup(df_ohlcv.iloc[:1000])
+    rows = [inc.update(bar) for _, bar in df_ohlcv.iloc[1000:].iterrows()]
+    expected = FeatureCalculator().calculate_all(df_ohlcv, features=features, params=params)
+    got = pd.DataFrame(rows, index=df_ohlcv.index[1000:])
+    _assert_frames_match(got, expected.iloc[1000:])
+    # stoch_k é dependência oculta: calculada mas fora da linha
+    assert "stoch_k" not in rows[-1]
+
+@pytest.mark.parametrize("feat", NON_CAUSAL_FEATURES)
+def test_non_causal_features_rejected(feat):
+    with pytest.raises(ValueError):
+        IncrementalFeatureCalculator(features=[feat])
+
+def test_unknown_feature_rejected():
+    with pytest.raises(ValueError):
+        IncrementalFeatureCalculator(features=["nao_existe"])
+
+def test_market_hours_matches_calculate_all_across_dst():
+    from src.data.data_libs.trading_calendar import resolve_calendar
+    dates = pd.date_range("2024-03-07", periods=5000, freq="7min")  # horário de verão dos EUA em 10/03
+    df = pd.DataFrame({"datetime": dates, "close": 1.0})
+    calendar = resolve_calendar()
+    got = IncrementalFeatureCalculator(features=["market_hours"], calendar=calendar).warmup(df)
+    expected = FeatureCalculator(calendar=calendar).calculate_all(df, features=["market_hours"])
+    np.testing.assert_array_equal(got["market_hours"], expected["market_hours"])
@@ -4,6 +4,7 @@ import pytest
 import pandas as pd
 import numpy as np
 from src.data.data_libs.outlier_gap_corrector import OutlierGapCorrector
+from src.data.data_libs.trading_calendar import resolve_calendar
 
 @pytest.fixture
 def df_5m_gap():
@@ -161,3 +162,59 @@ def test_stress_10000_linhas_comparativo():
     # Exporte os df (opcional, para inspeção visual)
     # df.to_csv("df_original.csv", index=False)
     # df_corr2.to_csv("df_corrigido.csv", index=False)
+
+@pytest.mark.parametrize("tz", [None, "America/Sao_Paulo"])
+def test_default_calendar_mask_follows_fx_session_in_utc(tz):
+    # calendário "fx": seg–sex, 00:05–23:55 UTC; índices com fuso são comparados em UTC
+    utc = pd.DatetimeIndex([
+        "2024-01-05 23:55",  # sexta, último candle
+        "2024-01-05 23:56",  # sexta, após a sessão
+        "2024-01-06 12:00",  # sábado
+        "2024-01-08 00:04",  # segunda, antes da abertura (rollover)
+        "2024-01-08 00:05",  # segunda, abertura
+    ])
+    idx = utc if tz is None else utc.tz_localize("UTC").tz_convert(tz)
+    mask = OutlierGapCorrector(freq="1min").calendar.mask(idx)
+    np.testing.assert_array_equal(mask, [True, False, False, False, True])
+
+def test_fix_gaps_skips_weekend_and_fills_frame():
+    idx = pd.date_range("2024-01-05 23:00", "2024-01-08 01:00", freq="5min")
+    idx = idx[resolve_calendar().mask(idx)].delete([2, 3])
+    df = pd.DataFrame({"datetime": idx, "close": np.arange(len(idx)) + 1.0, "volume": 10.0})
+    corretor = OutlierGapCorrector(freq="5min")
+    assert list(corretor.detect_gaps(df)["datetime"]) == [
+        pd.Timestamp("2024-01-05 23:10"), pd.Timestamp("2024-01-05 23:15")
+    ]
+    out = corretor.fix_gaps(df, method="forward_fill")
+    assert len(out) == len(idx) + 2
+    assert out["gap_fixed"].sum() == 2
+    assert out.loc[out["gap_fixed"], "close"].tolist() == [2.0, 2.0]
+    assert not out.isnull().any().any()
+    assert list(out.columns) == ["datetime", "close", "volume", "gap_fixed"]
+
+def test_rolling_mad_is_causal_and_fixes_in_place():
+    rng = np.random.default_rng(7)
+    n = 400
+    df = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-02", periods=n, freq="5min"),
+        "close": 100 + np.cumsum(rng.normal(0, 0.1, n)),
+        "volume": rng.integers(900, 1100, n),
+    })
+    df.loc[150, "close"] += 5
+    df.loc[300, "volume"] = 50_000
+    corretor = OutlierGapCorrector(freq="5min")
+    flags = corretor.detect_outliers(df, method="rolling_mad", window=30, threshold=6.0)
+    assert flags["close_outlier"].iloc[150] and flags["volume_outlier"].iloc[300]
+    # sem lookahead: a decisão de uma barra não depende das barras seguintes
+    prefix = corretor.detect_outliers(df.iloc[:200], method="rolling_mad", window=30, threshold=6.0)
+    pd.testing.assert_frame_equal(prefix, flags.iloc[:200])
+    assert corretor.get_outliers_report()[:2] == [
+        {"column": "close", "count": int(flags["close_outlier"].sum()), "method": "rolling_mad"},
+        {"column": "volume", "count": int(flags["volume_outlier"].sum()), "method": "rolling_mad"},
+    ]
+
+    fixed = corretor.fix_outliers(df, method="rolling_mad", correction="interpolate", window=30, threshold=6.0)
+    assert fixed.loc[150, "close"] == pytest.approx((df.loc[149, "close"] + df.loc[151, "close"]) / 2)
+    assert fixed.loc[300, "volume"] < 1100
+    assert fixed["outlier_fixed"].sum() == (flags.any(axis=1)).sum()
+    assert df.loc[300, "volume"] == 50_000  # entrada intacta
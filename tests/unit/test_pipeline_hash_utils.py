@@ -0,0 +1,52 @@
+import os
+from src.utils.pipeline_hash_utils import (
+    file_digest, find_stage_artifact, load_stage_cache, record_stage_artifact, source_digest, stage_key,
+)
+
+def test_stage_key_depends_on_input_and_config():
+    base = stage_key("features", "abc", {"rsi": {"window": 14}})
+    assert base == stage_key("features", "abc", {"rsi": {"window": 14}})
+    assert base != stage_key("features", "abd", {"rsi": {"window": 14}})
+    assert base != stage_key("features", "abc", {"rsi": {"window": 7}})
+    assert base != stage_key("corrected", "abc", {"rsi": {"window": 14}})
+
+def test_source_digest_tracks_module_sources(tmp_path):
+    import types
+    module = types.ModuleType("estagio")
+    module.__file__ = str(tmp_path / "estagio.py")
+    (tmp_path / "estagio.py").write_text("X = 1\n")
+    before = source_digest(module)
+    assert before == source_digest(module)
+    (tmp_path / "estagio.py").write_text("X = 2\n")
+    assert source_digest(module) != before
+
+def test_record_and_find_stage_artifact(tmp_path):
+    cache = str(tmp_path / "hash" / "stage_cache.json")
+    artifact = tmp_path / "features.csv"
+    artifact.write_text("a,b\n1,2\n")
+    entry = record_stage_artifact(cache, "features", "k1", str(artifact), extra={"corretora": "xp"})
+    assert entry["digest"] == file_digest(str(artifact))
+    found = find_stage_artifact(cache, "features", "k1")
+    assert found["path"] == str(artifact) and found["corretora"] == "xp"
+    assert find_stage_artifact(cache, "features", "k2") is None
+    assert find_stage_artifact(cache, "cleaned", "k1") is None
+
+def test_modified_or_removed_artifact_invalidates(tmp_path):
+    cache = str(tmp_path / "stage_cache.json")
+    artifact = tmp_path / "raw.csv"
+    artifact.write_text("a\n1\n")
+    record_stage_artifact(cache, "raw", "k1", str(artifact))
+    artifact.write_text("a\n1\n2\n")
+    assert find_stage_artifact(cache, "raw", "k1") is None
+    other = tmp_path / "raw2.csv"
+    other.write_text("a\n3\n")
+    os.remove(artifact)
+    record_stage_artifact(cache, "raw", "k2", str(other))
+    # entradas sem artefato são podadas do manifesto
+    assert list(load_stage_cache(cache)["raw"]) == ["k2"]
+
+def test_corrupted_manifest_is_ignored(tmp_path):
+    cache = tmp_path / "stage_cache.json"
+    cache.write_text("{corrompido")
+    assert load_stage_cache(str(cache)) == {}
+    assert find_stage_artifact(str(cache), "raw", "k1") is None
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+import pytest
+from src.data.pipeline_orchestrator import build_jobs, run_jobs
+
+def fake_runner(args):
+    print(f"processando {args['symbol']}/{args['timeframe']}")
+    if args["symbol"] == "USDJPY":
+        raise RuntimeError("falha simulada")
+    return {"outputs": {"raw": f"data/raw/{args['symbol']}_{args['timeframe']}.csv"}, "pid": os.getpid()}
+
+def crashing_runner(args):
+    if args["symbol"] == "USDJPY":
+        os._exit(1)  # morte nativa do processo do worker
+    time.sleep(0.2)  # jobs saudáveis ainda em andamento quando o pool quebra
+    return {"outputs": {}, "pid": os.getpid()}
+
+def test_build_jobs_expands_grid():
+    jobs = build_jobs({"mode": "batch"}, ["EURUSD", "GBPUSD"], ["M5", "H1"])
+    assert [(j["symbol"], j["timeframe"]) for j in jobs] == [
+        ("EURUSD", "M5"), ("EURUSD", "H1"), ("GBPUSD", "M5"), ("GBPUSD", "H1"),
+    ]
+    assert all(j["mode"] == "batch" for j in jobs)
+    with pytest.raises(ValueError):
+        build_jobs({}, [], ["M5"])
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_jobs_isolates_failures_and_logs(tmp_path, workers):
+    jobs = build_jobs({}, ["EURUSD", "USDJPY", "GBPUSD"], ["M5"])
+    manifest = run_jobs(
+        jobs, workers=workers, log_dir=str(tmp_path / "logs"), manifest_dir=str(tmp_path / "hash"),
+        runner=fake_runner,
+    )
+    assert manifest["summary"] == {**manifest["summary"], "total": 3, "ok": 2, "failed": 1}
+    by_symbol = {j["symbol"]: j for j in manifest["jobs"]}
+    assert by_symbol["USDJPY"]["status"] == "failed"
+    assert "falha simulada" in by_symbol["USDJPY"]["error"]
+    assert by_symbol["GBPUSD"]["outputs"]["raw"] == "data/raw/GBPUSD_M5.csv"
+    for symbol, job in by_symbol.items():
+        with open(job["log"], encoding="utf-8") as f:
+            content = f.read()
+        assert f"processando {symbol}/M5" in content
+        assert all(f"processando {other}/" not in content for other in by_symbol if other != symbol)
+    assert "RuntimeError" in open(by_symbol["USDJPY"]["log"], encoding="utf-8").read()
+    with open(manifest["path"], encoding="utf-8") as f:
+        assert json.load(f)["summary"]["failed"] == 1
+
+def test_run_jobs_rejects_invalid_workers(tmp_path):
+    with pytest.raises(ValueError):
+        run_jobs([], workers=0, manifest_dir=str(tmp_path))
+
+def test_run_jobs_crashed_worker_only_fails_its_job(tmp_path):
+    jobs = build_jobs({}, ["USDJPY", "EURUSD", "GBPUSD", "AUDUSD", "USDCAD"], ["M5"])
+    manifest = run_jobs(
+        jobs, workers=2, log_dir=str(tmp_path / "logs"), manifest_dir=str(tmp_path / "hash"),
+        runner=crashing_runner,
+    )
+    by_symbol = {j["symbol"]: j for j in manifest["jobs"]}
+    assert manifest["summary"]["failed"] == 1
+    assert by_symbol["USDJPY"]["status"] == "failed"
+    assert "abruptamente" in by_symbol["USDJPY"]["error"]
+    assert all(j["status"] == "ok" for s, j in by_symbol.items() if s != "USDJPY")
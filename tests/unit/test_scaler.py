@@ -1,5 +1,8 @@
 # tests/unit/test_scaler.py
 
+import json
+import pickle
+
 import pytest
 import pandas as pd
 import numpy as np
@@ -114,3 +117,58 @@ def test_logging_save_load(tmp_path, sample_df):
     scaler2.load_scaler(path)
     # Logs são auditados pelo console (live log call). Nenhum assert caplog necessário aqui.
     assert path.exists()
+
+def test_matches_sklearn_and_loads_legacy_pickle(tmp_path, sample_df):
+    from sklearn.preprocessing import StandardScaler
+
+    df = sample_df.assign(const=7.0)
+    scaler = ScalerUtils()
+    df_norm = scaler.fit_transform(df)
+    sk = StandardScaler().fit(df)
+    np.testing.assert_array_equal(df_norm.values, sk.transform(df))
+    np.testing.assert_array_equal(scaler.scale_, sk.scale_)
+
+    legacy = tmp_path / "scaler_legacy.pkl"
+    legacy.write_bytes(pickle.dumps(sk))
+    loaded = ScalerUtils()
+    loaded.load_scaler(legacy)
+    assert loaded.columns == list(df.columns)
+    pd.testing.assert_frame_equal(loaded.transform(df), df_norm)
+
+def test_float32_block_in_place_buffer_and_transform_one(sample_df):
+    scaler = ScalerUtils(dtype="float32")
+    df_norm = scaler.fit_transform(sample_df)
+    assert (df_norm.dtypes == np.float32).all()
+
+    block = sample_df.to_numpy(dtype=np.float32)
+    out = np.empty_like(block)
+    assert scaler.transform_block(block, out=out) is out
+    np.testing.assert_array_equal(out, df_norm.values)
+    assert scaler.transform_block(block) is block  # in-place
+    np.testing.assert_array_equal(block, df_norm.values)
+    with pytest.raises(ValueError):
+        scaler.transform_block(sample_df.to_numpy(dtype=np.float64))
+
+    row = scaler.transform_one(sample_df.iloc[2].to_numpy())
+    assert row.dtype == np.float32
+    np.testing.assert_array_equal(row, df_norm.values[2])
+    with pytest.raises(RuntimeError):
+        ScalerUtils().transform_one(row)
+
+def test_compact_artifact_is_versioned_json(tmp_path, sample_df):
+    scaler = ScalerUtils(dtype="float32")
+    scaler.fit_transform(sample_df)
+    path = tmp_path / "scaler.json"
+    scaler.save_scaler(path)
+    payload = json.loads(path.read_text())
+    assert payload["format"] == "op_trader.standard_scaler" and payload["version"] == 1
+    assert payload["columns"] == ["feature1", "feature2"] and payload["dtype"] == "float32"
+
+    loaded = ScalerUtils()
+    loaded.load_scaler(path)
+    assert loaded.dtype == np.float32
+    np.testing.assert_array_equal(loaded.mean_, scaler.mean_)
+    payload["version"] = 99
+    path.write_text(json.dumps(payload))
+    with pytest.raises(ValueError):
+        ScalerUtils().load_scaler(path)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data.data_libs.data_cleaner_wrapper import DataCleanerWrapper
+from src.data.data_libs.feature_calculator import FeatureCalculator
+from src.data.data_libs.outlier_gap_corrector import OutlierGapCorrector
+from src.data.data_libs.streaming_engine import ChunkedEngine, StreamingEngine
+
+FEATURES = ["ema_fast", "rsi", "atr", "stoch_d", "cci", "day_of_week", "market_regime", "delta_points"]
+OUTLIER_PARAMS = {"method": "zscore"}
+
+@pytest.fixture(scope="module")
+def df_ohlcv():
+    N = 800
+    np.random.seed(1)
+    dates = pd.date_range("2024-01-02 00:05", periods=N, freq="5min")
+    # série oscilante: nenhum z-score acima de 3, nem na amostra nem na cauda
+    price_base = 100 + np.sin(np.arange(N) / 15) + np.random.normal(0, 0.01, size=N)
+    df = pd.DataFrame({
+        "datetime": dates,
+        "open": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "high": price_base + np.random.uniform(0, 0.07, size=N),
+        "low": price_base - np.random.uniform(0, 0.07, size=N),
+        "close": price_base + np.random.uniform(-0.03, 0.03, size=N),
+        "volume": np.random.randint(1000, 5000, size=N).astype(float),
+    })
+    return df.drop(index=[650, 651]).reset_index(drop=True)  # gap de 2 barras
+
+def _stream(df, engine, first=600, overlap=5):
+    out = {}
+    sink = lambda etapa, part: out.setdefault(etapa, []).append(part)
+    engine.process(df.iloc[:first], sink)
+    for n in range(first + 1, len(df) + 1):
+        # lotes sobrepostos: barras já vistas devem ser ignoradas
+        engine.process(df.iloc[max(0, n - overlap):n], sink)
+    return {etapa: pd.concat(parts, ignore_index=True) for etapa, parts in out.items()}
+
+def test_streaming_matches_batch_for_causal_features(df_ohlcv):
+    engine = StreamingEngine(FEATURES, outlier_params=OUTLIER_PARAMS, warmup_bars=200)
+    out = _stream(df_ohlcv, engine)
+    # a última barra (em formação) não é processada
+    assert len(out["raw"]) == len(df_ohlcv) - 1
+    assert out["raw"]["datetime"].is_unique
+
+    clean = DataCleanerWrapper().clean(df_ohlcv.iloc[:-1], 10, columns_required=list(df_ohlcv.columns))
+    corrector = OutlierGapCorrector(freq="5min", outlier_params=dict(OUTLIER_PARAMS))
+    corrected = corrector.fix_outliers(corrector.fix_gaps(clean))
+    corrected["volume_fixed"] = 0
+    corrected = corrected.astype({"gap_fixed": int, "outlier_fixed": int})
+    pd.testing.assert_frame_equal(out["corrected"], corrected[out["corrected"].columns])
+    assert out["corrected"]["gap_fixed"].sum() == 2
+
+    expected = FeatureCalculator().calculate_all(corrected, features=FEATURES[:-1])
+    expected = DataCleanerWrapper().clean(expected, 10, columns_required=list(expected.columns))
+    got = out["features"]
+    assert "delta_points" not in got.columns  # rótulo futuro fora do streaming
+    pd.testing.assert_series_equal(got["datetime"], expected["datetime"])
+    for col in ["ema_fast", "rsi", "atr", "stoch_d", "cci", "day_of_week"]:
+        np.testing.assert_allclose(got[col], expected[col], rtol=0, atol=1e-9, err_msg=col)
+    # não causal: recalculada sobre a cauda de aquecimento
+    assert got["market_regime"].notna().all()
+
+def test_latency_report_and_budget(df_ohlcv):
+    engine = StreamingEngine(["ema_fast", "rsi"], outlier_params=OUTLIER_PARAMS, latency_budget_ms=0.0)
+    _stream(df_ohlcv.iloc[:650], engine)
+    report = engine.latency_report()
+    assert report["bars"] == 649 and report["batches"] == 51
+    assert report["bootstrap_s"] is not None
+    assert set(report["latency_ms"]) == {"mean", "p50", "p95", "max"}
+    assert report["over_budget"] == 50
+    assert engine.process(df_ohlcv.iloc[640:650]) is None  # nada novo
+
+def test_invalid_warmup_rejected():
+    with pytest.raises(ValueError):
+        StreamingEngine(["rsi"], warmup_bars=0)
+
+def test_chunked_matches_batch_with_lookahead_labels(df_ohlcv):
+    engine = ChunkedEngine(FEATURES, outlier_params=OUTLIER_PARAMS, overlap_bars=150)
+    out = {}
+    sink = lambda etapa, part: out.setdefault(etapa, []).append(part)
+    for start in range(0, len(df_ohlcv), 120):
+        # fronteira repetida entre lotes vizinhos, como em collect_chunks
+        engine.process(df_ohlcv.iloc[max(0, start - 1):start + 120], sink)
+    engine.flush(sink)
+    got = pd.concat(out["features"], ignore_index=True)
+    assert len(out["features"]) > 2 and len(engine._ctx) <= 150 + 120
+
+    clean = DataCleanerWrapper().clean(df_ohlcv, 10, columns_required=list(df_ohlcv.columns))
+    corrector = OutlierGapCorrector(freq="5min", outlier_params=dict(OUTLIER_PARAMS))
+    corrected = corrector.fix_outliers(corrector.fix_gaps(clean))
+    expected = FeatureCalculator().calculate_all(corrected, features=FEATURES)
+    expected = DataCleanerWrapper().clean(expected, 10, columns_required=list(expected.columns))
+    pd.testing.assert_series_equal(got["datetime"], expected["datetime"])
+    for col in ["rsi", "atr", "stoch_d", "cci", "day_of_week", "delta_points"]:
+        np.testing.assert_allclose(got[col], expected[col], rtol=0, atol=1e-8, err_msg=col)
+    # média exponencial: converge dentro da sobreposição
+    np.testing.assert_allclose(got["ema_fast"], expected["ema_fast"], rtol=0, atol=1e-6)
@@ -0,0 +1,45 @@
+import json
+import pytest
+import numpy as np
+import pandas as pd
+from src.data.data_libs.outlier_gap_corrector import OutlierGapCorrector
+from src.data.data_libs.trading_calendar import TradingCalendar, resolve_calendar
+
+def test_us_index_session_follows_dst():
+    cal = resolve_calendar("US500", {"symbol_calendars": "US500:us_index"})
+    # 08/03 (EST, UTC-5) e 11/03 (EDT, UTC-4): abertura 14:30 → 13:30 UTC
+    for day, open_utc in [("2024-03-08", "14:30"), ("2024-03-11", "13:30")]:
+        grid = cal.grid("1min", f"{day} 00:00", f"{day} 23:59")
+        assert grid[0] == pd.Timestamp(f"{day} {open_utc}")
+        assert len(grid) == 390
+
+def test_holidays_and_crypto_weekends(tmp_path):
+    path = tmp_path / "calendars.json"
+    path.write_text(json.dumps({
+        "b3": {"timezone": "America/Sao_Paulo", "sessions": [["10:00", "16:54"]], "holidays": ["2024-12-25"]}
+    }))
+    params = {"symbol_calendars": {"WIN": "b3", "btcusd": "crypto"}, "definitions_file": str(path)}
+    b3 = resolve_calendar("WIN", params)
+    grid = b3.grid("1h", "2024-12-23", "2024-12-28")
+    assert sorted(set(grid.date.astype(str))) == ["2024-12-23", "2024-12-24", "2024-12-26", "2024-12-27"]
+    assert grid[0] == pd.Timestamp("2024-12-23 13:00")  # 10:00 em São Paulo (UTC-3)
+
+    crypto = resolve_calendar("BTCUSD", params)
+    assert len(crypto.grid("1h", "2024-12-21", "2024-12-22 23:00")) == 48
+    assert resolve_calendar("EURUSD", params).name == "fx"
+    with pytest.raises(ValueError):
+        resolve_calendar("EURUSD", {"default": "nyse"})
+    with pytest.raises(ValueError):
+        TradingCalendar.from_dict("x", {"sessions": [["22:00", "02:00"]]})
+
+def test_grid_is_memoized_and_used_by_corrector():
+    cal = resolve_calendar(calendar_params={"default": "crypto"})
+    grid = cal.grid("5min", "2024-01-06", "2024-01-07")
+    assert cal.grid("5min", "2024-01-06", "2024-01-07") is grid
+    np.testing.assert_array_equal(cal.grid_values("5min", "2024-01-06", "2024-01-07"), grid.asi8)
+
+    df = pd.DataFrame({"datetime": grid.delete([10, 11]), "close": 1.0})
+    out = OutlierGapCorrector(freq="5min", calendar=cal).fix_gaps(df)
+    assert len(out) == len(grid) and out["gap_fixed"].sum() == 2
+    # calendário fx padrão: sábado/domingo fora da grade
+    assert OutlierGapCorrector(freq="5min").detect_gaps(df).empty